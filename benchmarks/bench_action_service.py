@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: per-action cost of building the Gmail service for every
+action versus reusing one run-scoped GmailSession.
+
+Both paths hit a StubGmailService for the API call itself, so the difference
+is the token.json read and discovery build the old path paid per action.
+
+    python -m benchmarks.bench_action_service --actions 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from gmail import auth
+from gmail.client import mark_as_read as api_mark_as_read
+from gmail.session import GmailSession
+from gmail.stub_service import StubGmailService
+
+
+def write_token_file(directory):
+    token = {
+        "token": "stub-token",
+        "refresh_token": "stub-refresh",
+        "client_id": "stub-client",
+        "client_secret": "stub-secret",
+        "expiry": (datetime.now(timezone.utc) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    path = os.path.join(directory, "token.json")
+    with open(path, "w") as f:
+        json.dump(token, f)
+    return path
+
+
+def per_action_service(stub, n):
+    start = time.perf_counter()
+    for i in range(n):
+        auth.get_gmail_service()
+        api_mark_as_read(stub, str(i))
+    return (time.perf_counter() - start) / n
+
+
+def shared_session(stub, n):
+    start = time.perf_counter()
+    session = GmailSession()
+    for i in range(n):
+        session.service
+        api_mark_as_read(stub, str(i))
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actions", type=int, default=200)
+    args = parser.parse_args()
+
+    stub = StubGmailService()
+    with tempfile.TemporaryDirectory() as tmp:
+        with mock.patch.object(auth, "TOKEN_FILE", write_token_file(tmp)):
+            before = per_action_service(stub, args.actions)
+            after = shared_session(stub, args.actions)
+
+    print(f"per-action service build: {before * 1e6:9.1f} us/action")
+    print(f"shared GmailSession:      {after * 1e6:9.1f} us/action")
+    print(f"speedup:                  {before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark in-memory rule matching as the number of rule sets grows: one
+compiled predicate per rule set versus MultiRuleMatcher's single Aho-Corasick
+scan per field.
+
+    python -m benchmarks.bench_aho_corasick --emails 100000 --rule-counts 10 100 1000 10000
+
+Per-rule matching is timed on --sample emails and extrapolated to --emails.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+from rules_engine.matcher import MultiRuleMatcher, compile_rule_sets
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "qu", "ba", "do", "fe", "gi", "ho"]
+
+
+def random_word(rng):
+    return "".join(rng.choices(SYLLABLES, k=rng.randrange(2, 5)))
+
+
+def synthetic_records(n, vocabulary, seed=7):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "id": f"{i:016x}",
+            "sender": f"{rng.choice(vocabulary)}@{rng.choice(vocabulary)}.com",
+            "recipient": "you@example.com",
+            "subject": " ".join(rng.choices(vocabulary, k=5)),
+            "snippet": "",
+            "body": " ".join(rng.choices(vocabulary, k=rng.randrange(20, 120))),
+            "received_at": "2025-10-13 12:00:00",
+        }
+
+
+def synthetic_rule_sets(n, vocabulary, seed=11):
+    rng = random.Random(seed)
+    rule_sets = []
+    for i in range(n):
+        rules = [
+            {"field": rng.choice(["sender", "subject", "body"]), "predicate": "contains", "value": rng.choice(vocabulary)}
+            for _ in range(rng.randrange(1, 3))
+        ]
+        if rng.random() < 0.1:
+            rules.append({"field": "subject", "predicate": "does_not_contain", "value": rng.choice(vocabulary)})
+        rule_sets.append({
+            "name": f"rule{i}",
+            "rules_predicate": rng.choice(["all", "any"]),
+            "rules": rules,
+            "actions": ["mark_as_read"],
+        })
+    return rule_sets
+
+
+def time_per_rule(records, rule_sets, now):
+    matchers = compile_rule_sets(rule_sets, now)
+    start = time.perf_counter()
+    hits = 0
+    for record in records:
+        hits += sum(1 for match in matchers if match(record))
+    return time.perf_counter() - start, hits
+
+
+def time_multi(records, rule_sets, now):
+    start = time.perf_counter()
+    multi = MultiRuleMatcher(rule_sets, now)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    hits = 0
+    for record in records:
+        hits += len(multi.match(record))
+    return build, time.perf_counter() - start, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=2_000)
+    parser.add_argument("--rule-counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    vocabulary = sorted({random_word(rng) for _ in range(args.vocabulary)})
+    records = list(synthetic_records(args.emails, vocabulary))
+    sample = records[:args.sample]
+    scale = len(records) / len(sample)
+    now = datetime.now(timezone.utc)
+
+    print(f"{'rules':>7} {'per-rule (est)':>15} {'build':>8} {'aho-corasick':>13} {'speedup':>8}")
+    for count in args.rule_counts:
+        rule_sets = synthetic_rule_sets(count, vocabulary)
+        naive_sample, naive_hits = time_per_rule(sample, rule_sets, now)
+        _, _, multi_hits = time_multi(sample, rule_sets, now)
+        assert naive_hits == multi_hits, (naive_hits, multi_hits)
+
+        naive = naive_sample * scale
+        build, multi, _ = time_multi(records, rule_sets, now)
+        print(f"{count:>7} {naive:>14.2f}s {build:>7.2f}s {multi:>12.2f}s {naive / multi:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
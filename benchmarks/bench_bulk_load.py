@@ -0,0 +1,86 @@
+"""
+Benchmark loading synthetic emails into a fresh SQLite database: the old
+one-execute-per-row loop versus db.bulk_loader.bulk_load_emails.
+
+    python -m benchmarks.bench_bulk_load --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from db.connection import close_pools
+from db.create_emails_table import create_emails_table
+from db.bulk_loader import UPSERT_EMAIL_SQL, bulk_load_emails, email_to_row
+
+
+def synthetic_emails(n, seed=42):
+    """Cheap deterministic rows, so the benchmark measures the loader rather than the generator."""
+    rng = random.Random(seed)
+    senders = [f"user{i}@example.com" for i in range(1000)]
+    subjects = [f"Subject {i}" for i in range(10000)]
+    bodies = ["x" * size for size in range(50, 500, 10)]
+    dates = [f"2025-{month:02d}-{day:02d} 12:00:00" for month in range(1, 13) for day in range(1, 29)]
+    for i in range(n):
+        r = rng.getrandbits(32)
+        yield {
+            "id": f"{i:016x}",
+            "subject": subjects[r % 10000],
+            "from": senders[r % 1000],
+            "to": "you@example.com",
+            "snippet": "This is a snippet of the email content.",
+            "body": bodies[r % len(bodies)],
+            "received_at": dates[r % len(dates)],
+            "is_read": r & 1,
+            "is_starred": (r >> 1) & 1,
+            "inbox_type": "INBOX",
+        }
+
+
+def fresh_db(directory, name):
+    path = os.path.join(directory, name)
+    create_emails_table(path)
+    return path
+
+
+def row_by_row(emails, db_path, commit_every):
+    """The previous loader: one execute per row, default pragmas, periodic commits."""
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    rows = 0
+    for email in emails:
+        conn.execute(UPSERT_EMAIL_SQL, email_to_row(email))
+        rows += 1
+        if rows % commit_every == 0:
+            conn.commit()
+    conn.commit()
+    conn.close()
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--baseline-rows", type=int, default=100_000,
+                        help="Rows for the slower row-by-row baseline")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--baseline-commit-every", type=int, default=500,
+                        help="Commit interval of the row-by-row baseline (store_emails_in_db used 500)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = row_by_row(
+            synthetic_emails(args.baseline_rows), fresh_db(tmp, "baseline.db"), args.baseline_commit_every
+        )
+        stats = bulk_load_emails(synthetic_emails(args.rows), fresh_db(tmp, "bulk.db"), batch_size=args.batch_size)
+        close_pools()
+
+    print(f"row-by-row:  {baseline:12,.0f} rows/sec ({args.baseline_rows:,} rows)")
+    print(f"bulk loader: {stats['rows_per_sec']:12,.0f} rows/sec ({stats['rows']:,} rows in {stats['seconds']:.2f}s)")
+    print(f"speedup:     {stats['rows_per_sec'] / baseline:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark fetch_inbox_emails modes against a stub Gmail service that sleeps
+`--latency` seconds per HTTP round-trip.
+
+    python -m benchmarks.bench_fetch --messages 500 --latency 0.02
+"""
+import argparse
+import time
+
+from gmail.fetcher import fetch_inbox_emails, FETCH_MODES
+from gmail.stub_service import StubGmailService, build_stub_message
+
+
+def build_service(n, latency):
+    messages = [
+        build_stub_message(f"msg{i}", subject=f"Subject {i}", sender=f"user{i % 50}@example.com", body="x" * 2000)
+        for i in range(n)
+    ]
+    return StubGmailService(messages, latency=latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=list(FETCH_MODES), choices=FETCH_MODES)
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        service = build_service(args.messages, args.latency)
+        start = time.perf_counter()
+        emails = fetch_inbox_emails(
+            service, max_results=args.messages, mode=mode, concurrency=args.concurrency,
+            service_factory=lambda: service
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{mode:8s} {len(emails):6d} emails in {elapsed:7.3f}s ({len(emails) / elapsed:9.1f} emails/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark `contains` predicates through plain LIKE scans versus the
+emails_fts trigram index on a synthetic mailbox (db.synthetic_mailbox).
+
+    python -m benchmarks.bench_fts --rows 100000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from db.connection import close_pools
+from db.create_emails_table import create_emails_table
+from db.fts import create_fts_index
+from db.rules_to_sql import rules_to_sql_query
+from db.synthetic_mailbox import populate_mailbox
+
+NEEDLES = [
+    ("subject", "invoice"),
+    ("body", "quarterly budget"),
+    ("body", "zerodha"),
+    ("sender", "user42@"),
+]
+
+
+def time_query(conn, rules_data, use_fts, repeat):
+    query, params = rules_to_sql_query(rules_data, use_fts=use_fts)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = conn.execute(query, params).fetchall()
+    return (time.perf_counter() - start) / repeat, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "emails.db")
+        create_emails_table(db_file)
+        populate_mailbox(args.rows, seed=args.seed, db_path=db_file)
+        close_pools()
+
+        conn = sqlite3.connect(db_file)
+        start = time.perf_counter()
+        create_fts_index(conn)
+        print(f"FTS index build: {time.perf_counter() - start:.2f}s for {args.rows:,} rows")
+
+        for field, value in NEEDLES:
+            rules_data = {"rules": [{"field": field, "predicate": "contains", "value": value}]}
+            like_time, like_rows = time_query(conn, rules_data, False, args.repeat)
+            fts_time, fts_rows = time_query(conn, rules_data, True, args.repeat)
+            assert like_rows == fts_rows
+            print(
+                f"{field:8s} contains {value!r:20s} {like_rows:8,d} rows  "
+                f"LIKE {like_time * 1000:9.1f} ms  FTS {fts_time * 1000:9.1f} ms  "
+                f"({like_time / fts_time:6.1f}x)"
+            )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark received_at parsing on a realistic Date header corpus: the old
+regex + strptime parser, parsedate_to_datetime, the same behind the LRU
+cache (cold at the start of every run) and Gmail's internalDate.
+
+The corpus mixes the header styles seen in real mailboxes (with and without
+weekday, GMT, trailing zone comments, many offsets), and a share of messages
+reuse a recent header the way bulk mail sent in one blast does.
+
+    python -m benchmarks.bench_parse_dates --headers 200000 --shared 0.4
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from db.populate_emails import internal_date_to_received_at, parse_received_at
+
+OFFSETS = ["+0000", "-0000", "+0100", "+0200", "+0530", "-0400", "-0500", "-0700", "-0800", "+0900"]
+ZONE_COMMENTS = {"+0000": "(UTC)", "-0700": "(PDT)", "-0800": "(PST)", "-0400": "(EDT)", "+0100": "(CET)"}
+LEGACY_FORMATS = ["%a, %d %b %Y %H:%M:%S %z", "%d %b %Y %H:%M:%S %z"]
+
+
+def legacy_parse_received_at(received_at_str):
+    """The regex + strptime parser parse_received_at replaced."""
+    received_at_str = re.sub(r"\s*\(.*\)$", "", received_at_str)
+    received_at_str = re.sub(r"\sGMT$", " +0000", received_at_str)
+    for fmt in LEGACY_FORMATS:
+        try:
+            dt = datetime.strptime(received_at_str, fmt)
+            return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+
+def format_header(rng, received):
+    offset = rng.choice(OFFSETS)
+    sign = -1 if offset[0] == "-" else 1
+    local = received + sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[3:]))
+    style = rng.random()
+    if style < 0.1:
+        return local.strftime("%d %b %Y %H:%M:%S ") + offset
+    if style < 0.2:
+        return received.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    header = f"{local.strftime('%a')}, {local.day} {local.strftime('%b %Y %H:%M:%S')} {offset}"
+    if style < 0.4 and offset in ZONE_COMMENTS:
+        header += f" {ZONE_COMMENTS[offset]}"
+    return header
+
+
+def header_corpus(n, shared=0.4, seed=7):
+    """(Date header, internalDate) pairs; `shared` of them repeat one of the last 50 headers."""
+    rng = random.Random(seed)
+    received = datetime(2025, 10, 13, tzinfo=timezone.utc) - timedelta(days=365)
+    corpus = []
+    for _ in range(n):
+        if corpus and rng.random() < shared:
+            corpus.append(rng.choice(corpus[-50:]))
+            continue
+        received += timedelta(seconds=rng.expovariate(n / (365 * 86400)))
+        received = received.replace(microsecond=0)
+        corpus.append((format_header(rng, received), str(int(received.timestamp() * 1000))))
+    return corpus
+
+
+def best_of(repeat, func, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headers", type=int, default=200_000)
+    parser.add_argument("--shared", type=float, default=0.4, help="Share of messages reusing a recent header")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = header_corpus(args.headers, args.shared)
+    headers = [header for header, _ in corpus]
+    internal_dates = [internal_date for _, internal_date in corpus]
+    parse_uncached = parse_received_at.__wrapped__
+
+    mismatches = sum(1 for header in set(headers) if legacy_parse_received_at(header) != parse_uncached(header))
+    if mismatches:
+        print(f"Warning: {mismatches} headers parse differently from the legacy parser")
+
+    timings = {
+        "regex + strptime (old)": best_of(args.repeat, lambda: [legacy_parse_received_at(h) for h in headers]),
+        "parsedate_to_datetime": best_of(args.repeat, lambda: [parse_uncached(h) for h in headers]),
+        "parsedate + LRU cache": best_of(args.repeat, lambda: [parse_received_at(h) for h in headers],
+                                         setup=parse_received_at.cache_clear),
+        "internalDate": best_of(args.repeat, lambda: [internal_date_to_received_at(d) for d in internal_dates]),
+    }
+
+    baseline = timings["regex + strptime (old)"]
+    print(f"{args.headers:,} headers, {len(set(headers)):,} distinct")
+    for name, seconds in timings.items():
+        print(f"{name:24s} {args.headers / seconds:12,.0f} dates/s  ({baseline / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
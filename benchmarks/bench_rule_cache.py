@@ -0,0 +1,70 @@
+"""
+Benchmark rules engine startup on a large rule_sets file: validating and
+compiling it to SQL on every run versus loading it from the rule cache.
+
+    python -m benchmarks.bench_rule_cache --rule-sets 5000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from rules_engine.rule_cache import compile_rules, load_compiled_rules
+from rules_engine.validator import load_and_validate_rules
+
+FIELDS = ["sender", "recipient", "subject", "body", "snippet"]
+PREDICATES = ["contains", "does_not_contain", "equals", "does_not_equal"]
+
+
+def synthetic_rules(n, seed=5):
+    rng = random.Random(seed)
+    rule_sets = []
+    for i in range(n):
+        rules = [
+            {"field": rng.choice(FIELDS), "predicate": rng.choice(PREDICATES), "value": f"word{rng.randrange(10000)}"}
+            for _ in range(rng.randrange(1, 5))
+        ]
+        rules.append({"field": "received_at", "predicate": "less_than", "value": f"{rng.randrange(1, 60)} days"})
+        rule_sets.append({
+            "name": f"rule{i}",
+            "priority": rng.randrange(10),
+            "rules_predicate": rng.choice(["all", "any"]),
+            "rules": rules,
+            "actions": ["mark_as_read", "move_message:TRASH"],
+        })
+    return {"rule_sets": rule_sets}
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rule-sets", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_file = os.path.join(tmp, "rules.json")
+        with open(rules_file, "w") as f:
+            json.dump(synthetic_rules(args.rule_sets), f)
+        cache_dir = os.path.join(tmp, "cache")
+
+        uncached = best_of(args.repeat, lambda: compile_rules(load_and_validate_rules(rules_file)))
+        load_compiled_rules(rules_file, cache_dir=cache_dir)
+        cached = best_of(args.repeat, lambda: load_compiled_rules(rules_file, cache_dir=cache_dir))
+
+    print(f"validate + compile: {uncached * 1000:8.1f} ms ({args.rule_sets:,} rule sets)")
+    print(f"rule cache hit:     {cached * 1000:8.1f} ms  ({uncached / cached:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+End-to-end benchmark suite with machine-readable output.
+
+Runs the engine's hot paths against throwaway databases and a stub Gmail
+service, prints a table to stderr and writes the results as JSON (stdout, or
+--output), so runs can be compared between releases:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --sizes 10000 100000 1000000 --output results.json
+    python -m benchmarks.suite --only compile decode --compare results.json
+
+Cases:
+  compile      rules_to_sql_query / rule_sets_to_sql_query compile rate
+  load         bulk_load_emails rate for a synthetic mailbox of each --sizes
+  query        representative rule queries on each of those mailboxes
+  decode       gmail.fetcher.get_email_body throughput
+  parse_dates  Date header (parse_received_at) and internalDate parsing rates
+  sync         full and incremental sync from the stub service
+  actions      per-email, concurrent and batched action dispatch rate
+
+With --compare, every case present in both runs is shown with its change in
+throughput, and the exit status is 1 if any got slower than --tolerance.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+from benchmarks.bench_parse_dates import header_corpus
+from db.bulk_loader import bulk_load_emails
+from db.connection import DB_PATH_ENV, close_pools
+from db.create_emails_table import create_emails_table
+from db.incremental_sync import sync_changes
+from db.populate_emails import internal_date_to_received_at, parse_received_at
+from db.rules_to_sql import rule_sets_to_sql_query, rules_to_sql_query
+from db.synthetic_mailbox import DEFAULT_SEED, STOP_WORDS, TOPIC_WORDS, build_vocabulary, generate_mailbox
+from db.write_buffer import EmailWriteBuffer
+from gmail.actions.batch_modify import batch_modify
+from gmail.actions.mark_as_read import mark_as_read
+from gmail.fetcher import get_email_body
+from gmail.stub_service import StubGmailService, build_stub_message
+from gmail.throttle import TokenBucket
+from rules_engine.executor import execute_actions_concurrently
+
+SCHEMA_VERSION = 1
+DEFAULT_SIZES = [10_000, 100_000]
+CASES = ("compile", "load", "query", "decode", "parse_dates", "sync", "actions")
+
+SINGLE_RULES = {
+    "rules_predicate": "any",
+    "rules": [
+        {"field": "sender", "predicate": "contains", "value": "user42@"},
+        {"field": "subject", "predicate": "contains", "value": "invoice"},
+    ],
+    "actions": ["mark_as_read"],
+}
+QUERY_RULES = {
+    "contains_any": SINGLE_RULES,
+    "sender_equals": {
+        "rules_predicate": "all",
+        "rules": [{"field": "sender", "predicate": "equals", "value": "user7@example.com"}],
+        "actions": ["mark_as_read"],
+    },
+    "recent_body_contains": {
+        "rules_predicate": "all",
+        "rules": [
+            {"field": "received_at", "predicate": "less_than", "value": "30 days"},
+            {"field": "body", "predicate": "contains", "value": "quarterly"},
+        ],
+        "actions": ["move_message:TRASH"],
+    },
+}
+
+
+def rule_sets(n, seed=3, mailbox_seed=DEFAULT_SEED):
+    """
+    `n` contains rule sets whose needles come from the synthetic mailbox
+    generated with `mailbox_seed`: topic words for subjects, words of its
+    vocabulary for bodies and snippets, and its more active senders, so each
+    rule set matches a small, realistic share of rows.
+    """
+    rng = random.Random(seed)
+    vocabulary = build_vocabulary(random.Random(mailbox_seed))
+    needles = {
+        "sender": [f"user{rank}@" for rank in range(200)],
+        "subject": TOPIC_WORDS,
+        "body": vocabulary[200:2000],
+        "snippet": vocabulary[len(STOP_WORDS):200],
+    }
+    fields = list(needles)
+
+    def rule():
+        field = rng.choice(fields)
+        return {"field": field, "predicate": "contains", "value": rng.choice(needles[field])}
+
+    return [
+        {
+            "name": f"rule{i}", "priority": i, "stop_processing": False,
+            "rules_predicate": rng.choice(["all", "any"]),
+            "rules": [rule() for _ in range(rng.randrange(1, 4))],
+            "actions": ["mark_as_read"],
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(repeat, func):
+    """Run `func` `repeat` times; return (fastest seconds, last result)."""
+    best = float("inf")
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def result(case, name, ops, seconds, unit, **params):
+    return {
+        "case": case,
+        "name": name,
+        "params": params,
+        "ops": ops,
+        "unit": unit,
+        "seconds": seconds,
+        "ops_per_sec": ops / seconds if seconds else 0.0,
+    }
+
+
+def bench_compile(args, workdir):
+    results = []
+    iterations = 2000
+    seconds, _ = best_of(args.repeat, lambda: [rules_to_sql_query(SINGLE_RULES) for _ in range(iterations)])
+    results.append(result("compile", "rules_to_sql_query", iterations, seconds, "queries"))
+    for count in (10, 100, 1000):
+        sets = rule_sets(count)
+        seconds, _ = best_of(args.repeat, lambda: rule_sets_to_sql_query(sets))
+        results.append(result("compile", "rule_sets_to_sql_query", 1, seconds, "queries", rule_sets=count))
+    return results
+
+
+def mailbox_path(workdir, size):
+    return os.path.join(workdir, f"mailbox_{size}.db")
+
+
+def load_mailbox(args, workdir, size):
+    """Create (once per run) and return the synthetic mailbox database for `size` rows, with its load stats."""
+    path = mailbox_path(workdir, size)
+    if not os.path.exists(path):
+        create_emails_table(path)
+        # Dates end now, so relative-date rules select a realistic slice.
+        emails = generate_mailbox(size, seed=args.seed, end=datetime.now(timezone.utc))
+        args.load_stats[size] = bulk_load_emails(emails, path)
+    return path, args.load_stats[size]
+
+
+def bench_load(args, workdir):
+    results = []
+    for size in args.sizes:
+        _, stats = load_mailbox(args, workdir, size)
+        results.append(result("load", "bulk_load_emails", stats["rows"], stats["seconds"], "rows", size=size))
+    return results
+
+
+def bench_query(args, workdir):
+    results = []
+    for size in args.sizes:
+        path, _ = load_mailbox(args, workdir, size)
+        conn = sqlite3.connect(path)
+        queries = {name: rules_to_sql_query(rules) for name, rules in QUERY_RULES.items()}
+        queries["rule_sets_100"] = rule_sets_to_sql_query(rule_sets(100, mailbox_seed=args.seed), columns=("id",))
+        for name, (query, params) in queries.items():
+            seconds, rows = best_of(args.repeat, lambda: conn.execute(query, params).fetchall())
+            results.append(result("query", name, size, seconds, "rows scanned", size=size, matched=len(rows)))
+        conn.close()
+    return results
+
+
+def bench_decode(args, workdir):
+    rng = random.Random(args.seed)
+    payloads = []
+    total_bytes = 0
+    for email in generate_mailbox(2000, seed=args.seed):
+        data = base64.urlsafe_b64encode(email["body"].encode("utf-8")).decode("ASCII")
+        total_bytes += len(email["body"])
+        if rng.random() < 0.5:
+            payloads.append({"mimeType": "text/plain", "body": {"data": data}})
+        else:
+            payloads.append({"mimeType": "multipart/alternative", "parts": [
+                {"mimeType": "text/plain", "body": {"data": data}},
+                {"mimeType": "text/html", "body": {"data": data}},
+            ]})
+    seconds, _ = best_of(args.repeat, lambda: [get_email_body(payload) for payload in payloads])
+    return [
+        result("decode", "get_email_body", len(payloads), seconds, "messages"),
+        result("decode", "get_email_body_bytes", total_bytes, seconds, "bytes"),
+    ]
+
+
+def bench_parse_dates(args, workdir):
+    corpus = header_corpus(20_000, seed=args.seed)
+    headers = [header for header, _ in corpus]
+    internal_dates = [internal_date for _, internal_date in corpus]
+
+    def parse_headers():
+        parse_received_at.cache_clear()
+        return [parse_received_at(value) for value in headers]
+
+    seconds, _ = best_of(args.repeat, parse_headers)
+    internal_seconds, _ = best_of(args.repeat, lambda: [internal_date_to_received_at(d) for d in internal_dates])
+    return [
+        result("parse_dates", "parse_received_at", len(headers), seconds, "dates"),
+        result("parse_dates", "internal_date_to_received_at", len(internal_dates), internal_seconds, "dates"),
+    ]
+
+
+def stub_mailbox(args, n):
+    messages = [
+        build_stub_message(email["id"], subject=email["subject"], sender=email["from"], body=email["body"][:4000])
+        for email in generate_mailbox(n, seed=args.seed)
+    ]
+    return StubGmailService(messages, latency=args.latency)
+
+
+def bench_sync(args, workdir):
+    os.environ[DB_PATH_ENV] = os.path.join(workdir, "sync.db")
+    create_emails_table()
+    service = stub_mailbox(args, args.messages)
+
+    start = time.perf_counter()
+    stats = sync_changes(service)
+    full = time.perf_counter() - start
+
+    for i in range(args.messages // 10):
+        service.add_message(build_stub_message(f"new{i}", subject="New", sender="new@example.com", body="body"))
+    start = time.perf_counter()
+    incremental = sync_changes(service)
+    seconds = time.perf_counter() - start
+    return [
+        result("sync", "full_sync", stats["added"], full, "messages", latency=args.latency),
+        result("sync", "incremental_sync", incremental["added"], seconds, "messages", latency=args.latency),
+    ]
+
+
+def bench_actions(args, workdir):
+    os.environ[DB_PATH_ENV] = os.path.join(workdir, "actions.db")
+    create_emails_table()
+    emails = [{"id": f"msg{i}"} for i in range(args.messages)]
+
+    def fresh_service():
+        return StubGmailService(
+            [build_stub_message(email["id"], subject="s", sender="a@example.com") for email in emails],
+            latency=args.latency,
+        )
+
+    results = []
+    service = fresh_service()
+    with EmailWriteBuffer() as writes:
+        start = time.perf_counter()
+        for email in emails:
+            mark_as_read(email["id"], service=service, writes=writes)
+    results.append(result("actions", "serial", len(emails), time.perf_counter() - start, "actions",
+                          latency=args.latency))
+
+    service = fresh_service()
+    with EmailWriteBuffer() as writes:
+        start = time.perf_counter()
+        execute_actions_concurrently(
+            [(email, ["mark_as_read"]) for email in emails], {"mark_as_read": mark_as_read},
+            concurrency=args.concurrency, rate_limiter=TokenBucket(rate=float("inf")),
+            service_factory=lambda: service, action_kwargs={"writes": writes},
+        )
+    results.append(result("actions", "concurrent", len(emails), time.perf_counter() - start, "actions",
+                          latency=args.latency, concurrency=args.concurrency))
+
+    service = fresh_service()
+    with EmailWriteBuffer() as writes:
+        start = time.perf_counter()
+        batch_modify([email["id"] for email in emails], remove_labels=("UNREAD",), service=service, writes=writes)
+    results.append(result("actions", "batch_modify", len(emails), time.perf_counter() - start, "actions",
+                          latency=args.latency))
+    return results
+
+
+BENCHMARKS = {
+    "compile": bench_compile,
+    "load": bench_load,
+    "query": bench_query,
+    "decode": bench_decode,
+    "parse_dates": bench_parse_dates,
+    "sync": bench_sync,
+    "actions": bench_actions,
+}
+
+
+def run_suite(args):
+    """Run the selected cases and return the JSON-serializable report."""
+    args.load_stats = {}
+    results = []
+    previous_db = os.environ.get(DB_PATH_ENV)
+    with tempfile.TemporaryDirectory() as workdir, redirect_stdout(sys.stderr):
+        try:
+            for case in args.only:
+                for entry in BENCHMARKS[case](args, workdir):
+                    print(format_result(entry))
+                    results.append(entry)
+        finally:
+            close_pools()
+            if previous_db is None:
+                os.environ.pop(DB_PATH_ENV, None)
+            else:
+                os.environ[DB_PATH_ENV] = previous_db
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "options": {key: value for key, value in vars(args).items() if key not in ("load_stats", "compare", "output")},
+        "results": results,
+    }
+
+
+def result_key(entry):
+    return entry["case"], entry["name"], json.dumps(entry["params"], sort_keys=True)
+
+
+def result_label(entry):
+    params = ", ".join(f"{key}={value}" for key, value in entry["params"].items())
+    return f"{entry['case']}/{entry['name']}" + (f" [{params}]" if params else "")
+
+
+def format_result(entry):
+    return f"{result_label(entry):60s} {entry['ops_per_sec']:14,.1f} {entry['unit']}/s  ({entry['seconds'] * 1000:9.2f} ms)"
+
+
+def compare(report, baseline, tolerance):
+    """Print throughput changes against a baseline report; return the regressed entries."""
+    before = {result_key(entry): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in report["results"]:
+        old = before.get(result_key(entry))
+        if old is None or not old["ops_per_sec"]:
+            continue
+        change = entry["ops_per_sec"] / old["ops_per_sec"] - 1
+        marker = ""
+        if change < -tolerance:
+            regressions.append(entry)
+            marker = "  REGRESSION"
+        print(f"{result_label(entry):60s} {change:+8.1%}{marker}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=CASES, default=list(CASES), help="Cases to run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Mailbox sizes for load/query")
+    parser.add_argument("--messages", type=int, default=500, help="Stub messages for sync and actions")
+    parser.add_argument("--latency", type=float, default=0.002, help="Stub service latency per request (seconds)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions for in-process timings (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed throughput drop against --compare before failing (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
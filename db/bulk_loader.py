@@ -0,0 +1,80 @@
+import time
+from itertools import islice
+from db.connection import connection
+
+DEFAULT_BATCH_SIZE = 5000
+
+EMAIL_COLUMNS = (
+    "id", "subject", "sender", "recipient", "snippet", "body",
+    "received_at", "is_read", "is_starred", "inbox_type",
+)
+
+# Gmail is the source of truth, so label-derived columns are refreshed too.
+UPSERT_EMAIL_SQL = """
+INSERT INTO emails (id, subject, sender, recipient, snippet, body, received_at, is_read, is_starred, inbox_type)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    subject=excluded.subject,
+    sender=excluded.sender,
+    recipient=excluded.recipient,
+    snippet=excluded.snippet,
+    body=excluded.body,
+    received_at=excluded.received_at,
+    is_read=excluded.is_read,
+    is_starred=excluded.is_starred,
+    inbox_type=excluded.inbox_type
+"""
+
+def email_to_row(email):
+    """
+    Convert an email dict ("from"/"to" keys, received_at already in
+    "%Y-%m-%d %H:%M:%S" UTC) into an UPSERT_EMAIL_SQL parameter tuple.
+    """
+    return (
+        email["id"],
+        email.get("subject"),
+        email.get("from"),
+        email.get("to"),
+        email.get("snippet"),
+        email.get("body", ""),
+        email.get("received_at"),
+        email.get("is_read"),
+        email.get("is_starred"),
+        email.get("inbox_type"),
+    )
+
+def iter_batches(iterable, batch_size):
+    """Yield lists of up to `batch_size` items without materializing the iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def bulk_load_emails(emails, db_path=None, batch_size=DEFAULT_BATCH_SIZE, to_row=email_to_row):
+    """
+    Upsert an iterable of email dicts in batches of `batch_size`.
+
+    Each batch goes through a single executemany inside its own transaction, so
+    a failure rolls back only the current batch. The iterable is consumed
+    lazily; generators are never held in memory. `db_path` defaults to the
+    configured database (see db.connection).
+
+    Returns {"rows": int, "seconds": float, "rows_per_sec": float}.
+    """
+    rows = 0
+    start = time.perf_counter()
+    with connection(db_path) as conn:
+        for batch in iter_batches(map(to_row, emails), batch_size):
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(UPSERT_EMAIL_SQL, batch)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            rows += len(batch)
+
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else 0.0}
@@ -0,0 +1,140 @@
+"""
+Shared SQLite access for the emails database.
+
+The database path comes from the EMAILS_DB environment variable (default
+emails.db) unless a call passes its own. Connections are pooled per path,
+configured once with CONNECTION_PRAGMAS and borrowed through the
+connection() / transaction() context managers, so callers neither pay the
+connect cost repeatedly nor hold a connection longer than they need it.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH_ENV = "EMAILS_DB"
+DEFAULT_DB_FILE = "emails.db"
+DEFAULT_POOL_SIZE = 8
+
+# WAL lets readers run alongside a writer and synchronous=NORMAL only fsyncs at
+# checkpoints, which is safe in WAL mode. busy_timeout makes writers wait for
+# each other instead of failing with "database is locked". cache_size is in
+# KiB when negative; mmap_size is in bytes.
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+def get_db_path(db_path=None):
+    """Return `db_path` if given, otherwise the configured database path."""
+    if db_path is not None:
+        return str(db_path)
+    return os.environ.get(DB_PATH_ENV, DEFAULT_DB_FILE)
+
+def apply_pragmas(conn, pragmas=CONNECTION_PRAGMAS):
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+class ConnectionPool:
+    """
+    Thread-safe pool of at most `max_size` connections to one database file.
+
+    Connections are opened lazily in autocommit mode (transactions are
+    explicit, see transaction()) and may move between threads, but each is
+    used by a single borrower at a time. Borrowers beyond `max_size` wait.
+    """
+
+    def __init__(self, db_path, max_size=DEFAULT_POOL_SIZE, pragmas=CONNECTION_PRAGMAS):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(conn, self.pragmas)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._idle = queue.LifoQueue()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path=None):
+    """Return the connection pool for `db_path` (default: the configured path)."""
+    path = get_db_path(db_path)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+def close_pools():
+    """Close every pooled connection, e.g. before deleting a database file."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+@contextmanager
+def connection(db_path=None):
+    """Borrow a pooled autocommit connection for the duration of the block."""
+    with get_pool(db_path).connection() as conn:
+        yield conn
+
+@contextmanager
+def transaction(db_path=None):
+    """
+    Borrow a pooled connection inside BEGIN ... COMMIT. The transaction is
+    rolled back if the block raises.
+    """
+    with connection(db_path) as conn:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -1,29 +1,11 @@
-import sqlite3
-
-DB_FILE = "emails.db"
-
-def create_emails_table():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS emails (
-        id TEXT PRIMARY KEY,
-        subject TEXT,
-        sender TEXT,
-        recipient TEXT,
-        snippet TEXT,
-        body TEXT,
-        received_at TEXT,
-        is_read BOOLEAN,
-        is_starred BOOLEAN,
-        inbox_type TEXT
-    )
-    """)
-
-    conn.commit()
-    conn.close()
-    print("Migration complete: emails table created.")
+from db.connection import connection
+from db.migrations import get_schema_version, migrate
+
+def create_emails_table(db_path=None):
+    with connection(db_path) as conn:
+        migrate(conn)
+        version = get_schema_version(conn)
+    print(f"Migration complete: schema at version {version}.")
 
 if __name__ == "__main__":
     create_emails_table()
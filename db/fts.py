@@ -0,0 +1,82 @@
+from db.connection import connection
+
+FTS_TABLE = "emails_fts"
+FTS_COLUMNS = ("subject", "body", "snippet", "sender", "recipient")
+
+# The trigram tokenizer indexes every 3-character window, so a MATCH on a
+# quoted phrase behaves like a case-insensitive substring search. Shorter
+# needles cannot be looked up in the index.
+MIN_FTS_TERM_LENGTH = 3
+
+def has_fts_index(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+    return row is not None
+
+def create_fts_index(conn):
+    """
+    Create the emails_fts trigram index over the text columns of emails, the
+    triggers that keep it in sync, and populate it from existing rows.
+
+    The index is an external-content table keyed by the emails rowid; rebuild
+    it with rebuild_fts_index after a VACUUM, which may renumber rowids.
+    """
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+
+    conn.executescript(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {columns}, content='emails', content_rowid='rowid', tokenize='trigram'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON emails BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.rowid, {new_values});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON emails BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON emails BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.rowid, {new_values});
+    END;
+    """)
+    rebuild_fts_index(conn)
+
+def rebuild_fts_index(conn):
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    conn.commit()
+
+def drop_fts_index(conn):
+    conn.executescript(f"""
+    DROP TRIGGER IF EXISTS {FTS_TABLE}_ai;
+    DROP TRIGGER IF EXISTS {FTS_TABLE}_ad;
+    DROP TRIGGER IF EXISTS {FTS_TABLE}_au;
+    DROP TABLE IF EXISTS {FTS_TABLE};
+    """)
+
+def can_use_fts(field, value):
+    """
+    True if `field LIKE '%value%'` can be answered from the trigram index:
+    the column is indexed, the needle is long enough, and it has no LIKE
+    wildcards (which a phrase query would take literally).
+    """
+    return (
+        field in FTS_COLUMNS
+        and len(value) >= MIN_FTS_TERM_LENGTH
+        and "%" not in value
+        and "_" not in value
+    )
+
+def fts_phrase_query(field, value):
+    """Build a MATCH expression searching `value` as a phrase in one column."""
+    escaped = value.replace('"', '""')
+    return f'{field} : "{escaped}"'
+
+if __name__ == "__main__":
+    with connection() as conn:
+        create_fts_index(conn)
+    print(f"Full-text index {FTS_TABLE} created.")
@@ -0,0 +1,156 @@
+import logging
+from gmail.auth import get_gmail_service
+from gmail.fetcher import get_messages, iter_message_ids, parse_message
+from gmail.history import HistoryExpiredError, get_history_id, list_history, summarize_history
+from gmail.utils import get_error_status, get_inbox_type
+from db.connection import connection, transaction
+from db.populate_emails import store_emails_in_db, upsert_email
+HISTORY_ID_KEY = "history_id"
+
+logger = logging.getLogger(__name__)
+
+class MessageFetchError(Exception):
+    """Messages the sync must store could not be fetched; the checkpoint is left where it was."""
+    pass
+
+def get_sync_state(conn, key):
+    """Return the sync_state value stored under `key`, or None."""
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def save_sync_state(conn, key, value):
+    conn.execute("""
+    INSERT INTO sync_state (key, value) VALUES (?, ?)
+    ON CONFLICT(key) DO UPDATE SET value=excluded.value
+    """, (key, value))
+
+def get_checkpoint(conn):
+    """Return the historyId stored by the last sync, or None."""
+    return get_sync_state(conn, HISTORY_ID_KEY)
+
+def save_checkpoint(conn, history_id):
+    save_sync_state(conn, HISTORY_ID_KEY, str(history_id))
+
+def fetch_sync_messages(service, message_ids):
+    """
+    Fetch the message resources a sync has to store, in `message_ids` order.
+    Messages Gmail no longer has (404) are skipped. Any other failure raises
+    MessageFetchError before anything is written, so the checkpoint does not
+    move past them and the next sync fetches them again.
+    """
+    errors = {}
+    fetched = get_messages(service, message_ids, mode="batch", errors=errors)
+    failed = [
+        message_id for message_id in message_ids
+        if fetched.get(message_id) is None and get_error_status(errors.get(message_id)) != 404
+    ]
+    if failed:
+        raise MessageFetchError(f"Failed to fetch {len(failed)} of {len(message_ids)} messages, e.g. {failed[0]}")
+    return [fetched[message_id] for message_id in message_ids if fetched.get(message_id) is not None]
+
+def apply_history(conn, service, records, new_emails=None):
+    """
+    Apply history records to the emails table: fetch and upsert added messages,
+    delete removed ones and refresh is_read / is_starred / inbox_type of
+    messages whose labels changed. The parsed added messages are appended to
+    `new_emails` when given.
+    """
+    added_ids, deleted_ids, labels_by_id = summarize_history(records)
+    messages = fetch_sync_messages(service, added_ids)
+    cursor = conn.cursor()
+
+    for msg_data in messages:
+        email = parse_message(msg_data)
+        upsert_email(cursor, email)
+        if new_emails is not None:
+            new_emails.append(email)
+
+    cursor.executemany("DELETE FROM emails WHERE id = ?", [(message_id,) for message_id in deleted_ids])
+    cursor.executemany(
+        "UPDATE emails SET is_read = ?, is_starred = ?, inbox_type = ? WHERE id = ?",
+        [
+            ("UNREAD" not in label_ids, "STARRED" in label_ids, get_inbox_type(label_ids), message_id)
+            for message_id, label_ids in labels_by_id.items()
+        ]
+    )
+    return {"added": len(messages), "deleted": len(deleted_ids), "updated": len(labels_by_id)}
+
+def full_sync(service):
+    """
+    Sync the whole mailbox and checkpoint the historyId read *before* listing,
+    so changes made while the sync runs are picked up by the next incremental run.
+
+    The mailbox is listed again once the messages are stored: listed messages
+    that are still missing (their fetch failed) are fetched again, and stored
+    messages Gmail no longer lists (deleted while no history was kept) are
+    removed. Only message IDs are held in memory for this. SPAM and TRASH are
+    listed too, as the incremental path keeps those messages.
+    """
+    history_id = get_history_id(service)
+    stored = store_emails_in_db(max_results=None, service=service, include_spam_trash=True)
+
+    pages = iter_message_ids(service, raise_errors=True, include_spam_trash=True)
+    listed = [message_id for page in pages for message_id in page]
+    listed_ids = set(listed)
+    with connection() as conn:
+        known_ids = {row[0] for row in conn.execute("SELECT id FROM emails")}
+    messages = fetch_sync_messages(service, [message_id for message_id in listed if message_id not in known_ids])
+    removed_ids = known_ids - listed_ids
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        for msg_data in messages:
+            upsert_email(cursor, parse_message(msg_data))
+        cursor.executemany("DELETE FROM emails WHERE id = ?", [(message_id,) for message_id in removed_ids])
+        save_checkpoint(conn, history_id)
+    return {
+        "mode": "full", "added": stored + len(messages), "deleted": len(removed_ids), "updated": 0,
+        "history_id": history_id,
+    }
+
+def sync_changes(service, new_emails=None):
+    """
+    Bring the emails table up to date with Gmail and return the sync stats.
+
+    Uses the history API from the stored historyId checkpoint, so a run costs
+    O(changes) instead of O(mailbox). Falls back to a full sync on the first
+    run or when Gmail has expired the checkpointed history. Messages added
+    since the checkpoint are appended to `new_emails` when given; a full sync
+    appends nothing.
+
+    Raises MessageFetchError, without moving the checkpoint, when messages
+    could not be fetched for any reason other than having been deleted.
+    """
+    with connection() as conn:
+        start_history_id = get_checkpoint(conn)
+
+    if start_history_id is None:
+        logger.info("No sync checkpoint found, running a full sync")
+        stats = full_sync(service)
+    else:
+        try:
+            records, history_id = list_history(service, start_history_id)
+        except HistoryExpiredError as e:
+            logger.warning(f"{e}, running a full sync")
+            stats = full_sync(service)
+        else:
+            with transaction() as conn:
+                stats = apply_history(conn, service, records, new_emails)
+                save_checkpoint(conn, history_id)
+            stats.update({"mode": "incremental", "history_id": history_id})
+    return stats
+
+def sync_emails(service=None):
+    """Sync the emails table with Gmail (see sync_changes) and print a summary."""
+    if service is None:
+        service = get_gmail_service()
+
+    stats = sync_changes(service)
+    print(
+        f"{stats['mode'].capitalize()} sync complete: {stats['added']} added, "
+        f"{stats['deleted']} deleted, {stats['updated']} updated."
+    )
+    return stats
+
+if __name__ == "__main__":
+    sync_emails()
@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from db.connection import connection
+
+# Ordered schema steps. Never edit a released step; append a new one instead.
+MIGRATIONS = [
+    (1, "create emails table", [
+        """
+        CREATE TABLE IF NOT EXISTS emails (
+            id TEXT PRIMARY KEY,
+            subject TEXT,
+            sender TEXT,
+            recipient TEXT,
+            snippet TEXT,
+            body TEXT,
+            received_at TEXT,
+            is_read BOOLEAN,
+            is_starred BOOLEAN,
+            inbox_type TEXT
+        )
+        """,
+    ]),
+    (2, "create sync_state table", [
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """,
+    ]),
+    (3, "index filterable email columns", [
+        "CREATE INDEX IF NOT EXISTS idx_emails_received_at ON emails (received_at)",
+        "CREATE INDEX IF NOT EXISTS idx_emails_sender ON emails (sender)",
+        "CREATE INDEX IF NOT EXISTS idx_emails_recipient ON emails (recipient)",
+        "CREATE INDEX IF NOT EXISTS idx_emails_inbox_type ON emails (inbox_type)",
+        "CREATE INDEX IF NOT EXISTS idx_emails_is_read ON emails (is_read)",
+    ]),
+]
+
+def get_schema_version(conn):
+    """Return the highest applied migration version, or 0 for a fresh database."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def migrate(conn, target_version=None, migrations=MIGRATIONS):
+    """
+    Apply every pending migration up to `target_version` (default: latest),
+    each in its own transaction. Returns the list of applied versions.
+    """
+    current = get_schema_version(conn)
+    conn.commit()
+
+    applied = []
+    for version, description, statements in migrations:
+        if version <= current or (target_version is not None and version > target_version):
+            continue
+        conn.execute("BEGIN")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+if __name__ == "__main__":
+    with connection() as conn:
+        applied = migrate(conn)
+        print(f"Applied migrations: {applied or 'none'}. Schema version: {get_schema_version(conn)}.")
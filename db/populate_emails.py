@@ -1,67 +1,107 @@
 from datetime import datetime, timezone
-import sqlite3
-from gmail.client import fetch_emails
-import re
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+import argparse
+import logging
+from gmail import metrics
+from gmail.client import iter_emails
+from db.bulk_loader import EMAIL_COLUMNS, UPSERT_EMAIL_SQL, bulk_load_emails, email_to_row
 
-DB_FILE = "emails.db"
+COMMIT_EVERY = 500
+RECEIVED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Bulk mail shares Date headers, so a sync sees far fewer distinct values than messages.
+RECEIVED_AT_CACHE_SIZE = 65536
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=RECEIVED_AT_CACHE_SIZE)
 def parse_received_at(received_at_str):
-    received_at_str = re.sub(r"\s*\(.*\)$", "", received_at_str)
-    received_at_str = re.sub(r"\sGMT$", " +0000", received_at_str)
-    formats = [
-        "%a, %d %b %Y %H:%M:%S %z",
-        "%d %b %Y %H:%M:%S %z",
-    ]
-    for fmt in formats:
+    """
+    Normalize an RFC 2822 Date header to a UTC "%Y-%m-%d %H:%M:%S" string, or
+    None if it cannot be parsed. Results are cached per raw header, so an
+    unparseable value is only reported once.
+    """
+    if not received_at_str:
+        return None
+    try:
+        dt = parsedate_to_datetime(received_at_str)
+    except (TypeError, ValueError):
+        logger.warning(f"Could not parse received_at '{received_at_str}'")
+        metrics.increment("db_received_at_parse_errors_total")
+        return None
+    if dt.tzinfo is not None:
+        # Naive results come from "-0000" headers, which RFC 2822 defines as UTC.
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime(RECEIVED_AT_FORMAT)
+
+def internal_date_to_received_at(internal_date):
+    """Convert Gmail's internalDate (epoch milliseconds, as a string) to a UTC received_at string."""
+    return datetime.fromtimestamp(int(internal_date) / 1000, timezone.utc).strftime(RECEIVED_AT_FORMAT)
+
+def fetched_received_at(email):
+    """
+    received_at for an email from gmail.fetcher: Gmail's internalDate when the
+    message carries one, so most messages skip header parsing, else the Date header.
+    """
+    internal_date = email.get("internal_date")
+    if internal_date:
         try:
-            dt = datetime.strptime(received_at_str, fmt)
-            return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            continue
-    print(f"Warning: Could not parse received_at '{received_at_str}'")
-    return None
+            return internal_date_to_received_at(internal_date)
+        except (TypeError, ValueError, OverflowError, OSError):
+            pass
+    return parse_received_at(email.get("received_at"))
 
-def store_emails_in_db(max_results=500):
+def fetched_email_to_row(email):
+    """Convert an email from gmail.fetcher into a DB row, normalizing received_at to UTC."""
+    return email_to_row(dict(email, received_at=fetched_received_at(email)))
+
+def fetched_email_to_record(email):
+    """Convert an email from gmail.fetcher into a dict keyed by emails table columns."""
+    return dict(zip(EMAIL_COLUMNS, fetched_email_to_row(email)))
+
+def upsert_email(cursor, email):
+    """Insert a fetched email, or refresh the stored row if it already exists."""
+    cursor.execute(UPSERT_EMAIL_SQL, fetched_email_to_row(email))
+
+def store_emails_in_db(max_results=500, query=None, label_ids=None, service=None, include_spam_trash=False):
     """
     Fetch emails using Gmail API and store them in SQLite.
+
+    Emails are streamed page by page into the bulk loader, which commits every
+    COMMIT_EVERY rows, so the mailbox is never held in memory. max_results=None
+    syncs every message matching `query` / `label_ids`. A `service` can be
+    passed to reuse one. SPAM and TRASH are only fetched with `include_spam_trash`.
     """
-    emails = fetch_emails(max_results=max_results)
-    if not emails:
+    emails = iter_emails(
+        max_results=max_results, query=query, label_ids=label_ids, service=service,
+        include_spam_trash=include_spam_trash
+    )
+    with metrics.timer("db_store_seconds"):
+        stats = bulk_load_emails(emails, batch_size=COMMIT_EVERY, to_row=fetched_email_to_row)
+    metrics.increment("db_emails_stored_total", stats["rows"])
+    if not stats["rows"]:
         return 0
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    for email in emails:
-        iso_received_at = parse_received_at(email.get("received_at"))
-        
-        cursor.execute("""
-        INSERT INTO emails (id, subject, sender, recipient, snippet, body, received_at, is_read, is_starred, inbox_type)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(id) DO UPDATE SET
-            subject=excluded.subject,
-            sender=excluded.sender,
-            recipient=excluded.recipient,
-            snippet=excluded.snippet,
-            body=excluded.body,
-            received_at=excluded.received_at
-        """, (
-            email.get("id"),
-            email.get("subject"),
-            email.get("from"),
-            email.get("to"),
-            email.get("snippet"),
-            email.get("body", ""),
-            iso_received_at,
-            email.get("is_read"),
-            email.get("is_starred"),
-            email.get("inbox_type")
-        ))
-
-    conn.commit()
-    conn.close()
-    print(f"{len(emails)} emails stored in the database.")
-    return len(emails)
+    print(f"{stats['rows']} emails stored in the database ({stats['rows_per_sec']:.0f} rows/sec).")
+    return stats["rows"]
 
 if __name__ == "__main__":
-    store_emails_in_db()
+    parser = argparse.ArgumentParser(description="Fetch emails from Gmail and store them in SQLite.")
+    parser.add_argument("--max-results", type=int, default=500, help="Maximum number of emails to fetch")
+    parser.add_argument("--all", action="store_true", help="Walk every page of the mailbox (ignores --max-results)")
+    parser.add_argument("--query", help="Gmail search query, e.g. 'newer_than:7d'")
+    parser.add_argument("--label", action="append", dest="label_ids", help="Only fetch messages with this label (repeatable)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only apply changes since the last sync (full sync the first time)")
+    args = parser.parse_args()
+
+    if args.incremental:
+        from db.incremental_sync import sync_emails
+        sync_emails()
+    else:
+        store_emails_in_db(
+            max_results=None if args.all else args.max_results,
+            query=args.query,
+            label_ids=args.label_ids,
+        )
+    metrics.export_reports()
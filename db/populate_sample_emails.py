@@ -1,8 +1,6 @@
-import sqlite3
 from datetime import datetime, timedelta, timezone
 import random
-
-DB_FILE = "emails.db"
+from db.bulk_loader import bulk_load_emails
 
 def generate_sample_emails(n=100):
     subjects = ["Hello", "Meeting", "Invoice", "Greetings", "Update", "Reminder", "Project", "Follow-up", "Newsletter", "Alert"]
@@ -36,36 +34,8 @@ def generate_sample_emails(n=100):
     return emails
 
 def store_sample_emails(emails):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    for email in emails:
-        cursor.execute("""
-        INSERT INTO emails (id, subject, sender, recipient, snippet, body, received_at, is_read, is_starred, inbox_type)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(id) DO UPDATE SET
-            subject=excluded.subject,
-            sender=excluded.sender,
-            recipient=excluded.recipient,
-            snippet=excluded.snippet,
-            body=excluded.body,
-            received_at=excluded.received_at
-        """, (
-            email["id"],
-            email["subject"],
-            email["from"],
-            email["to"],
-            email["snippet"],
-            email["body"],
-            email["received_at"],
-            email["is_read"],
-            email["is_starred"],
-            email["inbox_type"]
-        ))
-
-    conn.commit()
-    conn.close()
-    print(f"{len(emails)} sample emails stored in the database.")
+    stats = bulk_load_emails(emails)
+    print(f"{stats['rows']} sample emails stored in the database.")
 
 if __name__ == "__main__":
     sample_emails = generate_sample_emails(100)
@@ -1,13 +1,27 @@
 from datetime import datetime, timedelta
-from typing import Tuple, List
+from typing import List, Optional, Sequence, Tuple
+from db.fts import FTS_TABLE, can_use_fts, fts_phrase_query
+from gmail.utils import INBOX_TYPE_PRECEDENCE
 
-def rules_to_sql_query(rules_data: dict) -> Tuple[str, List]:
+def relative_days(value: str) -> int:
+    """Convert a relative date value such as "5 days" or "2 months" into days."""
+    number, unit = value.split()
+    number = int(number)
+    if unit.lower().startswith("month"):
+        return number * 30
+    return number
+
+def rules_to_where_clause(rules_data: dict, use_fts: bool = False) -> Tuple[str, List]:
     """
-    Convert JSON rules into a SQL query with parameters.
-    
+    Convert JSON rules into a SQL boolean expression with parameters.
+
+    With use_fts=True, `contains` predicates that the emails_fts trigram index
+    can answer are looked up there first and re-checked with LIKE, so results
+    are identical to the plain LIKE scan.
+
     Returns:
-        query (str): SQL query string with placeholders
-        params (list): List of parameters for the query
+        where_clause (str): SQL expression with placeholders
+        params (list): List of parameters for the expression
     """
     rules_predicate = rules_data.get("rules_predicate", "all").lower()
     conditions = rules_data.get("rules", [])
@@ -21,7 +35,12 @@ def rules_to_sql_query(rules_data: dict) -> Tuple[str, List]:
         value = cond["value"]
 
         if field in ("sender", "recipient", "subject", "body", "snippet"):
-            if predicate == "contains":
+            if predicate == "contains" and use_fts and can_use_fts(field, value):
+                sql_clauses.append(
+                    f"(rowid IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?) AND {field} LIKE ?)"
+                )
+                params.extend([fts_phrase_query(field, value), f"%{value}%"])
+            elif predicate == "contains":
                 sql_clauses.append(f"{field} LIKE ?")
                 params.append(f"%{value}%")
             elif predicate == "does_not_contain":
@@ -37,12 +56,7 @@ def rules_to_sql_query(rules_data: dict) -> Tuple[str, List]:
                 raise ValueError(f"Unknown string predicate: {predicate}")
 
         elif field == "received_at":
-            number, unit = value.split()
-            number = int(number)
-            if unit.lower().startswith("month"):
-                delta_days = number * 30
-            else:
-                delta_days = number
+            delta_days = relative_days(value)
 
             if predicate == "less_than":
                 sql_clauses.append(f"{field} >= datetime('now', ?)")
@@ -58,6 +72,121 @@ def rules_to_sql_query(rules_data: dict) -> Tuple[str, List]:
 
     connector = " AND " if rules_predicate == "all" else " OR "
     where_clause = connector.join(sql_clauses) if sql_clauses else "1=1"
+    return where_clause, params
+
+def move_shows_in_inbox_type(folder: str) -> bool:
+    """
+    True if inbox_type reads `folder` after any move to it: no type that
+    outranks it can survive the move (moves out of the inbox remove INBOX).
+    Only TRASH qualifies; a SENT message moved to SPAM still reads SENT, and
+    a trashed one moved anywhere but TRASH still reads TRASH.
+    """
+    if folder not in INBOX_TYPE_PRECEDENCE:
+        return False
+    outranking = INBOX_TYPE_PRECEDENCE[:INBOX_TYPE_PRECEDENCE.index(folder)]
+    return not [inbox_type for inbox_type in outranking if inbox_type != "INBOX"]
+
+def pending_action_clause(action_str: str) -> Optional[Tuple[str, List]]:
+    """
+    SQL expression that is true while `action_str` still has an effect on a
+    row, or None if the stored columns cannot tell. NULL columns count as not
+    done yet. Moves are only checked when inbox_type is certain to show the
+    folder once applied (move_shows_in_inbox_type).
+    """
+    action_name, _, folder = action_str.partition(":")
+    if action_name == "mark_as_read":
+        return "COALESCE(is_read, 0) = 0", []
+    if action_name == "mark_as_unread":
+        return "COALESCE(is_read, 1) != 0", []
+    if action_name == "move_message" and move_shows_in_inbox_type(folder):
+        return "COALESCE(inbox_type, '') != ?", [folder]
+    return None
+
+def pending_actions_clause(actions: List[str]) -> Optional[Tuple[str, List]]:
+    """
+    SQL expression that is true for rows where at least one of `actions`
+    still has an effect, or None if that cannot be decided from the stored
+    columns (an action on an untracked label, or no actions at all).
+    """
+    clauses = []
+    params = []
+    for action_str in actions:
+        pending = pending_action_clause(action_str)
+        if pending is None:
+            return None
+        clauses.append(pending[0])
+        params.extend(pending[1])
+    if not clauses:
+        return None
+    return f"({' OR '.join(clauses)})", params
+
+def select_list(columns: Optional[Sequence[str]]) -> str:
+    """Comma-separated column list for a SELECT, or "*" for every column."""
+    return ", ".join(columns) if columns else "*"
+
+def rules_to_sql_query(rules_data: dict, use_fts: bool = False,
+                       columns: Optional[Sequence[str]] = None,
+                       pending_only: bool = False) -> Tuple[str, List]:
+    """
+    Convert JSON rules into a SQL query with parameters.
+    use_fts routes eligible `contains` predicates through the emails_fts index.
+    columns limits the selected columns (default: all of them).
+    pending_only skips rows the rule's actions have already been applied to.
+    
+    Returns:
+        query (str): SQL query string with placeholders
+        params (list): List of parameters for the query
+    """
+    where_clause, params = rules_to_where_clause(rules_data, use_fts)
+    pending = pending_actions_clause(rules_data.get("actions", [])) if pending_only else None
+    if pending is not None:
+        where_clause = f"({where_clause}) AND {pending[0]}"
+        params = params + pending[1]
+    query = f"SELECT {select_list(columns)} FROM emails WHERE {where_clause};"
+    return query, params
+
+def rule_match_column(index: int) -> str:
+    """Name of the per-rule-set match flag selected by rule_sets_to_sql_query."""
+    return f"rule_{index}"
+
+def rule_sets_to_sql_query(rule_sets: List[dict], use_fts: bool = False,
+                           columns: Optional[Sequence[str]] = None,
+                           pending_only: bool = False) -> Tuple[str, List]:
+    """
+    Convert several rule sets into one SQL query that scans the emails table
+    once. Every row matching at least one rule set is returned together with a
+    rule_<i> column that is 1 when rule set i matched and 0 otherwise.
+    columns limits the selected email columns (default: all of them).
+    pending_only skips rows where no matching rule set's actions are still
+    pending; the rule_<i> flags themselves are unaffected, so stop_processing
+    behaves as before.
+
+    Returns:
+        query (str): SQL query string with placeholders
+        params (list): List of parameters for the query
+    """
+    if not rule_sets:
+        raise ValueError("At least one rule set is required")
+
+    if pending_only and columns:
+        # The pending filter is applied outside the subquery, on its columns.
+        columns = list(columns) + [column for column in ("is_read", "inbox_type") if column not in columns]
+
+    flag_columns = []
+    params = []
+    for index, rule_set in enumerate(rule_sets):
+        where_clause, clause_params = rules_to_where_clause(rule_set, use_fts)
+        flag_columns.append(f"CASE WHEN {where_clause} THEN 1 ELSE 0 END AS {rule_match_column(index)}")
+        params.extend(clause_params)
 
-    query = f"SELECT * FROM emails WHERE {where_clause};"
+    matches = []
+    for index, rule_set in enumerate(rule_sets):
+        match = f"{rule_match_column(index)} = 1"
+        pending = pending_actions_clause(rule_set.get("actions", [])) if pending_only else None
+        if pending is not None:
+            match = f"({match} AND {pending[0]})"
+            params.extend(pending[1])
+        matches.append(match)
+    any_match = " OR ".join(matches)
+    query = f"SELECT * FROM (SELECT {select_list(columns)}, {', '.join(flag_columns)} FROM emails) WHERE {any_match};"
     return query, params
@@ -0,0 +1,135 @@
+"""
+Seeded, streaming generator of realistic synthetic mailboxes for benchmarks.
+
+Unlike populate_sample_emails (100 near-identical rows), generate_mailbox can
+produce millions of emails lazily, and the same seed always yields the same
+mailbox:
+
+  * senders follow a Zipf distribution over `senders` addresses, so a few
+    senders dominate as in real inboxes;
+  * subject and body words are Zipf-distributed over a vocabulary of common
+    email words plus a long tail of synthetic words;
+  * body sizes are log-normal, from a few bytes up to `max_body` (256 KiB);
+  * received_at values are spread over `years` years before `end`, in
+    chronological order;
+  * is_read, is_starred and inbox_type follow fixed ratios.
+
+    python -m db.synthetic_mailbox --rows 1000000 --seed 1
+"""
+import argparse
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from db.bulk_loader import DEFAULT_BATCH_SIZE, bulk_load_emails
+from db.create_emails_table import create_emails_table
+
+DEFAULT_SEED = 0
+DEFAULT_SENDERS = 10_000
+DEFAULT_YEARS = 3
+# Fixed so that a seed reproduces the same received_at values on any day.
+DEFAULT_END = datetime(2025, 10, 13, tzinfo=timezone.utc)
+MEDIAN_BODY = 1500
+BODY_SIGMA = 1.4
+MAX_BODY = 256 * 1024
+SNIPPET_LENGTH = 100
+ZIPF_EXPONENT = 1.1
+
+READ_RATIO = 0.85
+STARRED_RATIO = 0.02
+INBOX_TYPE_WEIGHTS = {"INBOX": 70, "SENT": 15, "TRASH": 5, "SPAM": 5, "OTHER": 5}
+
+STOP_WORDS = ["the", "to", "and", "your", "for", "you", "of", "a", "in", "is", "on", "with", "this", "please"]
+TOPIC_WORDS = [
+    "invoice", "meeting", "project", "update", "reminder", "newsletter", "alert", "payment", "order",
+    "shipment", "account", "security", "password", "welcome", "offer", "discount", "report", "weekly",
+    "quarterly", "budget", "review", "schedule", "team", "launch", "release", "customer", "support",
+    "ticket", "feedback", "survey", "subscription", "renewal", "receipt", "statement", "delivery",
+]
+DOMAINS = ["example.com", "mail.example", "shop.example", "news.example", "corp.example", "bank.example"]
+SUBJECT_PREFIXES = ["", "", "", "", "Re: ", "Fwd: "]
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "qu", "ba", "do", "fe", "gi", "ho"]
+TAIL_WORDS = 5000
+CORPUS_WORDS = 200_000
+
+def zipf_cum_weights(n, exponent=ZIPF_EXPONENT):
+    """Cumulative Zipf weights for ranks 1..n, for random.choices(cum_weights=...)."""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+def build_vocabulary(rng, tail_words=TAIL_WORDS):
+    """Common email words first (the most frequent ranks), then synthetic tail words."""
+    words = STOP_WORDS + TOPIC_WORDS
+    seen = set(words)
+    while len(words) < len(STOP_WORDS) + len(TOPIC_WORDS) + tail_words:
+        word = "".join(rng.choices(SYLLABLES, k=rng.randrange(2, 5)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+def build_senders(rng, count):
+    domain_weights = zipf_cum_weights(len(DOMAINS))
+    return [f"user{rank}@{rng.choices(DOMAINS, cum_weights=domain_weights)[0]}" for rank in range(count)]
+
+def body_size(rng, median=MEDIAN_BODY, sigma=BODY_SIGMA, maximum=MAX_BODY):
+    return max(1, min(maximum, int(rng.lognormvariate(math.log(median), sigma))))
+
+def generate_mailbox(n, seed=DEFAULT_SEED, senders=DEFAULT_SENDERS, years=DEFAULT_YEARS, end=DEFAULT_END,
+                     median_body=MEDIAN_BODY, max_body=MAX_BODY):
+    """
+    Yield `n` email dicts (the "from"/"to" shape bulk_load_emails expects)
+    without materializing them. Bodies are slices of one shared Zipf-worded
+    corpus, so generating them costs the same for 100 bytes as for 100 KiB.
+    """
+    rng = random.Random(seed)
+    vocabulary = build_vocabulary(rng)
+    word_weights = zipf_cum_weights(len(vocabulary))
+    subject_vocabulary = vocabulary[len(STOP_WORDS):]
+    subject_weights = zipf_cum_weights(len(subject_vocabulary))
+    sender_list = build_senders(rng, senders)
+    sender_weights = zipf_cum_weights(senders)
+    inbox_types = list(INBOX_TYPE_WEIGHTS)
+    inbox_type_weights = list(accumulate(INBOX_TYPE_WEIGHTS.values()))
+
+    corpus = " ".join(rng.choices(vocabulary, cum_weights=word_weights, k=CORPUS_WORDS))
+    while len(corpus) < 2 * max_body + 64:
+        corpus += " " + corpus
+
+    span = years * 365 * 86400
+    received = end - timedelta(seconds=span)
+    mean_gap = span / max(n, 1)
+
+    for i in range(n):
+        received += timedelta(seconds=rng.expovariate(1 / mean_gap))
+        size = body_size(rng, median_body, maximum=max_body)
+        offset = corpus.find(" ", rng.randrange(len(corpus) - size - 64)) + 1
+        body = corpus[offset:offset + size]
+        subject_words = rng.choices(subject_vocabulary, cum_weights=subject_weights, k=rng.randrange(2, 9))
+        yield {
+            "id": f"{i:016x}",
+            "subject": rng.choice(SUBJECT_PREFIXES) + " ".join(subject_words).capitalize(),
+            "from": rng.choices(sender_list, cum_weights=sender_weights)[0],
+            "to": "me@example.com",
+            "snippet": body[:SNIPPET_LENGTH],
+            "body": body,
+            "received_at": min(received, end).strftime("%Y-%m-%d %H:%M:%S"),
+            "is_read": int(rng.random() < READ_RATIO),
+            "is_starred": int(rng.random() < STARRED_RATIO),
+            "inbox_type": rng.choices(inbox_types, cum_weights=inbox_type_weights)[0],
+        }
+
+def populate_mailbox(n, seed=DEFAULT_SEED, db_path=None, batch_size=DEFAULT_BATCH_SIZE, **options):
+    """Stream a synthetic mailbox into the emails table. Returns the bulk_load_emails stats."""
+    return bulk_load_emails(generate_mailbox(n, seed=seed, **options), db_path, batch_size=batch_size)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a reproducible synthetic mailbox into the database.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--senders", type=int, default=DEFAULT_SENDERS)
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS)
+    args = parser.parse_args()
+
+    create_emails_table()
+    stats = populate_mailbox(args.rows, seed=args.seed, senders=args.senders, years=args.years)
+    print(f"{stats['rows']:,} synthetic emails stored in the database ({stats['rows_per_sec']:,.0f} rows/sec).")
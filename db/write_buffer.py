@@ -0,0 +1,100 @@
+import threading
+from typing import NamedTuple
+from db.connection import transaction
+
+DEFAULT_FLUSH_SIZE = 1000
+
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds).
+MAX_IDS_PER_UPDATE = 500
+
+class SqlExpression(NamedTuple):
+    """A column value computed in SQL, e.g. from the column's current value."""
+    sql: str
+    params: tuple = ()
+
+class EmailWriteBuffer:
+    """
+    Run-scoped buffer for the emails-table side effects of actions.
+
+    Actions record column values only after their Gmail call succeeded; the
+    buffer coalesces them per email (last write wins) and flushes them as
+    `UPDATE emails SET ... WHERE id IN (...)` statements, one per distinct
+    set of values, in a single transaction. It flushes automatically once
+    `flush_size` emails are pending, and on leaving a `with` block.
+    """
+
+    def __init__(self, db_path=None, flush_size=DEFAULT_FLUSH_SIZE):
+        self.db_path = db_path
+        self.flush_size = flush_size
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, message_id, **columns):
+        """Record new column values (plain values or SqlExpression) for one email."""
+        self.record_many([message_id], **columns)
+
+    def record_many(self, message_ids, **columns):
+        """Record the same new column values for many emails."""
+        if not columns:
+            return
+        with self._lock:
+            for message_id in message_ids:
+                self._pending.setdefault(message_id, {}).update(columns)
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write all pending values in one transaction. Returns the number of emails written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            groups = {}
+            for message_id, columns in pending.items():
+                groups.setdefault(tuple(sorted(columns.items())), []).append(message_id)
+
+            with transaction(self.db_path) as conn:
+                for assignments, ids in groups.items():
+                    set_clause, params = build_set_clause(assignments)
+                    for start in range(0, len(ids), MAX_IDS_PER_UPDATE):
+                        chunk = ids[start:start + MAX_IDS_PER_UPDATE]
+                        placeholders = ", ".join("?" for _ in chunk)
+                        conn.execute(
+                            f"UPDATE emails SET {set_clause} WHERE id IN ({placeholders})",
+                            (*params, *chunk)
+                        )
+            return len(pending)
+
+def record_email_updates(writes, message_ids, **columns):
+    """
+    Record new column values for emails into the run-scoped `writes` buffer,
+    or write them in one transaction right away when there is none.
+    """
+    buffer = writes if writes is not None else EmailWriteBuffer()
+    buffer.record_many(message_ids, **columns)
+    if writes is None:
+        buffer.flush()
+
+def build_set_clause(assignments):
+    """Build the SET clause and its params from (column, value) pairs."""
+    parts = []
+    params = []
+    for column, value in assignments:
+        if isinstance(value, SqlExpression):
+            parts.append(f"{column} = {value.sql}")
+            params.extend(value.params)
+        else:
+            parts.append(f"{column} = ?")
+            params.append(value)
+    return ", ".join(parts), params
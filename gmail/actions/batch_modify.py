@@ -0,0 +1,80 @@
+from gmail import metrics
+from gmail.auth import get_gmail_service
+from gmail.client import batch_modify as api_batch_modify
+from gmail.utils import INBOX_TYPE_PRECEDENCE
+from db.write_buffer import SqlExpression, record_email_updates
+
+def get_read_state(add_labels, remove_labels):
+    """
+    Return the is_read value implied by a label delta, or None if it leaves it unchanged.
+    """
+    if "UNREAD" in remove_labels:
+        return 1
+    if "UNREAD" in add_labels:
+        return 0
+    return None
+
+def get_starred_state(add_labels, remove_labels):
+    """
+    Return the is_starred value implied by a label delta, or None if it leaves it unchanged.
+    """
+    if "STARRED" in add_labels:
+        return 1
+    if "STARRED" in remove_labels:
+        return 0
+    return None
+
+def get_inbox_type_update(add_labels, remove_labels):
+    """
+    Return the SqlExpression for inbox_type after a label delta, or None if
+    the delta leaves it unchanged. It follows get_inbox_type's precedence: the
+    highest added label wins unless the stored type outranks it and is not
+    removed. batchModify returns no labels, so an email losing its stored
+    type without gaining one is assumed to become OTHER; the next sync
+    corrects the rare message that also carries a lower-ranked label.
+    """
+    added = next((label for label in INBOX_TYPE_PRECEDENCE if label in add_labels), None)
+    if added is None:
+        removed = [label for label in INBOX_TYPE_PRECEDENCE if label in remove_labels]
+        if not removed:
+            return None
+        placeholders = ", ".join("?" * len(removed))
+        return SqlExpression(
+            f"CASE WHEN inbox_type IN ({placeholders}) THEN ? ELSE inbox_type END", (*removed, "OTHER")
+        )
+
+    outranking = [
+        label for label in INBOX_TYPE_PRECEDENCE[:INBOX_TYPE_PRECEDENCE.index(added)] if label not in remove_labels
+    ]
+    if not outranking:
+        return SqlExpression("?", (added,))
+    placeholders = ", ".join("?" * len(outranking))
+    return SqlExpression(f"CASE WHEN inbox_type IN ({placeholders}) THEN inbox_type ELSE ? END", (*outranking, added))
+
+@metrics.timed("gmail_action_seconds", errors="gmail_action_errors_total", action="batch_modify")
+def batch_modify(message_ids, add_labels=(), remove_labels=(), service=None, writes=None):
+    """
+    Apply one label delta to many emails in Gmail and update the is_read,
+    is_starred and inbox_type columns in DB for the chunks that succeeded.
+    Uses the run-scoped `service` when given, otherwise builds one. With a
+    run-scoped `writes` buffer (db.write_buffer) the DB update is recorded there.
+    """
+    if service is None:
+        service = get_gmail_service()
+    results = api_batch_modify(service, message_ids, add_labels, remove_labels)
+
+    columns = {}
+    is_read = get_read_state(add_labels, remove_labels)
+    if is_read is not None:
+        columns["is_read"] = is_read
+    is_starred = get_starred_state(add_labels, remove_labels)
+    if is_starred is not None:
+        columns["is_starred"] = is_starred
+    inbox_type = get_inbox_type_update(add_labels, remove_labels)
+    if inbox_type is not None:
+        columns["inbox_type"] = inbox_type
+
+    succeeded = [message_id for result in results if result["error"] is None for message_id in result["ids"]]
+    record_email_updates(writes, succeeded, **columns)
+
+    return results
@@ -1,18 +1,17 @@
+from gmail import metrics
 from gmail.auth import get_gmail_service
 from gmail.client import mark_as_read as api_mark_as_read
-import sqlite3
+from db.write_buffer import record_email_updates
 
-DB_FILE = "emails.db"
-
-def mark_as_read(message_id):
+@metrics.timed("gmail_action_seconds", errors="gmail_action_errors_total", action="mark_as_read")
+def mark_as_read(message_id, service=None, writes=None):
     """
     Mark email as read in Gmail and update is_read column in DB.
+    Uses the run-scoped `service` when given, otherwise builds one. With a
+    run-scoped `writes` buffer (db.write_buffer) the DB update is recorded there.
     """
-    service = get_gmail_service()
+    if service is None:
+        service = get_gmail_service()
     api_mark_as_read(service, message_id)
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE emails SET is_read = 1 WHERE id = ?", (message_id,))
-    conn.commit()
-    conn.close()
+    record_email_updates(writes, [message_id], is_read=1)
@@ -6,3 +6,11 @@ def mark_as_unread(email_id, *args, **kwargs):
 
 def move_message(email_id, folder, *args, **kwargs):
     print(f"[MOCK] move_message called for email_id={email_id}, folder={folder}")
+
+def batch_modify(message_ids, add_labels=(), remove_labels=(), *args, **kwargs):
+    message_ids = list(message_ids)
+    print(f"[MOCK] batch_modify called for {len(message_ids)} emails, add={list(add_labels)}, remove={list(remove_labels)}")
+    return [{"ids": message_ids, "error": None}]
+
+def modify_labels(email_id, add_labels=(), remove_labels=(), *args, **kwargs):
+    print(f"[MOCK] modify_labels called for email_id={email_id}, add={list(add_labels)}, remove={list(remove_labels)}")
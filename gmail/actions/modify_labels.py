@@ -0,0 +1,29 @@
+from gmail import metrics
+from gmail.auth import get_gmail_service
+from gmail.client import modify_labels as api_modify_labels
+from gmail.actions.batch_modify import get_read_state
+from gmail.utils import get_inbox_type
+from db.write_buffer import record_email_updates
+
+@metrics.timed("gmail_action_seconds", errors="gmail_action_errors_total", action="modify_labels")
+def modify_labels(message_id, add_labels=(), remove_labels=(), service=None, writes=None):
+    """
+    Apply a planned label delta to one email in Gmail with a single modify call
+    and update the is_read, is_starred and inbox_type columns in DB.
+    Uses the run-scoped `service` when given, otherwise builds one. With a
+    run-scoped `writes` buffer (db.write_buffer) the DB update is recorded there.
+    """
+    if service is None:
+        service = get_gmail_service()
+    message = api_modify_labels(service, message_id, add_labels, remove_labels)
+
+    columns = {}
+    is_read = get_read_state(add_labels, remove_labels)
+    if is_read is not None:
+        columns["is_read"] = is_read
+    label_ids = message.get("labelIds") if message else None
+    if label_ids is not None:
+        columns["is_starred"] = int("STARRED" in label_ids)
+        columns["inbox_type"] = get_inbox_type(label_ids)
+
+    record_email_updates(writes, [message_id], **columns)
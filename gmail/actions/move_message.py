@@ -1,9 +1,24 @@
+from gmail import metrics
 from gmail.auth import get_gmail_service
 from gmail.client import move_message as api_move_message
+from gmail.utils import get_inbox_type
+from db.write_buffer import record_email_updates
 
-def move_message(message_id, folder):
+@metrics.timed("gmail_action_seconds", errors="gmail_action_errors_total", action="move_message")
+def move_message(message_id, folder, service=None, writes=None):
     """
-    Move email to a folder in Gmail (no DB update needed).
+    Move email to a folder in Gmail and update the is_starred and inbox_type
+    columns in DB from the labels Gmail returns for the moved message.
+    Uses the run-scoped `service` when given, otherwise builds one. With a
+    run-scoped `writes` buffer (db.write_buffer) the DB update is recorded there.
     """
-    service = get_gmail_service()
-    api_move_message(service, message_id, folder)
+    if service is None:
+        service = get_gmail_service()
+    message = api_move_message(service, message_id, folder)
+
+    label_ids = message.get("labelIds") if message else None
+    if label_ids is None:
+        return
+    record_email_updates(
+        writes, [message_id], is_starred=int("STARRED" in label_ids), inbox_type=get_inbox_type(label_ids)
+    )
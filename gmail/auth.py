@@ -1,33 +1,70 @@
+"""
+Gmail OAuth credentials and service construction.
+
+The Google client libraries take a few hundred milliseconds to import, so
+they are only imported when credentials or a service are first needed (PEP
+562 module __getattr__). Mock-mode runs and the stub service never load them.
+Names such as `build` remain module attributes, so they can still be patched.
+"""
 import os
 import json
 import logging
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+from importlib import import_module
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
 CREDENTIALS_FILE = "gmail/credentials.json"
 TOKEN_FILE = "token.json"
 
+LAZY_IMPORTS = {
+    "InstalledAppFlow": ("google_auth_oauthlib.flow", "InstalledAppFlow"),
+    "build": ("googleapiclient.discovery", "build"),
+    "Credentials": ("google.oauth2.credentials", "Credentials"),
+    "Request": ("google.auth.transport.requests", "Request"),
+}
+
 logger = logging.getLogger(__name__)
 
-def get_gmail_service():
+def __getattr__(name):
+    if name not in LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = LAZY_IMPORTS[name]
+    value = getattr(import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+def lazy(name):
+    """Return a lazily imported name, or the value patched over it."""
+    return globals()[name] if name in globals() else __getattr__(name)
+
+def get_credentials():
+    """
+    Load credentials from token.json, refreshing them if expired, or run the
+    OAuth flow when no valid token exists.
+    """
     creds = None
 
     if os.path.exists(TOKEN_FILE):
         with open(TOKEN_FILE, "r") as f:
             creds_data = json.load(f)
-            creds = Credentials.from_authorized_user_info(creds_data, SCOPES)
+            creds = lazy("Credentials").from_authorized_user_info(creds_data, SCOPES)
 
     if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
+        creds.refresh(lazy("Request")())
 
     if not creds or not creds.valid:
-        flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+        flow = lazy("InstalledAppFlow").from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
         creds = flow.run_local_server(port=0)
         with open(TOKEN_FILE, "w") as f:
             f.write(creds.to_json())
         logger.info(f"Saved new credentials to {TOKEN_FILE}")
 
-    return build("gmail", "v1", credentials=creds)
+    return creds
+
+def refresh_credentials(creds):
+    """Refresh expired credentials in place."""
+    creds.refresh(lazy("Request")())
+
+def get_gmail_service(creds=None):
+    if creds is None:
+        creds = get_credentials()
+    return lazy("build")("gmail", "v1", credentials=creds)
@@ -1,5 +1,11 @@
+import logging
 from gmail.auth import get_gmail_service
-from gmail.fetcher import fetch_inbox_emails
+from gmail.fetcher import fetch_inbox_emails, iter_inbox_emails
+
+# Gmail rejects batchModify requests carrying more than 1000 message IDs.
+BATCH_MODIFY_MAX_IDS = 1000
+
+logger = logging.getLogger(__name__)
 
 def mark_as_read(service, message_id):
     """
@@ -25,13 +31,14 @@ def move_message(service, message_id, folder):
     """
     Move an email to a folder (Gmail label). 
     If the folder is not INBOX, remove INBOX to "archive" it.
+    Returns the updated message (id, threadId, labelIds).
     """
     add_labels = [folder]
     remove_labels = []
     if folder != "INBOX":
         remove_labels.append("INBOX")
 
-    service.users().messages().modify(
+    return service.users().messages().modify(
         userId="me",
         id=message_id,
         body={
@@ -40,6 +47,85 @@ def move_message(service, message_id, folder):
         }
     ).execute()
 
-def fetch_emails(max_results=500):
+def modify_labels(service, message_id, add_labels=(), remove_labels=()):
+    """
+    Apply a label delta to one email with a single modify call.
+    Returns the updated message (id, threadId, labelIds).
+    """
+    return service.users().messages().modify(
+        userId="me",
+        id=message_id,
+        body={
+            "addLabelIds": list(add_labels),
+            "removeLabelIds": list(remove_labels)
+        }
+    ).execute()
+
+def get_label_delta(action_str):
+    """
+    Translate an action string (e.g. "move_message:TRASH") into the
+    (add_labels, remove_labels) tuples it applies. Returns None for unknown actions.
+    """
+    action_name, _, folder = action_str.partition(":")
+    folder = folder.strip()
+
+    if action_name == "mark_as_read":
+        return (), ("UNREAD",)
+    if action_name == "mark_as_unread":
+        return ("UNREAD",), ()
+    if action_name == "move_message" and folder:
+        return (folder,), (("INBOX",) if folder != "INBOX" else ())
+    return None
+
+def batch_modify(service, message_ids, add_labels=(), remove_labels=(), chunk_size=BATCH_MODIFY_MAX_IDS):
+    """
+    Apply the same label delta to many emails with messages.batchModify,
+    sending at most `chunk_size` IDs per request.
+
+    Returns one result per chunk: {"ids": [...], "error": None or error message}.
+    A failing chunk is logged and reported without aborting the remaining chunks.
+    """
+    message_ids = list(message_ids)
+    results = []
+    for start in range(0, len(message_ids), chunk_size):
+        chunk = message_ids[start:start + chunk_size]
+        try:
+            service.users().messages().batchModify(
+                userId="me",
+                body={
+                    "ids": chunk,
+                    "addLabelIds": list(add_labels),
+                    "removeLabelIds": list(remove_labels)
+                }
+            ).execute()
+            results.append({"ids": chunk, "error": None})
+        except Exception as e:
+            logger.error(f"batchModify failed for {len(chunk)} messages starting at {chunk[0]}: {e}")
+            results.append({"ids": chunk, "error": str(e)})
+    return results
+
+def fetch_emails(max_results=500, **fetch_options):
+    """
+    Fetch emails with a fresh Gmail service. `fetch_options` (mode,
+    concurrency, batch_size) are passed through to fetch_inbox_emails; in
+    "threads" mode every worker builds its own service by default.
+    """
     service = get_gmail_service()
-    return fetch_inbox_emails(service, max_results)
+    if fetch_options.get("mode") == "threads":
+        fetch_options.setdefault("service_factory", get_gmail_service)
+    return fetch_inbox_emails(service, max_results, **fetch_options)
+
+
+def iter_emails(max_results=None, query=None, label_ids=None, service=None, **fetch_options):
+    """
+    Stream emails from the whole mailbox (or the first `max_results`), following
+    list pagination. `query` and `label_ids` filter the listing. Without a
+    `service`, "threads" mode workers build their own services by default.
+    """
+    if service is None:
+        service = get_gmail_service()
+        if fetch_options.get("mode") == "threads":
+            fetch_options.setdefault("service_factory", get_gmail_service)
+    yield from iter_inbox_emails(
+        service, max_results=max_results, query=query, label_ids=label_ids, **fetch_options
+    )
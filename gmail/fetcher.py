@@ -1,6 +1,15 @@
 import logging
 import base64
-from gmail.utils import get_header
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from gmail import metrics
+from gmail.utils import get_header, get_inbox_type
+
+# Gmail caps messages.list pages at 500 IDs and HTTP batch requests at 100 calls.
+LIST_PAGE_SIZE = 500
+BATCH_GET_MAX_REQUESTS = 100
+DEFAULT_CONCURRENCY = 10
+FETCH_MODES = ("serial", "batch", "threads")
 
 logger = logging.getLogger(__name__)
 
@@ -27,41 +36,219 @@ def get_email_body(payload):
                 break
     return body
 
-def fetch_inbox_emails(service, max_results=500, user_id="me"):
-    email_list = []
-    try:
-        results = service.users().messages().list(userId=user_id, maxResults=max_results).execute()
-        messages = results.get("messages", [])
-    except Exception as e:
-        logger.error(f"Failed to fetch message list: {e}")
-        return email_list
+def parse_message(msg_data):
+    """Convert a Gmail message resource into the email dict stored in the DB."""
+    headers = msg_data.get("payload", {}).get("headers", [])
+    body = get_email_body(msg_data.get("payload", {}))
+    label_ids = msg_data.get("labelIds", [])
+    return {
+        "id": msg_data.get("id"),
+        "snippet": msg_data.get("snippet"),
+        "subject": get_header(headers, "Subject"),
+        "from": get_header(headers, "From"),
+        "to": get_header(headers, "To"),
+        "received_at": get_header(headers, "Date"),
+        "internal_date": msg_data.get("internalDate"),
+        "body": body,
+        "is_read": False if "UNREAD" in label_ids else True,
+        "is_starred": True if "STARRED" in label_ids else False,
+        "inbox_type": get_inbox_type(label_ids)
+    }
+
+def get_messages_serial(service, message_ids, user_id="me", errors=None):
+    """
+    Fetch messages one request at a time. Failed messages map to None, and to
+    their exception in `errors` when given.
+    """
+    messages = {}
+    for message_id in message_ids:
+        try:
+            messages[message_id] = service.users().messages().get(userId=user_id, id=message_id).execute()
+        except Exception as e:
+            logger.error(f"Failed to fetch message {message_id}: {e}")
+            messages[message_id] = None
+            if errors is not None:
+                errors[message_id] = e
+    return messages
+
+def get_messages_batched(service, message_ids, user_id="me", batch_size=BATCH_GET_MAX_REQUESTS, errors=None):
+    """
+    Fetch messages with HTTP batch requests of up to `batch_size` gets each.
+    Failed messages (or whole failed batches) map to None, and to their
+    exception in `errors` when given.
+    """
+    messages = {}
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            logger.error(f"Failed to fetch message {request_id}: {exception}")
+            messages[request_id] = None
+            if errors is not None:
+                errors[request_id] = exception
+        else:
+            messages[request_id] = response
+
+    for start in range(0, len(message_ids), batch_size):
+        chunk = message_ids[start:start + batch_size]
+        batch = service.new_batch_http_request(callback=on_response)
+        for message_id in chunk:
+            batch.add(service.users().messages().get(userId=user_id, id=message_id), request_id=message_id)
+        try:
+            batch.execute()
+        except Exception as e:
+            logger.error(f"Failed to execute batch of {len(chunk)} messages: {e}")
+            for message_id in chunk:
+                if message_id not in messages:
+                    messages[message_id] = None
+                    if errors is not None:
+                        errors[message_id] = e
+    return messages
+
+def get_messages_threaded(service, message_ids, user_id="me", concurrency=DEFAULT_CONCURRENCY, service_factory=None,
+                          errors=None):
+    """
+    Fetch messages with a bounded thread pool. Failed messages map to None, and
+    to their exception in `errors` when given.
+
+    The discovery client's HTTP transport is not thread-safe, so
+    `service_factory` is required: every worker thread builds its own service
+    with it (e.g. GmailSession.new_service).
+    """
+    if service_factory is None:
+        raise ValueError("threads mode needs a service_factory; the Gmail service is not thread-safe")
+    local = threading.local()
+
+    def get_service():
+        if not hasattr(local, "service"):
+            local.service = service_factory()
+        return local.service
+
+    def fetch_one(message_id):
+        try:
+            return get_service().users().messages().get(userId=user_id, id=message_id).execute()
+        except Exception as e:
+            logger.error(f"Failed to fetch message {message_id}: {e}")
+            if errors is not None:
+                errors[message_id] = e
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return dict(zip(message_ids, pool.map(fetch_one, message_ids)))
+
+def get_messages(service, message_ids, user_id="me", mode="serial", concurrency=DEFAULT_CONCURRENCY,
+                 batch_size=BATCH_GET_MAX_REQUESTS, service_factory=None, errors=None):
+    """
+    Fetch full message resources in the given mode, keyed by message ID.
+    Failed messages map to None; pass an `errors` dict to collect their exceptions.
+    """
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode: {mode}")
+    if mode == "threads" and service_factory is None:
+        raise ValueError("threads mode needs a service_factory; the Gmail service is not thread-safe")
+    with metrics.timer("gmail_fetch_seconds", mode=mode):
+        if mode == "serial":
+            messages = get_messages_serial(service, message_ids, user_id, errors)
+        elif mode == "batch":
+            messages = get_messages_batched(
+                service, message_ids, user_id, min(batch_size, BATCH_GET_MAX_REQUESTS), errors
+            )
+        else:
+            messages = get_messages_threaded(service, message_ids, user_id, concurrency, service_factory, errors)
+
+    if metrics.enabled():
+        failed = sum(1 for message in messages.values() if message is None)
+        metrics.increment("gmail_messages_fetched_total", len(messages) - failed, mode=mode)
+        metrics.increment("gmail_fetch_errors_total", failed, mode=mode)
+    return messages
+
+def iter_message_ids(service, user_id="me", query=None, label_ids=None, max_results=None, page_size=LIST_PAGE_SIZE,
+                     raise_errors=False, include_spam_trash=False):
+    """
+    Yield pages of message IDs, following nextPageToken until the mailbox (or
+    `max_results`) is exhausted. `query` is a Gmail search string (q=) and
+    `label_ids` restricts the listing to messages carrying all those labels.
+    Gmail leaves SPAM and TRASH out of the listing unless `include_spam_trash`.
+
+    A failed list request is logged and ends the listing early, or is raised
+    with raise_errors=True for callers that need the complete listing.
+    """
+    page_token = None
+    remaining = max_results
+    while remaining is None or remaining > 0:
+        request = {"userId": user_id, "maxResults": page_size if remaining is None else min(page_size, remaining)}
+        if query:
+            request["q"] = query
+        if label_ids:
+            request["labelIds"] = list(label_ids)
+        if include_spam_trash:
+            request["includeSpamTrash"] = True
+        if page_token:
+            request["pageToken"] = page_token
 
-    for msg in messages:
         try:
-            msg_data = service.users().messages().get(userId=user_id, id=msg["id"]).execute()
-            headers = msg_data.get("payload", {}).get("headers", [])
-            body = get_email_body(msg_data.get("payload", {}))
-            label_ids = msg_data.get("labelIds", [])
-            email_list.append({
-                "id": msg_data.get("id"),
-                "snippet": msg_data.get("snippet"),
-                "subject": get_header(headers, "Subject"),
-                "from": get_header(headers, "From"),
-                "to": get_header(headers, "To"),
-                "received_at": get_header(headers, "Date"),
-                "body": body,
-                "is_read": False if "UNREAD" in label_ids else True,
-                "is_starred": True if "STARRED" in label_ids else False,
-                "inbox_type": (
-                    "INBOX" if "INBOX" in label_ids else
-                    "SENT" if "SENT" in label_ids else
-                    "SPAM" if "SPAM" in label_ids else
-                    "OTHER"
-                )
-            })
+            with metrics.timer("gmail_list_seconds"):
+                results = service.users().messages().list(**request).execute()
         except Exception as e:
-            logger.error(f"Failed to fetch message {msg['id']}: {e}")
-            continue
+            logger.error(f"Failed to fetch message list: {e}")
+            metrics.increment("gmail_list_errors_total")
+            if raise_errors:
+                raise
+            return
 
+        message_ids = [msg["id"] for msg in results.get("messages", [])]
+        if message_ids:
+            yield message_ids
+        if remaining is not None:
+            remaining -= len(message_ids)
+
+        page_token = results.get("nextPageToken")
+        if not page_token or not message_ids:
+            return
+
+def iter_inbox_emails(service, user_id="me", query=None, label_ids=None, max_results=None,
+                      mode="serial", concurrency=DEFAULT_CONCURRENCY, batch_size=BATCH_GET_MAX_REQUESTS,
+                      service_factory=None, page_size=LIST_PAGE_SIZE, include_spam_trash=False):
+    """
+    Stream parsed emails page by page, so at most one page of messages is held
+    in memory. `max_results=None` walks the whole mailbox.
+
+    Fetch modes and failure handling are the same as fetch_inbox_emails.
+    """
+    for message_ids in iter_message_ids(
+        service, user_id, query, label_ids, max_results, page_size, include_spam_trash=include_spam_trash
+    ):
+        fetched = get_messages(service, message_ids, user_id, mode, concurrency, batch_size, service_factory)
+        for message_id in message_ids:
+            msg_data = fetched.get(message_id)
+            if msg_data is None:
+                continue
+            try:
+                with metrics.timer("gmail_parse_seconds"):
+                    email = parse_message(msg_data)
+            except Exception as e:
+                logger.error(f"Failed to parse message {message_id}: {e}")
+                metrics.increment("gmail_parse_errors_total")
+                continue
+            yield email
+
+def fetch_inbox_emails(service, max_results=500, user_id="me", mode="serial", concurrency=DEFAULT_CONCURRENCY,
+                       batch_size=BATCH_GET_MAX_REQUESTS, service_factory=None):
+    """
+    Fetch and parse up to `max_results` emails.
+
+    Args:
+        mode: "serial" (one get per request), "batch" (HTTP batch requests of up
+            to 100 gets) or "threads" (bounded thread pool)
+        concurrency: worker threads in "threads" mode
+        batch_size: gets per HTTP batch request in "batch" mode (at most 100)
+        service_factory: builds one service per worker thread; required in
+            "threads" mode
+
+    Emails are returned in list order; messages that fail are logged and skipped.
+    """
+    email_list = list(iter_inbox_emails(
+        service, user_id, max_results=max_results, mode=mode, concurrency=concurrency,
+        batch_size=batch_size, service_factory=service_factory
+    ))
     logger.info(f"Fetched {len(email_list)} emails")
     return email_list
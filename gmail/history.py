@@ -0,0 +1,76 @@
+import logging
+from gmail.utils import get_error_status
+
+HISTORY_PAGE_SIZE = 500
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+logger = logging.getLogger(__name__)
+
+class HistoryExpiredError(Exception):
+    """The start historyId is too old (or invalid) and a full sync is required."""
+    pass
+
+def get_history_id(service, user_id="me"):
+    """Return the mailbox's current historyId."""
+    return service.users().getProfile(userId=user_id).execute()["historyId"]
+
+def list_history(service, start_history_id, user_id="me", page_size=HISTORY_PAGE_SIZE):
+    """
+    Return (records, history_id): every history record after `start_history_id`,
+    across all pages, and the mailbox historyId to checkpoint afterwards.
+
+    Raises HistoryExpiredError when Gmail no longer has history that far back.
+    """
+    records = []
+    history_id = start_history_id
+    page_token = None
+    while True:
+        request = {
+            "userId": user_id,
+            "startHistoryId": start_history_id,
+            "maxResults": page_size,
+            "historyTypes": HISTORY_TYPES,
+        }
+        if page_token:
+            request["pageToken"] = page_token
+        try:
+            results = service.users().history().list(**request).execute()
+        except Exception as e:
+            if get_error_status(e) == 404:
+                raise HistoryExpiredError(f"History {start_history_id} is no longer available") from e
+            raise
+
+        records.extend(results.get("history", []))
+        history_id = results.get("historyId", history_id)
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return records, history_id
+
+def summarize_history(records):
+    """
+    Collapse history records into the net change per message.
+
+    Returns (added_ids, deleted_ids, label_ids_by_id): messages to fetch, messages
+    to delete, and the latest label set of messages whose labels changed.
+    """
+    added = {}
+    deleted = {}
+    labels = {}
+    for record in records:
+        for change in record.get("messagesAdded", []):
+            message_id = change["message"]["id"]
+            deleted.pop(message_id, None)
+            added[message_id] = True
+        for change in record.get("messagesDeleted", []):
+            message_id = change["message"]["id"]
+            added.pop(message_id, None)
+            labels.pop(message_id, None)
+            deleted[message_id] = True
+        for change in record.get("labelsAdded", []) + record.get("labelsRemoved", []):
+            message = change["message"]
+            if message["id"] not in deleted:
+                labels[message["id"]] = message.get("labelIds", [])
+
+    for message_id in added:
+        labels.pop(message_id, None)
+    return list(added), list(deleted), labels
@@ -0,0 +1,228 @@
+"""
+Lightweight run metrics: counters and histograms (timers record into
+histograms, in seconds), shared by the fetcher, the DB loaders, the rules
+engine and the actions.
+
+Metrics are off unless USE_METRICS=true. While off, every call returns before
+touching the registry and timer() hands back one shared no-op context
+manager, so instrumented code pays a function call per event.
+
+Set METRICS_REPORT and/or METRICS_PROMETHEUS to file paths to have
+export_reports() write a JSON run report and/or the Prometheus text format
+(for node_exporter's textfile collector) when a command finishes.
+
+    USE_METRICS=true METRICS_REPORT=run.json python -m rules_engine.engine
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from functools import wraps
+
+USE_METRICS = os.environ.get("USE_METRICS", "false").lower() == "true"
+METRICS_REPORT = os.environ.get("METRICS_REPORT")
+METRICS_PROMETHEUS = os.environ.get("METRICS_PROMETHEUS")
+
+# Upper bounds in seconds, from a single parse up to a full mailbox sync.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+
+NO_TIMER = nullcontext()
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Count, sum, min, max and cumulative bucket counts of observed values."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative_buckets(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.bucket_counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+        }
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by (name, sorted labels)."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name, value=1, labels=()):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+registry = MetricsRegistry()
+_enabled = USE_METRICS
+
+def enabled():
+    return _enabled
+
+def enable(on=True):
+    """Turn collection on or off for this process (USE_METRICS sets the default)."""
+    global _enabled
+    _enabled = on
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def increment(name, value=1, **labels):
+    """Add `value` to the counter `name`."""
+    if not _enabled:
+        return
+    registry.increment(name, value, label_key(labels))
+
+def observe(name, value, **labels):
+    """Record `value` in the histogram `name`."""
+    if not _enabled:
+        return
+    registry.observe(name, value, label_key(labels))
+
+class Timer:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+def timer(name, **labels):
+    """Context manager recording its duration in the histogram `name` (seconds)."""
+    if not _enabled:
+        return NO_TIMER
+    return Timer(name, label_key(labels))
+
+def timed(name, errors=None, **labels):
+    """
+    Decorator timing every call into the histogram `name`. With `errors`, calls
+    that raise also increment that counter before the exception propagates.
+    """
+    key = label_key(labels)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if errors:
+                    registry.increment(errors, 1, key)
+                raise
+            finally:
+                registry.observe(name, time.perf_counter() - start, key)
+        return wrapper
+    return decorator
+
+def metric_label(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+def report():
+    """The collected metrics as a JSON-serializable dict."""
+    with registry.lock:
+        return {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "counters": {metric_label(name, labels): value
+                         for (name, labels), value in sorted(registry.counters.items())},
+            "histograms": {metric_label(name, labels): histogram.summary()
+                           for (name, labels), histogram in sorted(registry.histograms.items())},
+        }
+
+def format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+def to_prometheus():
+    """The collected metrics in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+    with registry.lock:
+        for (name, labels), value in sorted(registry.counters.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{metric_label(name, labels)} {value}")
+        for (name, labels), histogram in sorted(registry.histograms.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in histogram.cumulative_buckets():
+                lines.append(f"{metric_label(name + '_bucket', labels + (('le', format_bound(bound)),))} {count}")
+            lines.append(f"{metric_label(name + '_sum', labels)} {histogram.sum}")
+            lines.append(f"{metric_label(name + '_count', labels)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+def write_file(path, text):
+    """Write atomically, so a collector never reads a half-written file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def export_reports(report_path=None, prometheus_path=None):
+    """
+    Write the JSON report and/or the Prometheus text file, defaulting to the
+    METRICS_REPORT / METRICS_PROMETHEUS paths. Does nothing while disabled.
+    """
+    if not _enabled:
+        return
+    report_path = report_path or METRICS_REPORT
+    prometheus_path = prometheus_path or METRICS_PROMETHEUS
+    if report_path:
+        write_file(report_path, json.dumps(report(), indent=2) + "\n")
+        logger.info(f"Wrote metrics report to {report_path}")
+    if prometheus_path:
+        write_file(prometheus_path, to_prometheus())
+        logger.info(f"Wrote Prometheus metrics to {prometheus_path}")
@@ -0,0 +1,46 @@
+import threading
+from gmail.auth import get_credentials, get_gmail_service, refresh_credentials
+
+class GmailSession:
+    """
+    Run-scoped Gmail service.
+
+    Credentials are loaded and the discovery client is built once, on first
+    use, and then shared by every action in the run. Expired credentials are
+    refreshed by a single thread while the others wait for the new token.
+    """
+
+    def __init__(self, service=None, creds=None):
+        self._service = service
+        self._creds = creds
+        self._lock = threading.Lock()
+
+    @property
+    def service(self):
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._creds = get_credentials()
+                    self._service = get_gmail_service(self._creds)
+        self.ensure_fresh()
+        return self._service
+
+    def ensure_fresh(self):
+        """Refresh the credentials if they have expired."""
+        creds = self._creds
+        if creds is None or not creds.expired:
+            return
+        with self._lock:
+            if creds.expired and creds.refresh_token:
+                refresh_credentials(creds)
+
+    def new_service(self):
+        """
+        Build an additional service on this session's credentials, e.g. one
+        per worker thread. Sessions wrapping a ready-made service (stub or
+        test services) hand that service out instead.
+        """
+        service = self.service
+        if self._creds is None:
+            return service
+        return get_gmail_service(self._creds)
@@ -0,0 +1,263 @@
+"""
+In-memory stand-in for the Gmail API service object.
+
+Mimics the `service.users().messages()...execute()` call chain closely enough
+for local runs, tests and benchmarks, records every call it receives and can
+inject latency or errors.
+"""
+import base64
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+
+
+def build_stub_message(message_id, subject="", sender="", recipient="me@example.com",
+                       date="Mon, 13 Oct 2025 12:00:00 +0000", body="", label_ids=("INBOX", "UNREAD")):
+    """
+    Build a Gmail-format message resource for the stub service. internalDate
+    is derived from `date`, as Gmail would report it for a message received then.
+    """
+    message = {
+        "id": message_id,
+        "threadId": message_id,
+        "labelIds": list(label_ids),
+        "snippet": body[:100],
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "Subject", "value": subject},
+                {"name": "From", "value": sender},
+                {"name": "To", "value": recipient},
+                {"name": "Date", "value": date},
+            ],
+            "body": {"data": base64.urlsafe_b64encode(body.encode("utf-8")).decode("ASCII")},
+        },
+    }
+    try:
+        received = parsedate_to_datetime(date)
+    except (TypeError, ValueError):
+        return message
+    if received.tzinfo is None:
+        received = received.replace(tzinfo=timezone.utc)
+    message["internalDate"] = str(int(received.timestamp() * 1000))
+    return message
+
+
+class StubHttpError(Exception):
+    """Mimics googleapiclient.errors.HttpError for status-code based handling."""
+
+    def __init__(self, status, reason=""):
+        super().__init__(f"<StubHttpError {status} {reason}>".strip())
+        self.status_code = status
+        self.resp = SimpleNamespace(status=status)
+
+
+class _Request:
+    def __init__(self, service, method, kwargs):
+        self._service = service
+        self.method = method
+        self.kwargs = kwargs
+
+    def execute(self):
+        return self._service._handle(self.method, self.kwargs)
+
+
+class _BatchRequest:
+    """
+    Mimics googleapiclient.http.BatchHttpRequest: queued requests share a
+    single round-trip, so latency is paid once per batch.
+    """
+
+    def __init__(self, service, callback=None):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id if request_id is not None else str(len(self._requests) + 1)
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self):
+        if self._service.latency:
+            time.sleep(self._service.latency)
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = self._service._handle(request.method, request.kwargs, delay=False), None
+            except Exception as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class _Messages:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, **kwargs):
+        return _Request(self._service, "messages.list", kwargs)
+
+    def get(self, **kwargs):
+        return _Request(self._service, "messages.get", kwargs)
+
+    def modify(self, **kwargs):
+        return _Request(self._service, "messages.modify", kwargs)
+
+    def batchModify(self, **kwargs):
+        return _Request(self._service, "messages.batchModify", kwargs)
+
+
+class _History:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, **kwargs):
+        return _Request(self._service, "history.list", kwargs)
+
+
+class _Users:
+    def __init__(self, service):
+        self._service = service
+
+    def messages(self):
+        return _Messages(self._service)
+
+    def history(self):
+        return _History(self._service)
+
+    def getProfile(self, **kwargs):
+        return _Request(self._service, "users.getProfile", kwargs)
+
+
+class StubGmailService:
+    """
+    Fake Gmail service backed by a dict of Gmail-format messages.
+
+    Args:
+        messages: list of message resources ({"id", "labelIds", "payload", ...})
+        latency: seconds slept on every executed request
+
+    Mailbox changes made through add_message, delete_message, modify and
+    batchModify are recorded as history records for history.list.
+    """
+
+    def __init__(self, messages=None, latency=0.0):
+        self.messages = {m["id"]: m for m in (messages or [])}
+        self.latency = latency
+        self.calls = []
+        self.history_id = 1000
+        self.history = []
+        self._history_floor = self.history_id
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def users(self):
+        return _Users(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _BatchRequest(self, callback)
+
+    def inject_error(self, method, error, times=1):
+        """Raise `error` on the next `times` executions of `method`."""
+        self._errors.setdefault(method, []).extend([error] * times)
+
+    def calls_for(self, method):
+        return [kwargs for name, kwargs in self.calls if name == method]
+
+    def add_message(self, message):
+        """Deliver a new message to the mailbox."""
+        self.messages[message["id"]] = message
+        self._record("messagesAdded", {"message": self._summary(message)})
+
+    def delete_message(self, message_id):
+        """Permanently delete a message from the mailbox."""
+        message = self.messages.pop(message_id)
+        self._record("messagesDeleted", {"message": self._summary(message)})
+
+    def expire_history(self):
+        """Drop all history so older startHistoryIds fail with 404, as Gmail does after ~a week."""
+        self.history = []
+        self._history_floor = self.history_id
+
+    @staticmethod
+    def _summary(message):
+        return {"id": message["id"], "threadId": message.get("threadId"), "labelIds": list(message.get("labelIds", []))}
+
+    def _record(self, change_type, change):
+        self.history_id += 1
+        self.history.append({"id": str(self.history_id), change_type: [change]})
+
+    def _handle(self, method, kwargs, delay=True):
+        with self._lock:
+            self.calls.append((method, kwargs))
+            pending = self._errors.get(method)
+            error = pending.pop(0) if pending else None
+        if delay and self.latency:
+            time.sleep(self.latency)
+        if error is not None:
+            raise error
+        return getattr(self, "_" + method.replace(".", "_"))(**kwargs)
+
+    def _messages_list(self, userId="me", maxResults=100, pageToken=None, labelIds=None, q=None,
+                       includeSpamTrash=False):
+        ids = [
+            msg_id for msg_id, msg in self.messages.items()
+            if (not labelIds or set(labelIds) <= set(msg.get("labelIds", [])))
+            and (includeSpamTrash or not {"SPAM", "TRASH"} & set(msg.get("labelIds", [])))
+        ]
+        start = int(pageToken or 0)
+        page = ids[start:start + maxResults]
+        result = {"messages": [{"id": msg_id} for msg_id in page]}
+        if start + maxResults < len(ids):
+            result["nextPageToken"] = str(start + maxResults)
+        return result
+
+    def _messages_get(self, userId="me", id=None, format=None):
+        if id not in self.messages:
+            raise StubHttpError(404, "Not Found")
+        return self.messages[id]
+
+    def _apply_labels(self, message_id, add_labels, remove_labels):
+        msg = self.messages.get(message_id)
+        if msg is None:
+            return
+        before = msg.get("labelIds", [])
+        labels = [label for label in before if label not in remove_labels]
+        labels.extend(label for label in add_labels if label not in labels)
+        msg["labelIds"] = labels
+
+        removed = [label for label in before if label not in labels]
+        added = [label for label in labels if label not in before]
+        if removed:
+            self._record("labelsRemoved", {"message": self._summary(msg), "labelIds": removed})
+        if added:
+            self._record("labelsAdded", {"message": self._summary(msg), "labelIds": added})
+
+    def _messages_modify(self, userId="me", id=None, body=None):
+        body = body or {}
+        self._apply_labels(id, body.get("addLabelIds", []), body.get("removeLabelIds", []))
+        return self.messages.get(id, {"id": id})
+
+    def _messages_batchModify(self, userId="me", body=None):
+        body = body or {}
+        for message_id in body.get("ids", []):
+            self._apply_labels(message_id, body.get("addLabelIds", []), body.get("removeLabelIds", []))
+        return ""
+
+    def _users_getProfile(self, userId="me"):
+        return {
+            "emailAddress": "me@example.com",
+            "messagesTotal": len(self.messages),
+            "historyId": str(self.history_id),
+        }
+
+    def _history_list(self, userId="me", startHistoryId=None, pageToken=None, maxResults=100, historyTypes=None):
+        if int(startHistoryId) < self._history_floor:
+            raise StubHttpError(404, "Requested entity was not found.")
+        records = [record for record in self.history if int(record["id"]) > int(startHistoryId)]
+        start = int(pageToken or 0)
+        result = {"history": records[start:start + maxResults], "historyId": str(self.history_id)}
+        if start + maxResults < len(records):
+            result["nextPageToken"] = str(start + maxResults)
+        return result
@@ -0,0 +1,86 @@
+import logging
+import random
+import threading
+import time
+from gmail.utils import get_error_status
+
+# Quota units charged per Gmail API method.
+# https://developers.google.com/gmail/api/reference/quota
+QUOTA_UNITS = {
+    "messages.get": 5,
+    "messages.list": 5,
+    "messages.modify": 5,
+    "messages.batchModify": 50,
+    "history.list": 2,
+    "getProfile": 1,
+}
+
+# Gmail allows 250 quota units per user per second.
+USER_QUOTA_UNITS_PER_SEC = 250
+
+# Rate limiting (429) and transient server errors are worth retrying;
+# anything else (400, 403, 404) fails the same way every time.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 32.0
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second, holding at
+    most `capacity` tokens (default: one second's worth).
+
+    acquire() reserves tokens immediately and sleeps off any deficit, so
+    concurrent callers are served in the order they asked.
+    """
+
+    def __init__(self, rate=USER_QUOTA_UNITS_PER_SEC, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Take `tokens` from the bucket, blocking until they are available. Returns the seconds waited."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+        return wait
+
+def is_retryable(error):
+    return get_error_status(error) in RETRY_STATUSES
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def call_with_retry(call, retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                    max_delay=DEFAULT_MAX_DELAY, sleep=time.sleep):
+    """
+    Run `call()` and retry it up to `retries` times on 429/5xx errors, sleeping
+    with exponential backoff and jitter in between.
+
+    Returns the result of `call()`. The last error is re-raised once retries
+    are exhausted; non-retryable errors are raised immediately.
+    """
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"Retrying after HTTP {get_error_status(e)} in {delay:.2f}s (attempt {attempt + 1}/{retries})")
+            sleep(delay)
+            attempt += 1
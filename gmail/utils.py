@@ -1,17 +1,28 @@
 import sqlite3
+from db.connection import connection
 
-DB_FILE = "emails.db"
 
 def get_header(headers, name):
     """Return the value of a header by name, or None."""
     return next((header["value"] for header in headers if header["name"] == name), None)
 
+# Labels inbox_type can show, highest precedence first.
+INBOX_TYPE_PRECEDENCE = ("TRASH", "INBOX", "SENT", "SPAM")
+
+def get_inbox_type(label_ids):
+    """
+    Derive the inbox_type column from a message's Gmail labels. Trashed
+    messages are TRASH whatever other labels they keep.
+    """
+    return next((label for label in INBOX_TYPE_PRECEDENCE if label in label_ids), "OTHER")
+
+def get_error_status(error):
+    """Return the HTTP status of a Gmail API error, or None if it has none."""
+    resp = getattr(error, "resp", None)
+    return getattr(resp, "status", None)
+
 def get_emails_from_db():
     """Fetch all emails from the database as a list of dictionaries."""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM emails")
-    emails = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return emails
\ No newline at end of file
+    with connection() as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute("SELECT * FROM emails")]
\ No newline at end of file
@@ -0,0 +1,66 @@
+from collections import deque
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton: finds which of many patterns occur in a text in a
+    single pass over the text, independent of the number of patterns.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(pattern for pattern in patterns if pattern))
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = self._out[state] + (index,)
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Patterns ending at the failure state also end here.
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def search(self, text):
+        """Return the set of pattern indexes occurring anywhere in `text`."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = set()
+        state = 0
+        for char in text:
+            next_state = goto[state].get(char)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(char)
+            if next_state is None:
+                state = 0
+                continue
+            state = next_state
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def find_patterns(self, text):
+        """Return the set of patterns occurring anywhere in `text`."""
+        return {self.patterns[index] for index in self.search(text)}
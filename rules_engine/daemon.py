@@ -0,0 +1,304 @@
+"""
+Long-running alternative to running the rules engine from cron.
+
+The daemon keeps the Gmail service, the pooled DB connections and the
+compiled rules warm between polls. Every poll syncs the emails table through
+the history API (db.incremental_sync), matches only the messages added since
+the previous poll in memory and executes their actions. rules.json is
+reloaded when its mtime changes; a file that no longer validates is reported
+and the previous rules stay active.
+
+The IDs a poll has to act on are saved in sync_state before the actions run
+and cleared once their actions succeed; messages whose actions raised, whose
+batchModify chunk failed, or that a crash interrupted are retried by the next
+poll. When expired history forces a full sync, the
+rules run on every stored message received after the newest message of the
+last successful poll.
+
+    python -m rules_engine.daemon --interval 30
+    python -m rules_engine.daemon --stub --arrivals 5 --max-polls 10
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from db.connection import DB_PATH_ENV, connection, transaction
+from db.create_emails_table import create_emails_table
+from db.incremental_sync import get_sync_state, save_sync_state, sync_changes
+from db.write_buffer import EmailWriteBuffer
+from gmail import metrics
+from gmail.session import GmailSession
+from gmail.stub_service import StubGmailService, build_stub_message
+from rules_engine import engine
+from rules_engine.validator import RuleValidationError, get_rule_sets, load_and_validate_rules
+
+DEFAULT_RULES_FILE = Path(__file__).parent / "rules.json"
+DEFAULT_POLL_INTERVAL = 30.0
+# Relative received_at cutoffs are fixed when the rules compile, so compiled
+# matchers are rebuilt at least this often (in seconds).
+MATCHER_MAX_AGE = 60.0
+LATENCY_WINDOW = 1000
+# sync_state keys: message IDs still waiting for their actions, and the
+# received_at of the newest message when the last poll's actions succeeded.
+PENDING_IDS_KEY = "rules_pending_ids"
+PROCESSED_AT_KEY = "rules_processed_at"
+# Stays below SQLite's default limit of host parameters per statement.
+ID_CHUNK_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+class LatencyStats:
+    """Count, mean and percentiles of the last `window` poll durations, in seconds."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self._recent.append(seconds)
+
+    def percentile(self, fraction):
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": max(self._recent, default=0.0),
+        }
+
+def format_latency(summary):
+    return (
+        f"{summary['count']} polls, mean {summary['mean'] * 1000:.1f} ms, "
+        f"p50 {summary['p50'] * 1000:.1f} ms, p95 {summary['p95'] * 1000:.1f} ms, max {summary['max'] * 1000:.1f} ms"
+    )
+
+def load_records(message_ids):
+    """Stored rows for `message_ids` (deleted messages are left out), in received_at order."""
+    records = []
+    with connection() as conn:
+        conn.row_factory = sqlite3.Row
+        for start in range(0, len(message_ids), ID_CHUNK_SIZE):
+            chunk = message_ids[start:start + ID_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            records.extend(
+                dict(row) for row in conn.execute(f"SELECT * FROM emails WHERE id IN ({placeholders})", chunk)
+            )
+    return sorted(records, key=lambda record: record["received_at"] or "")
+
+def ids_received_after(received_at):
+    """IDs of stored messages received after `received_at`."""
+    with connection() as conn:
+        rows = conn.execute("SELECT id FROM emails WHERE received_at > ? ORDER BY received_at", (received_at,))
+        return [row[0] for row in rows]
+
+def get_pending_ids():
+    with connection() as conn:
+        return json.loads(get_sync_state(conn, PENDING_IDS_KEY) or "[]")
+
+class RulesDaemon:
+    """
+    Poll Gmail every `interval` seconds and apply the rules to newly arrived
+    messages. `before_poll` is called at the start of every poll, e.g. to
+    deliver messages to a stub service.
+    """
+
+    def __init__(self, session, rules_file=None, interval=DEFAULT_POLL_INTERVAL, batch=engine.USE_BATCH_ACTIONS,
+                 before_poll=None, clock=time.monotonic, sleep=time.sleep):
+        self.session = session
+        self.rules_file = Path(rules_file) if rules_file else DEFAULT_RULES_FILE
+        self.interval = interval
+        self.batch = batch
+        self.before_poll = before_poll
+        self.clock = clock
+        self.sleep = sleep
+        self.rules_config = None
+        self.polls = 0
+        self.matched = 0
+        self.failures = 0
+        self.latency = LatencyStats()
+        self._rules_mtime = None
+        self._is_match_for = None
+        self._compiled_at = None
+
+    def reload_rules(self):
+        """
+        Load the rules file if it changed since the last load. Returns True
+        when new rules were loaded. Invalid rules raise on the first load and
+        are ignored (keeping the active rules) afterwards.
+        """
+        mtime = os.stat(self.rules_file).st_mtime_ns
+        if mtime == self._rules_mtime:
+            return False
+        try:
+            rules_config = load_and_validate_rules(self.rules_file)
+        except (OSError, ValueError, RuleValidationError) as e:
+            if self.rules_config is None:
+                raise
+            logger.error(f"Keeping the previous rules, {self.rules_file} is invalid: {e}")
+            self._rules_mtime = mtime
+            return False
+
+        self.rules_config = rules_config
+        self._rules_mtime = mtime
+        self._is_match_for = None
+        logger.info(f"Loaded rules from {self.rules_file}")
+        return True
+
+    def matcher(self):
+        """The compiled in-memory matcher for the active rules."""
+        now = self.clock()
+        if self._is_match_for is None or now - self._compiled_at >= MATCHER_MAX_AGE:
+            self._is_match_for = engine.compile_fetched_matcher(get_rule_sets(self.rules_config))
+            self._compiled_at = now
+        return self._is_match_for
+
+    def messages_to_process(self, stats, new_emails):
+        """
+        IDs to run the rules on after a sync: those left pending by a failed
+        poll, the newly added ones and, after a full sync that replaced expired
+        history, every message received since the last successful poll. The
+        very first full sync processes nothing; the engine covers existing mail.
+        """
+        message_ids = get_pending_ids()
+        message_ids += [email["id"] for email in new_emails]
+        if stats["mode"] == "full":
+            with connection() as conn:
+                processed_at = get_sync_state(conn, PROCESSED_AT_KEY)
+            if processed_at is not None:
+                message_ids += ids_received_after(processed_at)
+        return list(dict.fromkeys(message_ids))
+
+    def poll_once(self):
+        """
+        Sync new mail and act on it. Returns {"new", "processed", "matched",
+        "seconds"}. If the actions raise, the messages stay pending; with
+        batch=True the emails of failed batchModify chunks stay pending.
+        """
+        start = self.clock()
+        if self.before_poll is not None:
+            self.before_poll()
+        self.reload_rules()
+
+        new_emails = []
+        stats = sync_changes(self.session.service, new_emails)
+        message_ids = self.messages_to_process(stats, new_emails)
+        with transaction() as conn:
+            save_sync_state(conn, PENDING_IDS_KEY, json.dumps(message_ids))
+
+        records = load_records(message_ids)
+        matched = 0
+        failed = []
+        if records:
+            session = None if engine.USE_MOCK_ACTIONS else self.session
+            writes = None if engine.USE_MOCK_ACTIONS else EmailWriteBuffer()
+            try:
+                matched = engine.run_rules_on_records(
+                    records, self.rules_config, batch=self.batch, session=session, writes=writes,
+                    is_match_for=self.matcher(), failed=failed
+                )
+            finally:
+                if writes is not None:
+                    writes.flush()
+
+        with transaction() as conn:
+            save_sync_state(conn, PENDING_IDS_KEY, json.dumps(failed))
+            processed_at = conn.execute("SELECT MAX(received_at) FROM emails").fetchone()[0]
+            if processed_at is not None:
+                save_sync_state(conn, PROCESSED_AT_KEY, processed_at)
+
+        seconds = self.clock() - start
+        self.polls += 1
+        self.matched += matched
+        self.latency.record(seconds)
+        metrics.observe("daemon_poll_seconds", seconds)
+        if records:
+            print(f"Poll {self.polls}: {len(new_emails)} new, {len(records)} processed, {matched} matched "
+                  f"in {seconds * 1000:.1f} ms")
+        return {"new": len(new_emails), "processed": len(records), "matched": matched, "seconds": seconds}
+
+    def run(self, max_polls=None, stats_every=10):
+        """
+        Poll until interrupted (or `max_polls` polls), printing latency stats
+        and exporting the metrics reports every `stats_every` polls.
+        """
+        self.reload_rules()
+        attempts = 0
+        try:
+            while max_polls is None or attempts < max_polls:
+                started = self.clock()
+                attempts += 1
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    self.failures += 1
+                    metrics.increment("daemon_poll_failures_total")
+                    logger.error(f"Poll failed: {e}")
+                if stats_every and attempts % stats_every == 0:
+                    print(f"Loop latency: {format_latency(self.latency.summary())}")
+                    metrics.export_reports()
+                if max_polls is not None and attempts >= max_polls:
+                    break
+                self.sleep(max(0.0, self.interval - (self.clock() - started)))
+        except KeyboardInterrupt:
+            pass
+        print(f"Stopped after {self.polls} polls ({self.failures} failed), {self.matched} emails matched. "
+              f"Loop latency: {format_latency(self.latency.summary())}")
+        metrics.export_reports()
+
+STUB_SENDERS = ["alerts@cutshort.io", "noreply@zerodha.com", "friend@example.com", "news@shop.example"]
+STUB_SUBJECTS = ["Zerodha contract note", "New jobs for you", "Lunch tomorrow?", "Weekly newsletter"]
+
+def stub_delivery(service, arrivals, seed=0):
+    """Return a callback delivering `arrivals` random messages to a stub service per call."""
+    rng = random.Random(seed)
+    delivered = 0
+
+    def deliver():
+        nonlocal delivered
+        for _ in range(arrivals):
+            delivered += 1
+            service.add_message(build_stub_message(
+                f"stub{delivered}", subject=rng.choice(STUB_SUBJECTS), sender=rng.choice(STUB_SENDERS),
+                date=time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime()), body="Stub message",
+            ))
+    return deliver
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the rules to new mail as it arrives.")
+    parser.add_argument("--rules", help="Rules file (default: rules_engine/rules.json)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between polls")
+    parser.add_argument("--max-polls", type=int, help="Stop after this many polls")
+    parser.add_argument("--stats-every", type=int, default=10, help="Print loop latency stats every N polls")
+    parser.add_argument("--stub", action="store_true",
+                        help="Use an in-memory stub Gmail service and a throwaway database")
+    parser.add_argument("--arrivals", type=int, default=3, help="Messages delivered per poll with --stub")
+    args = parser.parse_args()
+
+    before_poll = None
+    if args.stub:
+        os.environ[DB_PATH_ENV] = os.path.join(tempfile.mkdtemp(), "emails.db")
+        stub = StubGmailService()
+        session = GmailSession(service=stub)
+        before_poll = stub_delivery(stub, args.arrivals)
+    else:
+        session = GmailSession()
+
+    create_emails_table()
+    RulesDaemon(session, rules_file=args.rules, interval=args.interval, before_poll=before_poll).run(
+        max_polls=args.max_polls, stats_every=args.stats_every
+    )
@@ -3,11 +3,24 @@ import logging
 import os
 import sqlite3
 from pathlib import Path
-from db.rules_to_sql import rules_to_sql_query
-from rules_engine.validator import load_and_validate_rules
+from db.rules_to_sql import rules_to_sql_query, rule_sets_to_sql_query, rule_match_column
+from rules_engine.validator import load_and_validate_rules, get_rule_sets
+from rules_engine.matcher import MultiRuleMatcher, compile_rule_sets
+from db.populate_emails import fetched_email_to_record
 from gmail.actions.mark_as_read import mark_as_read
 from gmail.actions.mark_as_unread import mark_as_unread
 from gmail.actions.move_message import move_message
+from gmail.actions.batch_modify import batch_modify
+from gmail.actions.modify_labels import modify_labels
+from gmail import metrics
+from gmail.client import get_label_delta
+from gmail.session import GmailSession
+from db.connection import connection
+from db.fts import has_fts_index
+from db.write_buffer import EmailWriteBuffer
+from rules_engine.executor import execute_actions_concurrently, execute_tasks_concurrently, format_summary
+from rules_engine.planner import plan_email_actions
+from rules_engine.rule_cache import load_compiled_rules
 
 USE_MOCK_ACTIONS = os.environ.get("USE_MOCK_ACTIONS", "true").lower() == "true"
 if USE_MOCK_ACTIONS:
@@ -15,6 +28,25 @@ if USE_MOCK_ACTIONS:
 else:
     actions_module = None
 
+USE_BATCH_ACTIONS = os.environ.get("USE_BATCH_ACTIONS", "false").lower() == "true"
+USE_FTS_INDEX = os.environ.get("USE_FTS_INDEX", "false").lower() == "true"
+USE_STREAMING_QUERY = os.environ.get("USE_STREAMING_QUERY", "false").lower() == "true"
+USE_CONCURRENT_ACTIONS = os.environ.get("USE_CONCURRENT_ACTIONS", "false").lower() == "true"
+USE_ACTION_PLANNING = os.environ.get("USE_ACTION_PLANNING", "false").lower() == "true"
+USE_PENDING_FILTER = os.environ.get("USE_PENDING_FILTER", "false").lower() == "true"
+USE_RULE_CACHE = os.environ.get("USE_RULE_CACHE", "false").lower() == "true"
+
+# Streaming runs fetch rows in batches of this size and hand each batch to
+# the actions before reading the next; it matches the batchModify ID limit.
+STREAM_BATCH_SIZE = 1000
+# Actions only need the message ID; subject and sender are kept for logging,
+# is_read, is_starred and inbox_type let action planning skip work that is
+# already done.
+STREAM_COLUMNS = ("id", "subject", "sender", "is_read", "is_starred", "inbox_type")
+
+# Below this many rule sets, per-rule substring search beats building automata.
+MULTI_MATCHER_MIN_RULE_SETS = 100
+
 logger = logging.getLogger(__name__)
 
 ACTIONS_MAP = {
@@ -23,8 +55,25 @@ ACTIONS_MAP = {
     "move_message": getattr(actions_module, "move_message", move_message),
 }
 
-def execute_actions(email, actions):
-    """Executes all actions for a matching email."""
+BATCH_MODIFY = getattr(actions_module, "batch_modify", batch_modify)
+MODIFY_LABELS = getattr(actions_module, "modify_labels", modify_labels)
+
+def action_kwargs(service=None, writes=None):
+    """Keyword arguments for an action: the run-scoped service and write buffer, when given."""
+    kwargs = {}
+    if service is not None:
+        kwargs["service"] = service
+    if writes is not None:
+        kwargs["writes"] = writes
+    return kwargs
+
+def execute_actions(email, actions, service=None, writes=None):
+    """
+    Executes all actions for a matching email.
+    The run-scoped Gmail `service` and DB `writes` buffer, when given, are
+    passed on to every action.
+    """
+    kwargs = action_kwargs(service, writes)
     for action_str in actions:
         if ":" in action_str:
             action_name, folder = action_str.split(":", 1)
@@ -36,31 +85,340 @@ def execute_actions(email, actions):
             continue
 
         if folder:
-            action_func(email["id"], folder)
+            action_func(email["id"], folder, **kwargs)
+        else:
+            action_func(email["id"], **kwargs)
+
+def execute_email_actions(email_actions, session=None, concurrent=USE_CONCURRENT_ACTIONS, writes=None):
+    """
+    Execute (email, actions) pairs one email at a time, or through the
+    rate-limited concurrent executor when `concurrent` is set. The concurrent
+    path prints and returns its per-action summary.
+    """
+    if concurrent:
+        service_factory = session.new_service if session else None
+        summary = execute_actions_concurrently(
+            email_actions, ACTIONS_MAP, service_factory=service_factory, action_kwargs=action_kwargs(writes=writes)
+        )
+        print(f"Actions complete: {format_summary(summary)}")
+        return summary
+
+    for email, actions in email_actions:
+        service = session.service if session else None
+        execute_actions(email, actions, service=service, writes=writes)
+
+def execute_planned_actions(email_actions, batch=USE_BATCH_ACTIONS, session=None,
+                            concurrent=USE_CONCURRENT_ACTIONS, writes=None):
+    """
+    Fold each email's actions into one net label delta, drop what its stored
+    is_read / is_starred / inbox_type already reflect (see rules_engine.planner) and apply
+    the rest: one batchModify per delta and chunk with batch=True, otherwise a
+    single modify call per email. Emails with nothing left to do cost no call.
+    """
+    groups = plan_email_actions(email_actions)
+    if batch:
+        service = session.service if session else None
+        return execute_label_groups(groups, service=service, writes=writes)
+
+    tasks = [(message_id, "modify_labels", delta) for delta, ids in groups.items() for message_id in ids]
+    if concurrent:
+        service_factory = session.new_service if session else None
+        summary = execute_tasks_concurrently(
+            tasks, {"modify_labels": MODIFY_LABELS}, service_factory=service_factory,
+            action_kwargs=action_kwargs(writes=writes)
+        )
+        print(f"Actions complete: {format_summary(summary)}")
+        return summary
+
+    for message_id, _, (add_labels, remove_labels) in tasks:
+        service = session.service if session else None
+        MODIFY_LABELS(message_id, add_labels, remove_labels, **action_kwargs(service, writes))
+
+def group_email_actions(email_actions):
+    """
+    Group email IDs by the label delta each of their actions applies.
+
+    Takes (email, actions) pairs and returns a dict mapping
+    (add_labels, remove_labels) to the list of email IDs.
+    """
+    groups = {}
+    for email, actions in email_actions:
+        for action_str in actions:
+            delta = get_label_delta(action_str)
+            if delta is None:
+                continue
+            groups.setdefault(delta, []).append(email["id"])
+    return groups
+
+def execute_label_groups(groups, service=None, writes=None):
+    """
+    Dispatch label-delta groups through batchModify, one call per label delta
+    and chunk instead of one modify call per email and action. Failed chunks
+    are logged. Returns the per-chunk results.
+    """
+    kwargs = action_kwargs(service, writes)
+    results = []
+    for (add_labels, remove_labels), ids in groups.items():
+        chunk_results = BATCH_MODIFY(ids, add_labels, remove_labels, **kwargs)
+        failed = [result for result in chunk_results if result["error"]]
+        if failed:
+            logger.error(
+                f"{len(failed)} of {len(chunk_results)} chunks failed for "
+                f"add={list(add_labels)} remove={list(remove_labels)}"
+            )
+        results.extend(chunk_results)
+    return results
+
+def failed_result_ids(results):
+    """IDs of the emails in failed batchModify chunks, without duplicates."""
+    return list(dict.fromkeys(
+        message_id for result in results if result["error"] for message_id in result["ids"]
+    ))
+
+def merge_rule_set_actions(email, rule_sets, is_match=None):
+    """
+    Collect the actions of every rule set the email matched, in priority order,
+    stopping after a matched rule set with stop_processing. Duplicate actions
+    are dropped.
+
+    Expects rule_sets in evaluation order (see get_rule_sets). Matches are read
+    from the rule_<i> flags selected by rule_sets_to_sql_query, or from
+    `is_match(index)` when given.
+    """
+    actions = []
+    for index, rule_set in enumerate(rule_sets):
+        if is_match is not None:
+            matched = is_match(index)
         else:
-            action_func(email["id"])
+            matched = email.get(rule_match_column(index))
+        if not matched:
+            continue
+        for action_str in rule_set.get("actions", []):
+            if action_str not in actions:
+                actions.append(action_str)
+        if rule_set["stop_processing"]:
+            break
+    return actions
+
+def use_fts_index(use_fts=USE_FTS_INDEX):
+    """
+    Whether queries can be compiled for the FTS index: requested and the
+    emails_fts table exists. A missing index falls back to LIKE with a warning.
+    """
+    if not use_fts:
+        return False
+    with connection() as conn:
+        if has_fts_index(conn):
+            return True
+    logger.warning("USE_FTS_INDEX is set but the FTS index is missing; using LIKE (see db.fts)")
+    return False
+
+def execute_matched_actions(email_actions, batch=USE_BATCH_ACTIONS, session=None, plan=USE_ACTION_PLANNING,
+                            writes=None):
+    """
+    Execute one batch of matched (email, actions) pairs the way the run is
+    configured: planned into one label change per email (plan=True), grouped
+    into batchModify calls (batch=True) or one action call at a time.
+    """
+    with metrics.timer("rules_actions_seconds"):
+        if plan:
+            return execute_planned_actions(email_actions, batch=batch, session=session, writes=writes)
+        if batch:
+            service = session.service if session else None
+            return execute_label_groups(group_email_actions(email_actions), service=service, writes=writes)
+        return execute_email_actions(email_actions, session, writes=writes)
 
-def execute_query(query, params, db_path="emails.db"):
+def run_rule_sets(rule_sets, batch=USE_BATCH_ACTIONS, session=None, stream=USE_STREAMING_QUERY,
+                  plan=USE_ACTION_PLANNING, writes=None, compiled_query=None, use_fts=None):
+    """
+    Evaluate every rule set in a single scan of the emails table and execute
+    the merged actions of each matching email. `compiled_query` is an already
+    generated (query, params) pair for these rule sets, e.g. from the rule cache.
+    `use_fts` defaults to use_fts_index().
+    """
+    columns = STREAM_COLUMNS if stream else None
+    if compiled_query is None:
+        if use_fts is None:
+            use_fts = use_fts_index()
+        with metrics.timer("rules_compile_seconds"):
+            compiled_query = rule_sets_to_sql_query(
+                rule_sets, use_fts=use_fts, columns=columns, pending_only=USE_PENDING_FILTER
+            )
+    query, params = compiled_query
+
+    for emails in query_email_batches(query, params, stream):
+        metrics.increment("rules_matched_emails_total", len(emails))
+        email_actions = [(email, merge_rule_set_actions(email, rule_sets)) for email in emails]
+        execute_matched_actions(email_actions, batch=batch, session=session, plan=plan, writes=writes)
+
+def compile_fetched_matcher(rule_sets, now=None):
+    """
+    Compile rule sets for in-memory matching. Returns is_match_for(record),
+    which gives the is_match(index) callback merge_rule_set_actions expects.
+
+    Past MULTI_MATCHER_MIN_RULE_SETS rule sets, contains needles are matched
+    with one Aho-Corasick scan per field instead of one search per rule.
+    """
+    if len(rule_sets) >= MULTI_MATCHER_MIN_RULE_SETS:
+        multi = MultiRuleMatcher(rule_sets, now)
+        def is_match_for(record):
+            return multi.match(record).__contains__
+    else:
+        matchers = compile_rule_sets(rule_sets, now)
+        def is_match_for(record):
+            return lambda index: matchers[index](record)
+    return is_match_for
+
+def match_records(records, rule_sets, now=None, is_match_for=None):
+    """
+    Match records keyed by emails table columns against the rule sets in
+    memory. Yields (record, actions) for every record that matched at least
+    one rule set. `is_match_for` reuses a compile_fetched_matcher result for
+    these rule sets.
+    """
+    if is_match_for is None:
+        is_match_for = compile_fetched_matcher(rule_sets, now)
+
+    for record in records:
+        actions = merge_rule_set_actions(record, rule_sets, is_match_for(record))
+        metrics.increment("rules_fetched_emails_total")
+        if actions:
+            metrics.increment("rules_matched_emails_total")
+            yield record, actions
+
+def match_fetched_emails(emails, rule_sets, now=None, is_match_for=None):
+    """
+    Match emails straight from gmail.fetcher against the rule sets in memory,
+    without storing them first (see match_records).
+    """
+    return match_records(map(fetched_email_to_record, emails), rule_sets, now, is_match_for)
+
+def run_rules_on_fetched_emails(emails, rules_config, batch=USE_BATCH_ACTIONS, session=None, writes=None,
+                                is_match_for=None):
+    """
+    Apply a validated rules config to an iterable of freshly fetched emails and
+    execute the resulting actions. Returns the number of matched emails.
+    """
+    return run_rules_on_records(
+        map(fetched_email_to_record, emails), rules_config, batch=batch, session=session, writes=writes,
+        is_match_for=is_match_for
+    )
+
+def run_rules_on_records(records, rules_config, batch=USE_BATCH_ACTIONS, session=None, writes=None,
+                         is_match_for=None, failed=None):
+    """
+    Apply a validated rules config to records keyed by emails table columns,
+    matched in memory, and execute the resulting actions. Returns the number
+    of matched records. batchModify chunk failures are only logged; pass a
+    `failed` list to collect the IDs of the emails in those chunks.
+    """
+    matches = match_records(records, get_rule_sets(rules_config), is_match_for=is_match_for)
+    service = session.service if session else None
+
+    if batch:
+        email_actions = list(matches)
+        results = execute_label_groups(group_email_actions(email_actions), service=service, writes=writes)
+        if failed is not None:
+            failed.extend(failed_result_ids(results))
+        return len(email_actions)
+
+    matched = 0
+    for record, actions in matches:
+        execute_actions(record, actions, service=service, writes=writes)
+        matched += 1
+    return matched
+
+def execute_query(query, params, db_path=None):
     """Fetch emails matching the SQL query and execute actions."""
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    with connection(db_path) as conn, metrics.timer("rules_query_seconds"):
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+
+        cur.execute(query, params)
+        return [dict(row) for row in cur.fetchall()]
+
+def iter_query_batches(query, params, db_path=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Stream the rows matching the SQL query as lists of at most `batch_size`
+    dicts, so memory stays flat however many rows match.
 
-    cur.execute(query, params)
-    emails = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return emails
+    Pooled connections run in WAL mode, so actions can write to the emails
+    table while this read cursor is still open.
+    """
+    with connection(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        with metrics.timer("rules_query_batch_seconds"):
+            cur = conn.execute(query, params)
+        while True:
+            with metrics.timer("rules_query_batch_seconds"):
+                rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+
+def query_email_batches(query, params, stream=USE_STREAMING_QUERY):
+    """Matching emails as an iterable of batches: streamed, or one fetchall batch."""
+    if stream:
+        return iter_query_batches(query, params)
+    emails = execute_query(query, params)
+    return [emails] if emails else []
 
-def run_rules(rules_file=None):
-    """Run all rules defined in the JSON file against stored emails."""
+@metrics.timed("rules_run_seconds")
+def run_rules(rules_file=None, batch=USE_BATCH_ACTIONS, stream=USE_STREAMING_QUERY, plan=USE_ACTION_PLANNING,
+              cache=USE_RULE_CACHE):
+    """
+    Run all rules defined in the JSON file against stored emails.
+    Files with "rule_sets" are evaluated in a single table scan.
+    With batch=True the actions are dispatched through batchModify.
+    With stream=True matches are read and acted on STREAM_BATCH_SIZE rows at
+    a time, selecting only STREAM_COLUMNS. With plan=True every email's
+    actions are folded into one net label change (execute_planned_actions).
+    With cache=True the validated rules and their SQL come from the on-disk
+    rule cache while the rules file is unchanged (see rules_engine.rule_cache).
+    USE_FTS_INDEX only takes effect when the FTS index exists (use_fts_index).
+
+    The Gmail service is built once per run and shared by all actions, and
+    the DB side effects of successful actions go through one run-scoped
+    EmailWriteBuffer, flushed in batches and when the run ends. Mock actions
+    need neither.
+    """
     if rules_file is None:
         rules_file = Path(__file__).parent / "rules.json"
-    rules_config = load_and_validate_rules(rules_file)
+    columns = STREAM_COLUMNS if stream else None
+    use_fts = use_fts_index()
+    with metrics.timer("rules_load_seconds", cache=str(cache).lower()):
+        if cache:
+            compiled = load_compiled_rules(
+                rules_file, use_fts=use_fts, columns=columns, pending_only=USE_PENDING_FILTER
+            )
+            rules_config, compiled_query = compiled.rules_config, (compiled.query, compiled.params)
+        else:
+            rules_config, compiled_query = load_and_validate_rules(rules_file), None
+    session = None if USE_MOCK_ACTIONS else GmailSession()
+    writes = None if USE_MOCK_ACTIONS else EmailWriteBuffer()
 
-    query, params = rules_to_sql_query(rules_config)
-    emails = execute_query(query, params)
-    for email in emails:
-        execute_actions(email, rules_config.get("actions", []))
+    try:
+        if "rule_sets" in rules_config:
+            run_rule_sets(get_rule_sets(rules_config), batch=batch, session=session, stream=stream, plan=plan,
+                          writes=writes, compiled_query=compiled_query, use_fts=use_fts)
+            return
+
+        actions = rules_config.get("actions", [])
+        if compiled_query is None:
+            with metrics.timer("rules_compile_seconds"):
+                compiled_query = rules_to_sql_query(
+                    rules_config, use_fts=use_fts, columns=columns, pending_only=USE_PENDING_FILTER
+                )
+        query, params = compiled_query
+        for emails in query_email_batches(query, params, stream):
+            metrics.increment("rules_matched_emails_total", len(emails))
+            execute_matched_actions(
+                [(email, actions) for email in emails], batch=batch, session=session, plan=plan, writes=writes
+            )
+    finally:
+        if writes is not None:
+            writes.flush()
 
 if __name__ == "__main__":
-    run_rules()
\ No newline at end of file
+    run_rules()
+    metrics.export_reports()
\ No newline at end of file
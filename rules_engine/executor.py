@@ -0,0 +1,118 @@
+"""
+Concurrent execution of per-email actions.
+
+Emails are independent of each other: each email's (email, action) tasks,
+or its planned label delta, run in order on one worker of a bounded thread
+pool, so actions that touch the same labels land as the serial path would
+leave them. Every task draws Gmail quota units from a shared token bucket and
+retries on 429/5xx with exponential backoff, and a failing task never stops
+the others.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from gmail.throttle import QUOTA_UNITS, TokenBucket, call_with_retry
+
+DEFAULT_CONCURRENCY = 8
+
+# Every per-email action is a single messages.modify call.
+ACTION_QUOTA_UNITS = {
+    "mark_as_read": QUOTA_UNITS["messages.modify"],
+    "mark_as_unread": QUOTA_UNITS["messages.modify"],
+    "move_message": QUOTA_UNITS["messages.modify"],
+    "modify_labels": QUOTA_UNITS["messages.modify"],
+}
+
+logger = logging.getLogger(__name__)
+
+def parse_action(action_str):
+    """Split "move_message:TRASH" into ("move_message", "TRASH"); folder is None without one."""
+    action_name, _, folder = action_str.partition(":")
+    return action_name, folder or None
+
+def action_tasks(email_actions, actions_map):
+    """Turn (email, actions) pairs into (message_id, action_name, args) tasks, skipping unknown actions."""
+    tasks = []
+    for email, actions in email_actions:
+        for action_str in actions:
+            action_name, folder = parse_action(action_str)
+            if action_name in actions_map:
+                tasks.append((email["id"], action_name, (folder,) if folder else ()))
+    return tasks
+
+def execute_actions_concurrently(email_actions, actions_map, **options):
+    """Execute (email, actions) pairs concurrently; see execute_tasks_concurrently."""
+    return execute_tasks_concurrently(action_tasks(email_actions, actions_map), actions_map, **options)
+
+def execute_tasks_concurrently(tasks, actions_map, concurrency=DEFAULT_CONCURRENCY,
+                               rate_limiter=None, service_factory=None, action_kwargs=None, **retry_options):
+    """
+    Execute (message_id, action_name, args) tasks on a pool of `concurrency`
+    threads; each calls actions_map[action_name](message_id, *args). The
+    tasks of one message run sequentially, in the given order, on one worker;
+    only different messages run in parallel.
+
+    `rate_limiter` defaults to a TokenBucket at Gmail's per-user quota.
+    The discovery client is not thread-safe, so with a `service_factory`
+    every worker builds its own service; without one the actions are called
+    without a service (mock actions). `action_kwargs` (e.g. a run-scoped
+    `writes` buffer) are passed to every action; `retry_options` go to
+    call_with_retry.
+
+    Returns {action_name: {"succeeded": n, "failed": n, "retries": n}}.
+    """
+    if rate_limiter is None:
+        rate_limiter = TokenBucket()
+    local = threading.local()
+    summary = {}
+    summary_lock = threading.Lock()
+
+    def get_kwargs():
+        kwargs = dict(action_kwargs or {})
+        if service_factory is None:
+            return kwargs
+        if not hasattr(local, "service"):
+            local.service = service_factory()
+        kwargs["service"] = local.service
+        return kwargs
+
+    def run_one(message_id, action_name, args):
+        action_func = actions_map[action_name]
+        kwargs = get_kwargs()
+        attempts = 0
+
+        def attempt():
+            nonlocal attempts
+            attempts += 1
+            rate_limiter.acquire(ACTION_QUOTA_UNITS.get(action_name, 1))
+            return action_func(message_id, *args, **kwargs)
+
+        try:
+            call_with_retry(attempt, **retry_options)
+            succeeded = True
+        except Exception as e:
+            logger.error(f"{action_name} failed for email {message_id}: {e}")
+            succeeded = False
+
+        with summary_lock:
+            counts = summary.setdefault(action_name, {"succeeded": 0, "failed": 0, "retries": 0})
+            counts["succeeded" if succeeded else "failed"] += 1
+            counts["retries"] += attempts - 1
+
+    def run_email(email_tasks):
+        for task in email_tasks:
+            run_one(*task)
+
+    tasks_by_email = {}
+    for task in tasks:
+        tasks_by_email.setdefault(task[0], []).append(task)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run_email, tasks_by_email.values()))
+    return summary
+
+def format_summary(summary):
+    return ", ".join(
+        f"{name}: {counts['succeeded']} succeeded, {counts['failed']} failed, {counts['retries']} retries"
+        for name, counts in sorted(summary.items())
+    ) or "no actions"
@@ -0,0 +1,256 @@
+"""
+Explain what a rules file will cost before running it.
+
+For every rule set this compiles the SQL the engine would run, prints SQLite's
+EXPLAIN QUERY PLAN, estimates how many rows match from the table statistics
+(sqlite_stat1, written by ANALYZE), flags predicates no index can serve and
+estimates the Gmail API calls and quota the actions would need.
+
+    python -m rules_engine.explain rules_engine/rules.json
+    python -m rules_engine.explain rules.json --analyze --fts
+
+Estimates are estimates: `contains` selectivity is a fixed guess, date ranges
+assume mail is spread evenly between the oldest and newest stored email, and
+rule sets are treated as independent.
+"""
+import argparse
+import math
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple, Optional, Tuple
+from db.connection import connection
+from db.fts import can_use_fts, has_fts_index
+from db.rules_to_sql import relative_days, rule_sets_to_sql_query, rules_to_sql_query
+from gmail.client import BATCH_MODIFY_MAX_IDS, get_label_delta
+from gmail.throttle import QUOTA_UNITS, USER_QUOTA_UNITS_PER_SEC
+from rules_engine.validator import get_rule_sets, load_and_validate_rules
+
+# Fallback selectivities for what sqlite_stat1 cannot tell (SQLite's planner
+# guesses similarly). Substring matches rarely hit more than a tenth of a mailbox.
+CONTAINS_SELECTIVITY = 0.1
+EQUALS_SELECTIVITY = 0.01
+DATE_SELECTIVITY = 0.5
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# SQLite before 3.36 reports a full scan as "SCAN TABLE emails".
+FULL_SCAN_PATTERN = re.compile(r"SCAN (TABLE )?emails\b")
+
+class TableStats(NamedTuple):
+    rows: int
+    # Leading column of every index on emails.
+    indexed: frozenset
+    # Average rows per distinct value of an indexed column, from sqlite_stat1.
+    rows_per_key: Dict[str, int]
+    received_range: Optional[Tuple[str, str]]
+    analyzed: bool
+
+def has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+def load_table_stats(conn):
+    """Row count, indexed columns and per-index stats of the emails table."""
+    index_columns = {}
+    for row in conn.execute("PRAGMA index_list('emails')").fetchall():
+        columns = conn.execute(f"PRAGMA index_info('{row[1]}')").fetchall()
+        if columns:
+            index_columns[row[1]] = columns[0][2]
+
+    rows = None
+    rows_per_key = {}
+    analyzed = has_table(conn, "sqlite_stat1")
+    if analyzed:
+        for index_name, stat in conn.execute("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = 'emails'"):
+            numbers = [int(part) for part in stat.split() if part.isdigit()]
+            if not numbers:
+                continue
+            rows = max(rows or 0, numbers[0])
+            if index_name in index_columns and len(numbers) > 1:
+                rows_per_key[index_columns[index_name]] = numbers[1]
+    if rows is None:
+        rows = conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+
+    # Both ends come straight from idx_emails_received_at.
+    oldest, newest = conn.execute("SELECT MIN(received_at), MAX(received_at) FROM emails").fetchone()
+    return TableStats(
+        rows=rows,
+        indexed=frozenset(index_columns.values()),
+        rows_per_key=rows_per_key,
+        received_range=(oldest, newest) if oldest and newest else None,
+        analyzed=analyzed,
+    )
+
+def query_plan(conn, query, params):
+    """EXPLAIN QUERY PLAN as indented detail lines."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall():
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+def date_selectivity(rule, stats, now):
+    """Share of stored mail on the matching side of a relative-date cutoff, assuming an even spread."""
+    if stats.received_range is None:
+        return DATE_SELECTIVITY
+    try:
+        oldest, newest = (datetime.strptime(value, DATE_FORMAT) for value in stats.received_range)
+    except ValueError:
+        return DATE_SELECTIVITY
+    cutoff = now.replace(tzinfo=None) - timedelta(days=relative_days(rule["value"]))
+    span = (newest - oldest).total_seconds()
+    if span <= 0:
+        newer = 1.0 if oldest >= cutoff else 0.0
+    else:
+        newer = min(1.0, max(0.0, (newest - cutoff).total_seconds() / span))
+    return newer if rule["predicate"].lower() == "less_than" else 1.0 - newer
+
+def rule_selectivity(rule, stats, now):
+    """Estimated fraction of rows a single rule matches."""
+    field = rule["field"].lower()
+    predicate = rule["predicate"].lower()
+    if field == "received_at":
+        return date_selectivity(rule, stats, now)
+    if predicate in ("equals", "does_not_equal"):
+        if field in stats.rows_per_key and stats.rows:
+            equal = min(1.0, stats.rows_per_key[field] / stats.rows)
+        else:
+            equal = EQUALS_SELECTIVITY
+        return equal if predicate == "equals" else 1.0 - equal
+    return CONTAINS_SELECTIVITY if predicate == "contains" else 1.0 - CONTAINS_SELECTIVITY
+
+def estimate_matches(rule_set, stats, now=None):
+    """Estimated matching rows for a rule set, treating its rules as independent."""
+    now = now or datetime.now(timezone.utc)
+    selectivities = [rule_selectivity(rule, stats, now) for rule in rule_set.get("rules", [])]
+    if not selectivities:
+        return stats.rows
+    if rule_set.get("rules_predicate", "all").lower() == "all":
+        fraction = math.prod(selectivities)
+    else:
+        fraction = 1.0 - math.prod(1.0 - selectivity for selectivity in selectivities)
+    return round(stats.rows * fraction)
+
+def is_indexable(rule, stats, use_fts=False, fts_ready=False):
+    """True if an index (or the FTS index) can narrow the rows this rule reads."""
+    field = rule["field"].lower()
+    predicate = rule["predicate"].lower()
+    if predicate == "contains":
+        return use_fts and fts_ready and can_use_fts(field, rule["value"])
+    if predicate in ("equals", "less_than", "greater_than"):
+        return field in stats.indexed
+    return False
+
+def rule_warnings(rule_set, stats, plan, use_fts=False, fts_ready=False):
+    """Human-readable warnings about predicates that force rows to be scanned."""
+    warnings = []
+    rules = rule_set.get("rules", [])
+    for rule in rules:
+        field = rule["field"].lower()
+        predicate = rule["predicate"].lower()
+        if is_indexable(rule, stats, use_fts, fts_ready):
+            continue
+        if predicate in ("contains", "does_not_contain"):
+            warning = f"{field} {predicate} {rule['value']!r}: leading-wildcard LIKE cannot use an index"
+            if predicate == "contains" and can_use_fts(field, rule["value"]) and not (use_fts and fts_ready):
+                warning += " (the FTS index can serve it, see USE_FTS_INDEX)"
+            warnings.append(warning)
+        elif predicate in ("equals", "less_than", "greater_than"):
+            warnings.append(f"{field} {predicate} {rule['value']!r}: no index on {field}")
+        else:
+            warnings.append(f"{field} {predicate} {rule['value']!r}: negated comparison cannot use an index")
+
+    if rule_set.get("rules_predicate", "all").lower() == "any" and len(rules) > 1:
+        unindexed = [rule["field"].lower() for rule in rules if not is_indexable(rule, stats, use_fts, fts_ready)]
+        if unindexed:
+            warnings.append(f"OR across unindexed columns ({', '.join(unindexed)}) reads every row")
+
+    if any(FULL_SCAN_PATTERN.match(line.strip()) for line in plan):
+        warnings.append(f"full scan of ~{stats.rows:,} rows")
+    return warnings
+
+def estimate_api_calls(actions, matched):
+    """
+    Gmail calls and quota units the actions need for `matched` emails:
+    one messages.modify per email and action, one per email when actions are
+    planned into a single label change, or one batchModify per label change
+    and BATCH_MODIFY_MAX_IDS emails.
+    """
+    deltas = {delta for delta in map(get_label_delta, actions) if delta is not None}
+    per_email = matched * len([action for action in actions if get_label_delta(action) is not None])
+    planned = matched if deltas else 0
+    batched = len(deltas) * math.ceil(matched / BATCH_MODIFY_MAX_IDS)
+    return {
+        "per_email": (per_email, per_email * QUOTA_UNITS["messages.modify"]),
+        "planned": (planned, planned * QUOTA_UNITS["messages.modify"]),
+        "batched": (batched, batched * QUOTA_UNITS["messages.batchModify"]),
+    }
+
+def explain_rules(rules_config, conn, use_fts=False, pending_only=False, now=None):
+    """
+    Explain every rule set of a validated rules config. Returns the table stats
+    and one dict per rule set (plus the combined single-scan query for files
+    with "rule_sets").
+    """
+    stats = load_table_stats(conn)
+    fts_ready = has_fts_index(conn)
+    reports = []
+    for rule_set in get_rule_sets(rules_config):
+        query, params = rules_to_sql_query(rule_set, use_fts=use_fts, pending_only=pending_only)
+        plan = query_plan(conn, query, params)
+        matched = estimate_matches(rule_set, stats, now)
+        reports.append({
+            "name": rule_set["name"],
+            "query": query,
+            "plan": plan,
+            "matched": matched,
+            "warnings": rule_warnings(rule_set, stats, plan, use_fts, fts_ready),
+            "api_calls": estimate_api_calls(rule_set.get("actions", []), matched),
+        })
+
+    if "rule_sets" in rules_config:
+        query, params = rule_sets_to_sql_query(
+            get_rule_sets(rules_config), use_fts=use_fts, pending_only=pending_only
+        )
+        reports.append({"name": "all rule sets (single scan)", "query": query, "plan": query_plan(conn, query, params)})
+    return stats, reports
+
+def format_calls(calls, units):
+    return f"{calls:,} calls, {units:,} quota units (~{units / USER_QUOTA_UNITS_PER_SEC:,.0f} s at the per-user limit)"
+
+def format_report(stats, reports):
+    lines = [f"emails: {stats.rows:,} rows, indexed columns: {', '.join(sorted(stats.indexed))}"]
+    if not stats.analyzed:
+        lines.append("No sqlite_stat1 table: run with --analyze for index-based estimates.")
+    for report in reports:
+        lines += ["", f"== {report['name']} ==", f"SQL: {report['query']}", "Plan:"]
+        lines += [f"  {line}" for line in report["plan"]]
+        if "matched" not in report:
+            continue
+        share = report["matched"] / stats.rows if stats.rows else 0.0
+        lines.append(f"Estimated matches: ~{report['matched']:,} of {stats.rows:,} rows ({share:.1%})")
+        if report["warnings"]:
+            lines.append("Warnings:")
+            lines += [f"  - {warning}" for warning in report["warnings"]]
+        lines.append("Estimated API calls:")
+        for mode, (calls, units) in report["api_calls"].items():
+            lines.append(f"  {mode:9s} {format_calls(calls, units)}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explain the query plan and cost of a rules file.")
+    parser.add_argument("rules_file", nargs="?", default="rules_engine/rules.json")
+    parser.add_argument("--db", help="Emails database (default: EMAILS_DB or emails.db)")
+    parser.add_argument("--analyze", action="store_true", help="Run ANALYZE first to refresh sqlite_stat1")
+    parser.add_argument("--fts", action="store_true", help="Compile contains predicates for the FTS index")
+    parser.add_argument("--pending", action="store_true", help="Compile with the pending-actions filter")
+    args = parser.parse_args()
+
+    rules_config = load_and_validate_rules(args.rules_file)
+    with connection(args.db) as conn:
+        if args.analyze:
+            conn.execute("ANALYZE")
+        try:
+            stats, reports = explain_rules(rules_config, conn, use_fts=args.fts, pending_only=args.pending)
+        except sqlite3.OperationalError as e:
+            parser.exit(1, f"Cannot explain against {args.db or 'the emails database'}: {e}\n")
+    print(format_report(stats, reports))
@@ -0,0 +1,203 @@
+"""
+Pure-Python rule evaluation with the same semantics as the SQL generated by
+db.rules_to_sql, for emails that have not been (or will not be) stored.
+
+SQLite semantics reproduced here:
+  * LIKE is case-insensitive for ASCII letters only, and `%` / `_` in a
+    value act as wildcards.
+  * `=` and `!=` are case-sensitive.
+  * Any comparison against a NULL column is false.
+  * received_at is compared as a "%Y-%m-%d %H:%M:%S" UTC string.
+"""
+import re
+import string
+from datetime import datetime, timedelta, timezone
+from db.rules_to_sql import relative_days
+from rules_engine.aho_corasick import AhoCorasick
+
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Rough per-predicate evaluation cost; cheaper (and usually more selective)
+# predicates run first so evaluation can short-circuit early.
+FIELD_COST = {"sender": 1, "recipient": 1, "subject": 2, "snippet": 3, "body": 8}
+PREDICATE_COST = {"equals": 0, "does_not_equal": 0, "less_than": 0, "greater_than": 0}
+
+def ascii_lower(value):
+    return value.lower() if value.isascii() else value.translate(ASCII_LOWER)
+
+def like_contains_regex(value):
+    """Compile `LIKE '%value%'` with wildcards in `value` into a regex search."""
+    parts = []
+    for char in ascii_lower(value):
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.DOTALL)
+
+def compile_contains(field, value):
+    if "%" in value or "_" in value:
+        search = like_contains_regex(value).search
+        def contains(email):
+            text = email.get(field)
+            return text is not None and search(ascii_lower(text)) is not None
+    else:
+        needle = ascii_lower(value)
+        def contains(email):
+            text = email.get(field)
+            return text is not None and needle in ascii_lower(text)
+    return contains
+
+def compile_condition(cond, now):
+    field = cond["field"].lower()
+    predicate = cond["predicate"].lower()
+    value = cond["value"]
+
+    if field in ("sender", "recipient", "subject", "body", "snippet"):
+        if predicate == "contains":
+            return compile_contains(field, value)
+        if predicate == "does_not_contain":
+            contains = compile_contains(field, value)
+            return lambda email: email.get(field) is not None and not contains(email)
+        if predicate == "equals":
+            return lambda email: email.get(field) is not None and email.get(field) == value
+        if predicate == "does_not_equal":
+            return lambda email: email.get(field) is not None and email.get(field) != value
+        raise ValueError(f"Unknown string predicate: {predicate}")
+
+    if field == "received_at":
+        cutoff = (now - timedelta(days=relative_days(value))).strftime("%Y-%m-%d %H:%M:%S")
+        if predicate == "less_than":
+            return lambda email: email.get(field) is not None and email.get(field) >= cutoff
+        if predicate == "greater_than":
+            return lambda email: email.get(field) is not None and email.get(field) <= cutoff
+        raise ValueError(f"Unknown date predicate: {predicate}")
+
+    raise ValueError(f"Unknown field: {field}")
+
+def condition_cost(cond):
+    field = cond["field"].lower()
+    predicate = cond["predicate"].lower()
+    if predicate in PREDICATE_COST:
+        return PREDICATE_COST[predicate]
+    cost = FIELD_COST.get(field, 1)
+    if "%" in cond["value"] or "_" in cond["value"]:
+        cost += 2
+    return cost
+
+def compile_rules(rules_data, now=None):
+    """
+    Compile a validated rules dict into a predicate `match(email) -> bool`.
+
+    `email` is a dict keyed by emails table columns (see
+    db.populate_emails.fetched_email_to_record). Needles are lowercased and
+    date cutoffs resolved once, at compile time; `now` defaults to the
+    current UTC time.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    conditions = sorted(rules_data.get("rules", []), key=condition_cost)
+    predicates = [compile_condition(cond, now) for cond in conditions]
+
+    if not predicates:
+        return lambda email: True
+
+    if rules_data.get("rules_predicate", "all").lower() == "all":
+        def match(email):
+            for predicate in predicates:
+                if not predicate(email):
+                    return False
+            return True
+    else:
+        def match(email):
+            for predicate in predicates:
+                if predicate(email):
+                    return True
+            return False
+    return match
+
+def compile_rule_sets(rule_sets, now=None):
+    """Compile each rule set; returns one predicate per rule set, in order."""
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return [compile_rules(rule_set, now) for rule_set in rule_sets]
+
+class MultiRuleMatcher:
+    """
+    Evaluates many rule sets at once. All wildcard-free `contains` /
+    `does_not_contain` needles are compiled into one Aho-Corasick automaton
+    per field, so every field of an email is scanned once no matter how many
+    rules reference it. Only rule sets that can still match are evaluated:
+    an "all" rule set needs every one of its contains needles found, an "any"
+    rule set with only contains conditions needs at least one.
+    """
+
+    def __init__(self, rule_sets, now=None):
+        if now is None:
+            now = datetime.now(timezone.utc)
+        self.rule_sets = rule_sets
+
+        needles = {}
+        self._compiled = []
+        self._always_check = []
+        self._rules_by_needle = {}
+
+        for index, rule_set in enumerate(rule_sets):
+            contains, not_contains, others = [], [], []
+            for cond in rule_set.get("rules", []):
+                field = cond["field"].lower()
+                predicate = cond["predicate"].lower()
+                value = cond["value"]
+                if predicate in ("contains", "does_not_contain") and value and "%" not in value and "_" not in value:
+                    key = (field, ascii_lower(value))
+                    needles.setdefault(field, set()).add(key[1])
+                    (contains if predicate == "contains" else not_contains).append(key)
+                else:
+                    others.append(compile_condition(cond, now))
+
+            match_all = rule_set.get("rules_predicate", "all").lower() == "all"
+            self._compiled.append((match_all, contains, not_contains, others))
+            if not contains or (not match_all and (not_contains or others)):
+                self._always_check.append(index)
+            for key in contains:
+                self._rules_by_needle.setdefault(key, set()).add(index)
+
+        self._automata = {
+            field: AhoCorasick(sorted(field_needles)) for field, field_needles in needles.items()
+        }
+
+    def find_needles(self, email):
+        """Scan each indexed field once; return the (field, needle) pairs present."""
+        found = set()
+        for field, automaton in self._automata.items():
+            text = email.get(field)
+            if text is not None:
+                found.update((field, needle) for needle in automaton.find_patterns(ascii_lower(text)))
+        return found
+
+    def _evaluate(self, index, email, found):
+        match_all, contains, not_contains, others = self._compiled[index]
+        if match_all:
+            return (
+                all(key in found for key in contains)
+                and all(email.get(key[0]) is not None and key not in found for key in not_contains)
+                and all(predicate(email) for predicate in others)
+            )
+        if not (contains or not_contains or others):
+            # Like compile_rules, a rule set without conditions matches everything.
+            return True
+        return (
+            any(key in found for key in contains)
+            or any(email.get(key[0]) is not None and key not in found for key in not_contains)
+            or any(predicate(email) for predicate in others)
+        )
+
+    def match(self, email):
+        """Return the set of indexes of the rule sets `email` matches."""
+        found = self.find_needles(email)
+        candidates = set(self._always_check)
+        for key in found:
+            candidates.update(self._rules_by_needle.get(key, ()))
+        return {index for index in candidates if self._evaluate(index, email, found)}
@@ -0,0 +1,79 @@
+"""
+Action planning: fold every action an email matched into one net label
+delta and drop the parts its stored state already reflects, so each email
+costs at most one API call and re-running the rules sends nothing for read,
+starred and inbox state that is already in place.
+"""
+from gmail.client import get_label_delta
+
+def fold_actions(actions):
+    """
+    Fold action strings into one net (add_labels, remove_labels) delta, in
+    order: a later action overrides an earlier one touching the same label
+    (mark_as_read then mark_as_unread nets to adding UNREAD). Unknown actions
+    are ignored.
+    """
+    add, remove = {}, {}
+    for action_str in actions:
+        delta = get_label_delta(action_str)
+        if delta is None:
+            continue
+        add_labels, remove_labels = delta
+        for label in add_labels:
+            remove.pop(label, None)
+            add[label] = True
+        for label in remove_labels:
+            add.pop(label, None)
+            remove[label] = True
+    return tuple(add), tuple(remove)
+
+def drop_applied_labels(email, add_labels, remove_labels):
+    """
+    Drop the labels the email's stored is_read / is_starred / inbox_type show
+    are already in place. A missing (None) column is treated as unknown and
+    keeps the label, as are custom labels the emails table does not track.
+    """
+    is_read = email.get("is_read")
+    is_starred = email.get("is_starred")
+    inbox_type = email.get("inbox_type")
+
+    def already_added(label):
+        if label == "UNREAD":
+            return is_read is not None and not is_read
+        if label == "STARRED":
+            return bool(is_starred)
+        return inbox_type is not None and label == inbox_type
+
+    def already_removed(label):
+        if label == "UNREAD":
+            return bool(is_read)
+        if label == "STARRED":
+            return is_starred is not None and not is_starred
+        if label == "INBOX":
+            return inbox_type is not None and inbox_type != "INBOX"
+        return False
+
+    return (
+        tuple(label for label in add_labels if not already_added(label)),
+        tuple(label for label in remove_labels if not already_removed(label)),
+    )
+
+def plan_email(email, actions):
+    """Net label delta still to apply to `email`, or None if nothing is left to do."""
+    add_labels, remove_labels = drop_applied_labels(email, *fold_actions(actions))
+    if not add_labels and not remove_labels:
+        return None
+    return add_labels, remove_labels
+
+def plan_email_actions(email_actions):
+    """
+    Plan (email, actions) pairs and group the email IDs by the net delta left
+    to apply: {(add_labels, remove_labels): [ids]}. Emails with nothing to do
+    are left out.
+    """
+    groups = {}
+    for email, actions in email_actions:
+        delta = plan_email(email, actions)
+        if delta is not None:
+            groups.setdefault(delta, []).append(email["id"])
+    return groups
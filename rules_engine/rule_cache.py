@@ -0,0 +1,103 @@
+"""
+On-disk cache of validated and compiled rules files.
+
+Entries live in a directory next to the emails database (emails.db.rules-cache)
+and are keyed by the sha256 of the rules file's bytes, ENGINE_VERSION and the
+query options, so editing the rules, upgrading the engine or changing
+USE_FTS_INDEX / streaming / USE_PENDING_FILTER all miss the cache.
+
+Relative dates compile to `datetime('now', ?)` with a "-N days" offset as the
+parameter, so SQLite resolves them against the current time on every run and
+a cached query never goes stale.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple
+from db.connection import get_db_path
+from db.rules_to_sql import rules_to_sql_query, rule_sets_to_sql_query
+from rules_engine.validator import get_rule_sets, validate_rules_json
+
+# Bump whenever validation or SQL generation changes, so old entries miss.
+ENGINE_VERSION = 3
+CACHE_DIR_SUFFIX = ".rules-cache"
+MAX_CACHE_ENTRIES = 32
+
+logger = logging.getLogger(__name__)
+
+class CompiledRules(NamedTuple):
+    rules_config: dict
+    query: str
+    params: List
+
+def compile_rules(rules_config, use_fts=False, columns=None, pending_only=False):
+    """Generate the SQL query and params for a validated rules config."""
+    if "rule_sets" in rules_config:
+        query, params = rule_sets_to_sql_query(
+            get_rule_sets(rules_config), use_fts=use_fts, columns=columns, pending_only=pending_only
+        )
+    else:
+        query, params = rules_to_sql_query(rules_config, use_fts=use_fts, columns=columns, pending_only=pending_only)
+    return CompiledRules(rules_config, query, params)
+
+def get_cache_dir(db_path=None):
+    """The cache directory that belongs to the (configured) database file."""
+    db_file = Path(get_db_path(db_path))
+    return db_file.with_name(db_file.name + CACHE_DIR_SUFFIX)
+
+def cache_key(rules_bytes, use_fts=False, columns=None, pending_only=False):
+    options = json.dumps([ENGINE_VERSION, use_fts, list(columns) if columns else None, pending_only])
+    digest = hashlib.sha256(options.encode())
+    digest.update(b"\0")
+    digest.update(rules_bytes)
+    return digest.hexdigest()
+
+def read_entry(path):
+    """Return the CompiledRules stored at `path`, or None if it is missing or unreadable."""
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+        return CompiledRules(entry["rules_config"], entry["query"], entry["params"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable rule cache entry {path}: {e}")
+        return None
+
+def write_entry(path, compiled):
+    """Write an entry atomically, then drop the oldest entries past MAX_CACHE_ENTRIES."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as f:
+        json.dump(compiled._asdict(), f)
+    os.replace(f.name, path)
+
+    entries = sorted(path.parent.glob("*.json"), key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for stale in entries[MAX_CACHE_ENTRIES:]:
+        stale.unlink(missing_ok=True)
+
+def load_compiled_rules(rules_file, use_fts=False, columns=None, pending_only=False, cache_dir=None):
+    """
+    Return the CompiledRules for a rules file, validating and compiling it
+    only when no cache entry exists for its current contents. Invalid rules
+    raise RuleValidationError and are never cached; a cache that cannot be
+    written only costs the next run a recompile.
+    """
+    rules_bytes = Path(rules_file).read_bytes()
+    cache_dir = get_cache_dir() if cache_dir is None else Path(cache_dir)
+    path = cache_dir / f"{cache_key(rules_bytes, use_fts, columns, pending_only)}.json"
+
+    compiled = read_entry(path)
+    if compiled is not None:
+        return compiled
+
+    rules_config = json.loads(rules_bytes)
+    validate_rules_json(rules_config)
+    compiled = compile_rules(rules_config, use_fts=use_fts, columns=columns, pending_only=pending_only)
+    try:
+        write_entry(path, compiled)
+    except OSError as e:
+        logger.warning(f"Could not write rule cache entry {path}: {e}")
+    return compiled
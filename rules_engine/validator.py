@@ -49,7 +49,36 @@ def validate_actions(actions):
             if action not in ALLOWED_ACTIONS:
                 raise RuleValidationError(f"Invalid action: {action}")
 
+def validate_rule_set(rule_set):
+    if "name" not in rule_set:
+        raise RuleValidationError(f"Rule set missing required key 'name': {rule_set}")
+    if "rule_sets" in rule_set:
+        raise RuleValidationError(f"Rule set '{rule_set['name']}' cannot contain nested rule_sets")
+
+    priority = rule_set.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        raise RuleValidationError(f"Invalid priority for rule set '{rule_set['name']}': {priority}")
+    if not isinstance(rule_set.get("stop_processing", False), bool):
+        raise RuleValidationError(f"Invalid stop_processing for rule set '{rule_set['name']}'")
+
+    validate_rules_json(rule_set)
+
+def validate_rule_sets(rule_sets):
+    if not isinstance(rule_sets, list) or not rule_sets:
+        raise RuleValidationError("'rule_sets' must be a non-empty list")
+
+    names = set()
+    for rule_set in rule_sets:
+        validate_rule_set(rule_set)
+        if rule_set["name"] in names:
+            raise RuleValidationError(f"Duplicate rule set name: {rule_set['name']}")
+        names.add(rule_set["name"])
+
 def validate_rules_json(rules_json):
+    if "rule_sets" in rules_json:
+        validate_rule_sets(rules_json["rule_sets"])
+        return True
+
     if "rules_predicate" not in rules_json or "rules" not in rules_json or "actions" not in rules_json:
         raise RuleValidationError("Missing top-level keys: 'rules_predicate', 'rules', or 'actions'")
 
@@ -68,3 +97,17 @@ def load_and_validate_rules(file_path):
         rules_json = json.load(f)
     validate_rules_json(rules_json)
     return rules_json
+
+def get_rule_sets(rules_json):
+    """
+    Return the rule sets of a rules file in evaluation order (ascending priority,
+    then file order). A single-rule-set file becomes one rule set named "default".
+    """
+    if "rule_sets" not in rules_json:
+        return [dict(rules_json, name="default", priority=0, stop_processing=False)]
+
+    rule_sets = [
+        dict(rule_set, priority=rule_set.get("priority", 0), stop_processing=rule_set.get("stop_processing", False))
+        for rule_set in rules_json["rule_sets"]
+    ]
+    return sorted(rule_sets, key=lambda rule_set: rule_set["priority"])
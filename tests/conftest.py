@@ -2,6 +2,15 @@ import pytest
 from unittest import mock
 from pathlib import Path
 import json
+from db.connection import DB_PATH_ENV, close_pools
+
+@pytest.fixture(autouse=True)
+def isolated_emails_db(tmp_path, monkeypatch):
+    """Point the default database at a per-test file and drop pooled connections afterwards."""
+    db_file = tmp_path / "emails.db"
+    monkeypatch.setenv(DB_PATH_ENV, str(db_file))
+    yield db_file
+    close_pools()
 
 @pytest.fixture
 def mock_gmail_dependencies():
@@ -0,0 +1,75 @@
+import pytest
+import sqlite3
+from unittest import mock
+from db.create_emails_table import create_emails_table
+from db.connection import connection
+from db.bulk_loader import bulk_load_emails, email_to_row, iter_batches
+
+
+@pytest.fixture
+def emails_db(tmp_path):
+    db_file = str(tmp_path / "emails.db")
+    create_emails_table(db_file)
+    return db_file
+
+
+def make_email(i, **overrides):
+    email = {
+        "id": str(i),
+        "subject": f"Subject {i}",
+        "from": "alice@example.com",
+        "to": "you@example.com",
+        "snippet": "snippet",
+        "body": "body",
+        "received_at": "2025-10-13 12:00:00",
+        "is_read": 0,
+        "is_starred": 0,
+        "inbox_type": "INBOX",
+    }
+    email.update(overrides)
+    return email
+
+
+def test_iter_batches_splits_lazily():
+    assert list(iter_batches(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_batches(iter([]), 3)) == []
+
+
+def test_bulk_load_emails_streams_generator_in_batches(emails_db):
+    emails = (make_email(i) for i in range(1050))
+
+    with mock.patch("db.bulk_loader.connection", wraps=connection) as mock_connection:
+        stats = bulk_load_emails(emails, emails_db, batch_size=500)
+
+    mock_connection.assert_called_once_with(emails_db)
+    assert stats["rows"] == 1050
+    assert stats["rows_per_sec"] > 0
+    conn = sqlite3.connect(emails_db)
+    assert conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0] == 1050
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_bulk_load_emails_upserts_existing_rows(emails_db):
+    bulk_load_emails([make_email(1)], emails_db)
+    bulk_load_emails([make_email(1, subject="Updated", is_read=1, inbox_type="TRASH")], emails_db)
+
+    conn = sqlite3.connect(emails_db)
+    row = conn.execute("SELECT subject, is_read, inbox_type FROM emails WHERE id = '1'").fetchone()
+    conn.close()
+    assert row == ("Updated", 1, "TRASH")
+
+
+def test_bulk_load_emails_rolls_back_failed_batch(emails_db):
+    emails = [make_email(i) for i in range(4)]
+
+    def to_row(email):
+        row = email_to_row(email)
+        return row[:-1] if email["id"] == "3" else row
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        bulk_load_emails(emails, emails_db, batch_size=2, to_row=to_row)
+
+    conn = sqlite3.connect(emails_db)
+    assert conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0] == 2
+    conn.close()
@@ -0,0 +1,82 @@
+import pytest
+import threading
+from db.connection import ConnectionPool, connection, get_db_path, get_pool, transaction
+
+
+@pytest.fixture
+def emails_db(isolated_emails_db):
+    with transaction() as conn:
+        conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, is_read BOOLEAN)")
+        conn.execute("INSERT INTO emails VALUES ('a', 0)")
+    return isolated_emails_db
+
+
+def test_db_path_comes_from_environment(monkeypatch):
+    monkeypatch.setenv("EMAILS_DB", "/tmp/other.db")
+    assert get_db_path() == "/tmp/other.db"
+    assert get_db_path("explicit.db") == "explicit.db"
+    monkeypatch.delenv("EMAILS_DB")
+    assert get_db_path() == "emails.db"
+
+
+def test_pool_reuses_connections(emails_db):
+    with connection() as first:
+        pass
+    with connection() as second:
+        pass
+
+    assert first is second
+    assert get_pool() is get_pool(str(emails_db))
+
+
+def test_connections_are_configured(emails_db):
+    with connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+
+def test_transaction_commits_or_rolls_back(emails_db):
+    with transaction() as conn:
+        conn.execute("UPDATE emails SET is_read = 1 WHERE id = 'a'")
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            conn.execute("UPDATE emails SET is_read = 0 WHERE id = 'a'")
+            raise RuntimeError("boom")
+
+    with connection() as conn:
+        assert conn.execute("SELECT is_read FROM emails WHERE id = 'a'").fetchone()[0] == 1
+
+
+def test_pool_blocks_beyond_max_size(emails_db):
+    pool = ConnectionPool(str(emails_db), max_size=1)
+    conn = pool.acquire()
+    acquired = threading.Event()
+
+    def borrow():
+        with pool.connection():
+            acquired.set()
+
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    assert not acquired.wait(0.1)
+    pool.release(conn)
+    thread.join(timeout=5)
+    assert acquired.is_set()
+    pool.close()
+
+
+def test_concurrent_writers_share_the_pool(emails_db):
+    def insert(start):
+        for i in range(start, start + 50):
+            with transaction() as conn:
+                conn.execute("INSERT INTO emails VALUES (?, 0)", (str(i),))
+
+    threads = [threading.Thread(target=insert, args=(n * 50,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0] == 201
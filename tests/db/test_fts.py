@@ -0,0 +1,97 @@
+import pytest
+import sqlite3
+from db.create_emails_table import create_emails_table
+from db.bulk_loader import bulk_load_emails
+from db.fts import can_use_fts, create_fts_index, drop_fts_index, fts_phrase_query, has_fts_index
+from db.rules_to_sql import rules_to_sql_query
+
+
+def make_email(i, subject, body="", sender="alice@example.com"):
+    return {
+        "id": str(i), "subject": subject, "from": sender, "to": "you@example.com",
+        "snippet": (body or "")[:20], "body": body, "received_at": "2025-10-13 12:00:00",
+        "is_read": 0, "is_starred": 0, "inbox_type": "INBOX",
+    }
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_file = str(tmp_path / "emails.db")
+    create_emails_table(db_file)
+    bulk_load_emails([
+        make_email(1, "Your Invoice #42", "Please pay the invoice"),
+        make_email(2, "Meeting notes", "Agenda: invoices, budget"),
+        make_email(3, "Crème brûlée recipe", "Dessert 100% guaranteed"),
+        make_email(4, "Newsletter", "Unsubscribe_here", sender="news@shop.example"),
+        make_email(5, None, None),
+    ], db_file)
+    conn = sqlite3.connect(db_file)
+    create_fts_index(conn)
+    yield conn
+    conn.close()
+
+
+def matching_ids(conn, rules_data, use_fts):
+    query, params = rules_to_sql_query(rules_data, use_fts=use_fts)
+    return sorted(row[0] for row in conn.execute(query, params))
+
+
+def test_can_use_fts():
+    assert can_use_fts("subject", "invoice")
+    assert not can_use_fts("subject", "in")
+    assert not can_use_fts("subject", "100%")
+    assert not can_use_fts("body", "a_b")
+    assert not can_use_fts("received_at", "2025")
+
+
+def test_fts_phrase_query_escapes_quotes():
+    assert fts_phrase_query("subject", 'say "hi"') == 'subject : "say ""hi"""'
+
+
+def test_contains_query_uses_fts_subquery():
+    query, params = rules_to_sql_query(
+        {"rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}]}, use_fts=True
+    )
+    assert "emails_fts MATCH ?" in query
+    assert params == ['subject : "invoice"', "%invoice%"]
+
+
+@pytest.mark.parametrize("field,predicate,value", [
+    ("subject", "contains", "invoice"),
+    ("subject", "contains", "INVOICE"),
+    ("body", "contains", "voice"),
+    ("body", "contains", "100%"),
+    ("body", "contains", "e_h"),
+    ("subject", "contains", "rè"),
+    ("subject", "contains", "brûlée"),
+    ("sender", "contains", "shop.example"),
+    ("body", "does_not_contain", "invoice"),
+])
+def test_fts_path_matches_like_path(conn, field, predicate, value):
+    rules_data = {"rules_predicate": "any", "rules": [
+        {"field": field, "predicate": predicate, "value": value},
+        {"field": "subject", "predicate": "equals", "value": "Meeting notes"},
+    ]}
+
+    assert matching_ids(conn, rules_data, use_fts=True) == matching_ids(conn, rules_data, use_fts=False)
+
+
+def test_triggers_keep_index_in_sync(conn):
+    rules_data = {"rules": [{"field": "subject", "predicate": "contains", "value": "quarterly"}]}
+
+    conn.execute("INSERT INTO emails (id, subject) VALUES ('6', 'Quarterly report')")
+    assert matching_ids(conn, rules_data, use_fts=True) == ["6"]
+
+    conn.execute("UPDATE emails SET subject = 'Quarterly report v2' WHERE id = '1'")
+    conn.execute("UPDATE emails SET subject = 'Annual report' WHERE id = '6'")
+    assert matching_ids(conn, rules_data, use_fts=True) == ["1"]
+
+    conn.execute("DELETE FROM emails WHERE id = '1'")
+    assert matching_ids(conn, rules_data, use_fts=True) == []
+
+
+def test_drop_fts_index(conn):
+    assert has_fts_index(conn)
+    drop_fts_index(conn)
+    assert not has_fts_index(conn)
+    conn.execute("INSERT INTO emails (id, subject) VALUES ('7', 'still writable')")
@@ -0,0 +1,170 @@
+import pytest
+import sqlite3
+from db.create_emails_table import create_emails_table
+from db import incremental_sync
+from gmail.stub_service import StubGmailService, StubHttpError, build_stub_message
+
+
+@pytest.fixture
+def emails_db(isolated_emails_db):
+    create_emails_table()
+    return isolated_emails_db
+
+
+@pytest.fixture
+def stub_service():
+    return StubGmailService([
+        build_stub_message(f"msg{i}", subject=f"Subject {i}", sender="a@example.com", body="Body")
+        for i in range(5)
+    ])
+
+
+def fetch_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    rows = {row["id"]: dict(row) for row in conn.execute("SELECT * FROM emails")}
+    conn.close()
+    return rows
+
+
+def test_first_sync_is_full_and_saves_checkpoint(emails_db, stub_service):
+    stats = incremental_sync.sync_emails(stub_service)
+
+    assert stats["mode"] == "full"
+    assert len(fetch_rows(emails_db)) == 5
+    conn = sqlite3.connect(emails_db)
+    assert incremental_sync.get_checkpoint(conn) == str(stub_service.history_id)
+    conn.close()
+
+
+def test_incremental_sync_applies_only_changes(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    stub_service.calls.clear()
+
+    stub_service.add_message(build_stub_message("new1", subject="New", sender="b@example.com"))
+    stub_service.delete_message("msg0")
+    stub_service.users().messages().modify(userId="me", id="msg1", body={"removeLabelIds": ["UNREAD"]}).execute()
+    stub_service.users().messages().modify(
+        userId="me", id="msg2", body={"addLabelIds": ["SPAM", "STARRED"], "removeLabelIds": ["INBOX"]}
+    ).execute()
+
+    stats = incremental_sync.sync_emails(stub_service)
+
+    assert stats == {"mode": "incremental", "added": 1, "deleted": 1, "updated": 2, "history_id": str(stub_service.history_id)}
+    assert stub_service.calls_for("messages.list") == []
+    rows = fetch_rows(emails_db)
+    assert "msg0" not in rows
+    assert rows["new1"]["subject"] == "New"
+    assert rows["msg1"]["is_read"] == 1
+    assert rows["msg2"]["inbox_type"] == "SPAM"
+    assert rows["msg2"]["is_starred"] == 1
+
+
+def test_sync_with_no_changes_fetches_nothing(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    stub_service.calls.clear()
+
+    stats = incremental_sync.sync_emails(stub_service)
+
+    assert stats["added"] == stats["deleted"] == stats["updated"] == 0
+    assert stub_service.calls_for("messages.get") == []
+
+
+def test_expired_history_falls_back_to_full_sync(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    stub_service.add_message(build_stub_message("new1"))
+    stub_service.expire_history()
+
+    stats = incremental_sync.sync_emails(stub_service)
+
+    assert stats["mode"] == "full"
+    assert "new1" in fetch_rows(emails_db)
+
+
+def test_full_sync_refreshes_label_columns(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    stub_service.messages["msg3"]["labelIds"] = ["SENT"]
+
+    incremental_sync.full_sync(stub_service)
+
+    row = fetch_rows(emails_db)["msg3"]
+    assert row["is_read"] == 1
+    assert row["inbox_type"] == "SENT"
+
+
+def test_sync_changes_collects_added_messages(emails_db, stub_service):
+    first = []
+    incremental_sync.sync_changes(stub_service, first)
+    stub_service.add_message(build_stub_message("new1", subject="New", sender="b@example.com"))
+
+    added = []
+    incremental_sync.sync_changes(stub_service, added)
+
+    assert first == []
+    assert [(email["id"], email["subject"]) for email in added] == [("new1", "New")]
+
+
+def test_transient_fetch_failure_keeps_the_checkpoint(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    checkpoint = str(stub_service.history_id)
+    stub_service.add_message(build_stub_message("new1", subject="New"))
+    stub_service.inject_error("messages.get", StubHttpError(503))
+
+    with pytest.raises(incremental_sync.MessageFetchError):
+        incremental_sync.sync_changes(stub_service)
+
+    conn = sqlite3.connect(emails_db)
+    assert incremental_sync.get_checkpoint(conn) == checkpoint
+    conn.close()
+    assert "new1" not in fetch_rows(emails_db)
+
+    stats = incremental_sync.sync_changes(stub_service)
+    assert stats["added"] == 1
+    assert "new1" in fetch_rows(emails_db)
+
+
+def test_messages_gone_before_fetch_are_skipped(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    stub_service.add_message(build_stub_message("new1"))
+    del stub_service.messages["new1"]
+
+    stats = incremental_sync.sync_changes(stub_service)
+
+    assert stats["added"] == 0
+    assert "new1" not in fetch_rows(emails_db)
+
+
+def test_full_sync_fallback_removes_messages_deleted_meanwhile(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    stub_service.delete_message("msg0")
+    stub_service.expire_history()
+
+    stats = incremental_sync.sync_changes(stub_service)
+
+    assert stats["mode"] == "full"
+    assert stats["deleted"] == 1
+    assert "msg0" not in fetch_rows(emails_db)
+
+
+def test_full_sync_fallback_keeps_spam_and_trash(emails_db, stub_service):
+    incremental_sync.sync_emails(stub_service)
+    messages = stub_service.users().messages()
+    messages.modify(userId="me", id="msg1", body={"addLabelIds": ["TRASH"], "removeLabelIds": ["INBOX"]}).execute()
+    messages.modify(userId="me", id="msg2", body={"addLabelIds": ["SPAM"], "removeLabelIds": ["INBOX"]}).execute()
+    stub_service.expire_history()
+
+    stats = incremental_sync.sync_changes(stub_service)
+
+    rows = fetch_rows(emails_db)
+    assert stats["mode"] == "full"
+    assert stats["deleted"] == 0
+    assert (rows["msg1"]["inbox_type"], rows["msg2"]["inbox_type"]) == ("TRASH", "SPAM")
+
+
+def test_full_sync_refetches_messages_that_failed(emails_db, stub_service):
+    stub_service.inject_error("messages.get", StubHttpError(503))
+
+    stats = incremental_sync.full_sync(stub_service)
+
+    assert stats["added"] == 5
+    assert len(fetch_rows(emails_db)) == 5
@@ -0,0 +1,86 @@
+import pytest
+import sqlite3
+from db.migrations import MIGRATIONS, get_schema_version, migrate
+from db.rules_to_sql import rules_to_sql_query
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    yield conn
+    conn.close()
+
+
+def query_plan(conn, rules_data):
+    query, params = rules_to_sql_query(rules_data)
+    return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+
+
+def test_migrate_applies_all_steps_in_order(conn):
+    applied = migrate(conn)
+
+    assert applied == [version for version, _, _ in MIGRATIONS]
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_emails_received_at", "idx_emails_sender", "idx_emails_recipient",
+            "idx_emails_inbox_type", "idx_emails_is_read"} <= indexes
+
+
+def test_migrate_is_idempotent(conn):
+    migrate(conn)
+    assert migrate(conn) == []
+
+
+def test_migrate_up_to_target_version(conn):
+    assert migrate(conn, target_version=1) == [1]
+    assert get_schema_version(conn) == 1
+    assert migrate(conn) == [version for version, _, _ in MIGRATIONS if version > 1]
+
+
+def test_migrate_upgrades_database_created_before_versioning(conn):
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, subject TEXT, sender TEXT, recipient TEXT, snippet TEXT, "
+                 "body TEXT, received_at TEXT, is_read BOOLEAN, is_starred BOOLEAN, inbox_type TEXT)")
+    conn.execute("INSERT INTO emails (id) VALUES ('1')")
+    conn.commit()
+
+    migrate(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0] == 1
+
+
+def test_failed_migration_rolls_back(conn):
+    broken = MIGRATIONS + [(99, "broken", ["CREATE INDEX idx_ok ON emails (subject)", "CREATE INDEX bad ON missing (x)"])]
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn, migrations=broken)
+
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_ok'").fetchone() is None
+
+
+@pytest.mark.parametrize("rules_data,index", [
+    ({"rules": [{"field": "sender", "predicate": "equals", "value": "a@example.com"}]}, "idx_emails_sender"),
+    ({"rules": [{"field": "recipient", "predicate": "equals", "value": "me@example.com"}]}, "idx_emails_recipient"),
+    ({"rules": [{"field": "received_at", "predicate": "less_than", "value": "5 days"}]}, "idx_emails_received_at"),
+    ({"rules": [{"field": "received_at", "predicate": "greater_than", "value": "2 months"}]}, "idx_emails_received_at"),
+])
+def test_generated_queries_use_indexes(conn, rules_data, index):
+    migrate(conn)
+
+    plan = query_plan(conn, rules_data)
+
+    assert f"USING INDEX {index}" in plan
+    assert "SCAN emails" not in plan
+
+
+def test_any_predicate_across_indexed_columns_uses_multi_index(conn):
+    migrate(conn)
+    rules_data = {"rules_predicate": "any", "rules": [
+        {"field": "sender", "predicate": "equals", "value": "a@example.com"},
+        {"field": "received_at", "predicate": "less_than", "value": "1 days"},
+    ]}
+
+    plan = query_plan(conn, rules_data)
+
+    assert "MULTI-INDEX OR" in plan
+    assert "idx_emails_sender" in plan and "idx_emails_received_at" in plan
@@ -0,0 +1,75 @@
+import pytest
+import sqlite3
+from unittest import mock
+from db.create_emails_table import create_emails_table
+from db import populate_emails
+from gmail.stub_service import StubGmailService, build_stub_message
+
+
+@pytest.fixture
+def emails_db(tmp_path):
+    db_file = str(tmp_path / "emails.db")
+    create_emails_table(db_file)
+    return db_file
+
+
+@pytest.fixture
+def stub_service():
+    messages = [
+        build_stub_message(f"msg{i}", subject=f"Subject {i}", sender="a@example.com", body="Body")
+        for i in range(1200)
+    ]
+    service = StubGmailService(messages)
+    with mock.patch("gmail.client.get_gmail_service", return_value=service):
+        yield service
+
+
+def count_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    count = conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_parse_received_at_normalizes_to_utc():
+    assert populate_emails.parse_received_at("Mon, 13 Oct 2025 14:00:00 +0200") == "2025-10-13 12:00:00"
+    assert populate_emails.parse_received_at("13 Oct 2025 12:00:00 GMT") == "2025-10-13 12:00:00"
+    assert populate_emails.parse_received_at("Tue, 7 Jan 2025 08:05:09 -0800 (PST)") == "2025-01-07 16:05:09"
+    assert populate_emails.parse_received_at("Mon, 13 Oct 2025 12:00:00 -0000") == "2025-10-13 12:00:00"
+
+
+def test_unparseable_received_at_is_reported_once(caplog):
+    populate_emails.parse_received_at.cache_clear()
+
+    assert populate_emails.parse_received_at("not a date") is None
+    assert populate_emails.parse_received_at("not a date") is None
+    assert populate_emails.parse_received_at(None) is None
+    assert len(caplog.records) == 1
+
+
+def test_internal_date_takes_precedence_over_the_date_header():
+    email = {"received_at": "Mon, 13 Oct 2025 14:00:00 +0200", "internal_date": "1760360405000"}
+
+    assert populate_emails.fetched_received_at(email) == "2025-10-13 13:00:05"
+    assert populate_emails.fetched_received_at(dict(email, internal_date=None)) == "2025-10-13 12:00:00"
+    assert populate_emails.fetched_received_at(dict(email, internal_date="bogus")) == "2025-10-13 12:00:00"
+
+
+def test_store_emails_in_db_syncs_every_page(emails_db, stub_service):
+    stored = populate_emails.store_emails_in_db(max_results=None)
+
+    assert stored == 1200
+    assert count_rows(emails_db) == 1200
+    assert len(stub_service.calls_for("messages.list")) == 3
+
+
+def test_store_emails_in_db_respects_max_results(emails_db, stub_service):
+    stored = populate_emails.store_emails_in_db(max_results=10)
+
+    assert stored == 10
+    assert count_rows(emails_db) == 10
+
+
+def test_store_emails_in_db_with_no_emails(emails_db):
+    with mock.patch("gmail.client.get_gmail_service", return_value=StubGmailService()):
+        assert populate_emails.store_emails_in_db() == 0
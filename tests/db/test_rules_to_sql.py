@@ -1,5 +1,8 @@
 import pytest
-from db.rules_to_sql import rules_to_sql_query
+import sqlite3
+from db.rules_to_sql import rules_to_sql_query, rule_sets_to_sql_query
+from gmail.client import get_label_delta
+from gmail.utils import get_inbox_type
 
 def test_contains_predicate():
     rules_data = {
@@ -88,3 +91,123 @@ def test_unknown_field_raises():
     }
     with pytest.raises(ValueError, match="Unknown field"):
         rules_to_sql_query(rules_data)
+
+def test_rule_sets_to_sql_query_selects_match_flags():
+    rule_sets = [
+        {"rules_predicate": "all", "rules": [{"field": "Subject", "predicate": "contains", "value": "invoice"}]},
+        {"rules_predicate": "any", "rules": [
+            {"field": "Sender", "predicate": "equals", "value": "a@example.com"},
+            {"field": "Sender", "predicate": "equals", "value": "b@example.com"},
+        ]},
+    ]
+    query, params = rule_sets_to_sql_query(rule_sets)
+
+    assert query == (
+        "SELECT * FROM (SELECT *, "
+        "CASE WHEN subject LIKE ? THEN 1 ELSE 0 END AS rule_0, "
+        "CASE WHEN sender = ? OR sender = ? THEN 1 ELSE 0 END AS rule_1 "
+        "FROM emails) WHERE rule_0 = 1 OR rule_1 = 1;"
+    )
+    assert params == ["%invoice%", "a@example.com", "b@example.com"]
+
+def test_rule_sets_to_sql_query_flags_each_row_in_one_scan():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, subject TEXT, sender TEXT)")
+    conn.executemany("INSERT INTO emails VALUES (?, ?, ?)", [
+        ("1", "Invoice 42", "a@example.com"),
+        ("2", "Hello", "a@example.com"),
+        ("3", "Invoice 43", "c@example.com"),
+        ("4", "Hello", "c@example.com"),
+    ])
+    rule_sets = [
+        {"rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}]},
+        {"rules": [{"field": "sender", "predicate": "equals", "value": "a@example.com"}]},
+    ]
+    query, params = rule_sets_to_sql_query(rule_sets)
+
+    rows = conn.execute(query, params).fetchall()
+
+    assert sorted((row[0], row[-2], row[-1]) for row in rows) == [("1", 1, 1), ("2", 0, 1), ("3", 1, 0)]
+
+def test_rule_sets_to_sql_query_requires_rule_sets():
+    with pytest.raises(ValueError, match="At least one rule set"):
+        rule_sets_to_sql_query([])
+
+def test_queries_select_only_requested_columns():
+    rules = {"rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}]}
+
+    query, _ = rules_to_sql_query(rules, columns=("id", "subject"))
+    assert query == "SELECT id, subject FROM emails WHERE subject LIKE ?;"
+
+    query, _ = rule_sets_to_sql_query([rules], columns=("id",))
+    assert query.startswith("SELECT * FROM (SELECT id, CASE WHEN subject LIKE ?")
+
+def make_state_db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, subject TEXT, is_read BOOLEAN, inbox_type TEXT)")
+    conn.executemany("INSERT INTO emails VALUES (?, ?, ?, ?)", [
+        ("unread", "Invoice", 0, "INBOX"),
+        ("read", "Invoice", 1, "INBOX"),
+        ("trashed", "Invoice", 1, "TRASH"),
+        ("unknown", "Invoice", None, None),
+    ])
+    return conn
+
+def test_pending_only_skips_emails_already_done():
+    conn = make_state_db()
+    rules = {
+        "rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}],
+        "actions": ["mark_as_read", "move_message:TRASH"],
+    }
+
+    query, params = rules_to_sql_query(rules, pending_only=True)
+    assert {row[0] for row in conn.execute(query, params)} == {"unread", "read", "unknown"}
+
+    rules["actions"] = ["mark_as_read"]
+    query, params = rules_to_sql_query(rules, pending_only=True)
+    assert {row[0] for row in conn.execute(query, params)} == {"unread", "unknown"}
+
+@pytest.mark.parametrize("folder", ["INBOX", "SENT", "SPAM"])
+def test_pending_only_keeps_moves_a_higher_inbox_type_can_mask(folder):
+    rules = {
+        "rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}],
+        "actions": [f"move_message:{folder}"],
+    }
+
+    assert rules_to_sql_query(rules, pending_only=True) == rules_to_sql_query(rules)
+
+@pytest.mark.parametrize("labels", [["INBOX"], ["SENT"], ["SPAM"], ["TRASH"], ["INBOX", "SENT"], ["SENT", "TRASH"]])
+def test_pending_trash_move_reads_done_once_applied(labels):
+    add_labels, remove_labels = get_label_delta("move_message:TRASH")
+    labels = [label for label in labels if label not in remove_labels] + list(add_labels)
+    conn = make_state_db()
+    conn.execute("DELETE FROM emails")
+    conn.execute("INSERT INTO emails VALUES ('moved', 'Invoice', 1, ?)", (get_inbox_type(labels),))
+    rules = {
+        "rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}],
+        "actions": ["move_message:TRASH"],
+    }
+
+    query, params = rules_to_sql_query(rules, pending_only=True)
+    assert conn.execute(query, params).fetchall() == []
+
+def test_pending_only_keeps_actions_it_cannot_check():
+    rules = {
+        "rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}],
+        "actions": ["mark_as_read", "move_message:Receipts"],
+    }
+
+    assert rules_to_sql_query(rules, pending_only=True) == rules_to_sql_query(rules)
+
+def test_rule_sets_pending_only_keeps_match_flags():
+    conn = make_state_db()
+    rule_sets = [
+        {"rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}], "actions": ["mark_as_read"]},
+        {"rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}], "actions": ["move_message:TRASH"]},
+    ]
+
+    query, params = rule_sets_to_sql_query(rule_sets, columns=("id",), pending_only=True)
+    rows = {row[0]: row[-2:] for row in conn.execute(query, params)}
+
+    assert set(rows) == {"unread", "read", "unknown"}
+    assert rows["read"] == (1, 1)
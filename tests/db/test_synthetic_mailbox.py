@@ -0,0 +1,56 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from db.create_emails_table import create_emails_table
+from db.synthetic_mailbox import DEFAULT_END, MAX_BODY, generate_mailbox, populate_mailbox
+
+
+def test_same_seed_same_mailbox():
+    assert list(generate_mailbox(50, seed=1)) == list(generate_mailbox(50, seed=1))
+    assert list(generate_mailbox(50, seed=1)) != list(generate_mailbox(50, seed=2))
+
+
+def test_generator_is_lazy():
+    emails = generate_mailbox(10 ** 9)
+    assert [email["id"] for email in islice(emails, 3)] == ["0000000000000000", "0000000000000001", "0000000000000002"]
+
+
+def test_distributions():
+    emails = list(generate_mailbox(5000, years=2))
+
+    senders = Counter(email["from"] for email in emails)
+    top_share = sum(count for _, count in senders.most_common(10)) / len(emails)
+    assert top_share > 0.25
+    assert len(senders) > 1000
+
+    sizes = [len(email["body"]) for email in emails]
+    assert min(sizes) < 200 and max(sizes) > 50_000 and max(sizes) <= MAX_BODY
+    assert all(email["snippet"] == email["body"][:100] for email in emails)
+
+    dates = [email["received_at"] for email in emails]
+    assert dates == sorted(dates)
+    start = (DEFAULT_END - timedelta(days=2 * 365)).strftime("%Y-%m-%d %H:%M:%S")
+    assert start <= dates[0] < dates[-1] <= DEFAULT_END.strftime("%Y-%m-%d %H:%M:%S")
+
+    read_ratio = sum(email["is_read"] for email in emails) / len(emails)
+    assert 0.8 < read_ratio < 0.9
+    assert Counter(email["inbox_type"] for email in emails).most_common(1)[0][0] == "INBOX"
+
+
+def test_custom_end_date():
+    end = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    last = list(generate_mailbox(100, end=end, years=1))[-1]
+    assert last["received_at"].startswith("2029") or last["received_at"].startswith("2030")
+
+
+def test_populate_mailbox_streams_into_the_database(tmp_path):
+    db_file = str(tmp_path / "mailbox.db")
+    create_emails_table(db_file)
+
+    stats = populate_mailbox(1200, db_path=db_file, batch_size=500)
+
+    assert stats["rows"] == 1200
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("SELECT COUNT(DISTINCT sender) FROM emails").fetchone()[0] > 100
+    conn.close()
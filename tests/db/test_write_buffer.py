@@ -0,0 +1,87 @@
+import pytest
+import sqlite3
+from db.write_buffer import EmailWriteBuffer, SqlExpression, record_email_updates
+
+
+@pytest.fixture
+def emails_db(tmp_path):
+    db_file = tmp_path / "emails.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, is_read BOOLEAN, inbox_type TEXT)")
+    conn.executemany("INSERT INTO emails VALUES (?, 0, 'INBOX')", [(str(i),) for i in range(1200)])
+    conn.commit()
+    conn.close()
+    return db_file
+
+
+def read_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    rows = {row[0]: row[1:] for row in conn.execute("SELECT id, is_read, inbox_type FROM emails")}
+    conn.close()
+    return rows
+
+
+def test_flush_coalesces_writes_per_email(emails_db):
+    buffer = EmailWriteBuffer(emails_db)
+    buffer.record("1", is_read=1)
+    buffer.record("1", is_read=0)
+    buffer.record("1", inbox_type="TRASH")
+    buffer.record_many(["2", "3"], is_read=1)
+
+    assert len(buffer) == 3
+    assert read_rows(emails_db)["2"] == (0, "INBOX")
+    assert buffer.flush() == 3
+
+    rows = read_rows(emails_db)
+    assert rows["1"] == (0, "TRASH")
+    assert rows["2"] == rows["3"] == (1, "INBOX")
+    assert len(buffer) == 0
+
+
+def test_flush_chunks_large_id_lists(emails_db):
+    buffer = EmailWriteBuffer(emails_db, flush_size=10_000)
+    buffer.record_many([str(i) for i in range(1200)], is_read=1)
+    buffer.flush()
+
+    assert all(is_read == 1 for is_read, _ in read_rows(emails_db).values())
+
+
+def test_sql_expressions_use_current_values(emails_db):
+    buffer = EmailWriteBuffer(emails_db)
+    buffer.record("1", inbox_type=SqlExpression("CASE WHEN inbox_type = 'INBOX' THEN ? ELSE inbox_type END", ("OTHER",)))
+    buffer.flush()
+
+    assert read_rows(emails_db)["1"] == (0, "OTHER")
+
+
+def test_flushes_when_full_and_on_exit(emails_db):
+    with EmailWriteBuffer(emails_db, flush_size=2) as buffer:
+        buffer.record("1", is_read=1)
+        buffer.record("2", is_read=1)
+        assert len(buffer) == 0
+        buffer.record("3", is_read=1)
+        assert read_rows(emails_db)["3"] == (0, "INBOX")
+
+    assert read_rows(emails_db)["3"] == (1, "INBOX")
+
+
+def test_failed_flush_writes_nothing(emails_db):
+    buffer = EmailWriteBuffer(emails_db)
+    buffer.record("1", is_read=1)
+    buffer.record("2", no_such_column=1)
+
+    with pytest.raises(sqlite3.OperationalError):
+        buffer.flush()
+
+    assert read_rows(emails_db)["1"] == (0, "INBOX")
+
+
+def test_record_email_updates_writes_now_or_into_the_buffer(emails_db):
+    record_email_updates(None, ["1"], is_read=1)
+    assert read_rows(emails_db)["1"] == (1, "INBOX")
+
+    buffer = EmailWriteBuffer(emails_db)
+    record_email_updates(buffer, ["2", "3"], inbox_type="TRASH")
+    assert read_rows(emails_db)["2"] == (0, "INBOX")
+    buffer.flush()
+    assert read_rows(emails_db)["3"] == (0, "TRASH")
@@ -0,0 +1,115 @@
+import pytest
+import sqlite3
+from functools import partial
+from unittest import mock
+from gmail.actions.batch_modify import batch_modify, get_inbox_type_update, get_read_state, get_starred_state
+from gmail.client import batch_modify as api_batch_modify, get_label_delta
+from gmail.stub_service import StubGmailService, StubHttpError, build_stub_message
+from gmail.utils import get_inbox_type
+
+
+@pytest.fixture
+def emails_db(tmp_path):
+    db_file = tmp_path / "emails.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, is_read BOOLEAN, inbox_type TEXT)")
+    conn.executemany("INSERT INTO emails VALUES (?, 0, 'INBOX')", [("a",), ("b",), ("c",)])
+    conn.commit()
+    conn.close()
+    return db_file
+
+
+@pytest.fixture
+def stub_service():
+    service = StubGmailService()
+    with (
+        mock.patch("gmail.actions.batch_modify.get_gmail_service", return_value=service),
+        mock.patch("gmail.actions.batch_modify.api_batch_modify", partial(api_batch_modify, chunk_size=2)),
+    ):
+        yield service
+
+
+def read_states(db_file):
+    conn = sqlite3.connect(db_file)
+    rows = dict(conn.execute("SELECT id, is_read FROM emails").fetchall())
+    conn.close()
+    return rows
+
+
+def test_get_read_state():
+    assert get_read_state((), ("UNREAD",)) == 1
+    assert get_read_state(("UNREAD",), ()) == 0
+    assert get_read_state(("TRASH",), ("INBOX",)) is None
+
+
+def test_get_starred_state():
+    assert get_starred_state(("STARRED",), ("INBOX",)) == 1
+    assert get_starred_state((), ("STARRED",)) == 0
+    assert get_starred_state(("TRASH",), ("INBOX",)) is None
+
+
+def test_get_inbox_type_update():
+    assert get_inbox_type_update(("TRASH",), ("INBOX",)) == ("?", ("TRASH",))
+    assert get_inbox_type_update(("Receipts",), ("INBOX",)).params == ("INBOX", "OTHER")
+    assert get_inbox_type_update(("UNREAD",), ()) is None
+
+
+def test_batch_modify_updates_inbox_type(emails_db, stub_service):
+    batch_modify(["a", "b"], add_labels=("TRASH",), remove_labels=("INBOX",))
+
+    conn = sqlite3.connect(emails_db)
+    rows = dict(conn.execute("SELECT id, inbox_type FROM emails").fetchall())
+    conn.close()
+    assert rows == {"a": "TRASH", "b": "TRASH", "c": "INBOX"}
+
+
+@pytest.mark.parametrize("stored, labels, folder", [
+    ("OTHER", ["Receipts"], "SPAM"),
+    ("SPAM", ["SPAM"], "SENT"),
+    ("SENT", ["SENT"], "SPAM"),
+    ("TRASH", ["TRASH"], "INBOX"),
+    ("INBOX", ["INBOX"], "SPAM"),
+])
+def test_batch_modify_inbox_type_follows_gmail_labels(tmp_path, stored, labels, folder):
+    db_file = tmp_path / "emails.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, is_read BOOLEAN, inbox_type TEXT)")
+    conn.execute("INSERT INTO emails VALUES ('a', 1, ?)", (stored,))
+    conn.commit()
+    conn.close()
+    service = StubGmailService([build_stub_message("a", label_ids=labels)])
+
+    batch_modify(["a"], *get_label_delta(f"move_message:{folder}"), service=service)
+
+    conn = sqlite3.connect(db_file)
+    inbox_type = conn.execute("SELECT inbox_type FROM emails").fetchone()[0]
+    assert inbox_type == get_inbox_type(service.messages["a"]["labelIds"])
+    conn.close()
+
+
+def test_batch_modify_updates_db_for_all_chunks(emails_db, stub_service):
+    results = batch_modify(["a", "b", "c"], remove_labels=("UNREAD",))
+
+    assert len(stub_service.calls_for("messages.batchModify")) == 2
+    assert [result["error"] for result in results] == [None, None]
+    assert read_states(emails_db) == {"a": 1, "b": 1, "c": 1}
+
+
+def test_batch_modify_skips_db_for_failed_chunk(emails_db, stub_service):
+    stub_service.inject_error("messages.batchModify", StubHttpError(500, "Backend Error"))
+
+    results = batch_modify(["a", "b", "c"], remove_labels=("UNREAD",))
+
+    assert results[0]["error"] is not None
+    assert results[1]["error"] is None
+    assert read_states(emails_db) == {"a": 0, "b": 0, "c": 1}
+
+
+def test_batch_modify_records_only_succeeded_chunks_in_write_buffer(emails_db, stub_service):
+    stub_service.inject_error("messages.batchModify", StubHttpError(500))
+    writes = mock.Mock()
+
+    batch_modify(["a", "b", "c"], remove_labels=("UNREAD",), writes=writes)
+
+    writes.record_many.assert_called_once_with(["c"], is_read=1)
+    assert read_states(emails_db) == {"a": 0, "b": 0, "c": 0}
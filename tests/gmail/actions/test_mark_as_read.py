@@ -4,9 +4,9 @@ from gmail.actions.mark_as_read import mark_as_read
 
 
 @pytest.mark.usefixtures("mock_gmail_dependencies")
-@mock.patch("gmail.actions.mark_as_read.sqlite3.connect")
+@mock.patch("gmail.actions.mark_as_read.record_email_updates")
 @mock.patch("gmail.actions.mark_as_read.api_mark_as_read")
-def test_mark_as_read_updates_db_and_calls_gmail_api(mock_api_mark_as_read, mock_connect, mock_gmail_dependencies):
+def test_mark_as_read_updates_db_and_calls_gmail_api(mock_api_mark_as_read, mock_record_updates, mock_gmail_dependencies):
     """
     Test that mark_as_read:
       - Uses get_gmail_service() (mocked via mock_gmail_dependencies)
@@ -17,43 +17,62 @@ def test_mark_as_read_updates_db_and_calls_gmail_api(mock_api_mark_as_read, mock
     fake_service = "mocked_gmail_service"
     message_id = "abc123"
 
-    mock_conn = mock.Mock()
-    mock_cursor = mock.Mock()
-    mock_connect.return_value = mock_conn
-    mock_conn.cursor.return_value = mock_cursor
-
     mark_as_read(message_id)
 
     mock_api_mark_as_read.assert_called_once_with(fake_service, message_id)
 
-    mock_cursor.execute.assert_called_once_with(
-        "UPDATE emails SET is_read = 1 WHERE id = ?", (message_id,)
-    )
-    mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_record_updates.assert_called_once_with(None, [message_id], is_read=1)
 
 @pytest.mark.usefixtures("mock_gmail_dependencies")
 @mock.patch("gmail.actions.mark_as_read.api_mark_as_read")
-@mock.patch("gmail.actions.mark_as_read.sqlite3.connect")
-def test_mark_as_read_handles_gmail_api_failure(mock_connect, mock_api_mark_as_read, mock_gmail_dependencies):
+@mock.patch("gmail.actions.mark_as_read.record_email_updates")
+def test_mark_as_read_handles_gmail_api_failure(mock_record_updates, mock_api_mark_as_read, mock_gmail_dependencies):
     """
     Negative Test:
     Ensures mark_as_read:
       - Raises exception if Gmail API fails
-      - Does not commit changes to DB
+      - Does not write changes to DB
     """
     message_id = "abc123"
 
     mock_api_mark_as_read.side_effect = Exception("Gmail API failure")
 
-    mock_conn = mock.Mock()
-    mock_cursor = mock.Mock()
-    mock_connect.return_value = mock_conn
-    mock_conn.cursor.return_value = mock_cursor
-
     with pytest.raises(Exception, match="Gmail API failure"):
         mark_as_read(message_id)
 
-    mock_cursor.execute.assert_not_called()
-    mock_conn.commit.assert_not_called()
-    mock_conn.close.assert_not_called()
+    mock_record_updates.assert_not_called()
+
+@mock.patch("gmail.actions.mark_as_read.get_gmail_service")
+@mock.patch("gmail.actions.mark_as_read.record_email_updates")
+@mock.patch("gmail.actions.mark_as_read.api_mark_as_read")
+def test_mark_as_read_uses_injected_service(mock_api_mark_as_read, mock_record_updates, mock_get_service):
+    """
+    Ensures mark_as_read reuses the run-scoped service instead of building one.
+    """
+    mark_as_read("abc123", service="shared_service")
+
+    mock_get_service.assert_not_called()
+    mock_api_mark_as_read.assert_called_once_with("shared_service", "abc123")
+
+
+@pytest.mark.usefixtures("mock_gmail_dependencies")
+@mock.patch("gmail.actions.mark_as_read.record_email_updates")
+@mock.patch("gmail.actions.mark_as_read.api_mark_as_read")
+def test_mark_as_read_records_into_write_buffer(mock_api_mark_as_read, mock_record_updates, mock_gmail_dependencies):
+    writes = mock.Mock()
+
+    mark_as_read("abc123", writes=writes)
+
+    mock_record_updates.assert_called_once_with(writes, ["abc123"], is_read=1)
+
+
+@pytest.mark.usefixtures("mock_gmail_dependencies")
+@mock.patch("gmail.actions.mark_as_read.api_mark_as_read")
+def test_mark_as_read_records_nothing_when_api_fails(mock_api_mark_as_read, mock_gmail_dependencies):
+    mock_api_mark_as_read.side_effect = Exception("Gmail API failure")
+    writes = mock.Mock()
+
+    with pytest.raises(Exception, match="Gmail API failure"):
+        mark_as_read("abc123", writes=writes)
+
+    writes.record_many.assert_not_called()
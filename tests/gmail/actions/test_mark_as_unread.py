@@ -4,11 +4,11 @@ from gmail.actions.mark_as_unread import mark_as_unread
 
 
 @pytest.mark.usefixtures("mock_gmail_dependencies")
-@mock.patch("gmail.actions.mark_as_unread.sqlite3.connect")
+@mock.patch("gmail.actions.mark_as_unread.record_email_updates")
 @mock.patch("gmail.actions.mark_as_unread.api_mark_as_unread")
 def test_mark_as_unread_updates_db_and_calls_gmail_api(
     mock_api_mark_as_unread,
-    mock_connect,
+    mock_record_updates,
     mock_gmail_dependencies
 ):
     """
@@ -21,25 +21,16 @@ def test_mark_as_unread_updates_db_and_calls_gmail_api(
     fake_service = "mocked_gmail_service"
     message_id = "xyz789"
 
-    mock_conn = mock.Mock()
-    mock_cursor = mock.Mock()
-    mock_connect.return_value = mock_conn
-    mock_conn.cursor.return_value = mock_cursor
-
     mark_as_unread(message_id)
 
     mock_api_mark_as_unread.assert_called_once_with(fake_service, message_id)
 
-    mock_cursor.execute.assert_called_once_with(
-        "UPDATE emails SET is_read = 0 WHERE id = ?", (message_id,)
-    )
-    mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_record_updates.assert_called_once_with(None, [message_id], is_read=0)
 
 @pytest.mark.usefixtures("mock_gmail_dependencies")
 @mock.patch("gmail.actions.mark_as_unread.api_mark_as_unread")
-@mock.patch("gmail.actions.mark_as_unread.sqlite3.connect")
-def test_mark_as_unread_handles_gmail_api_failure(mock_connect, mock_api_mark_as_unread, mock_gmail_dependencies):
+@mock.patch("gmail.actions.mark_as_unread.record_email_updates")
+def test_mark_as_unread_handles_gmail_api_failure(mock_record_updates, mock_api_mark_as_unread, mock_gmail_dependencies):
     """
     Negative Test:
     Ensures mark_as_unread:
@@ -50,14 +41,7 @@ def test_mark_as_unread_handles_gmail_api_failure(mock_connect, mock_api_mark_as
 
     mock_api_mark_as_unread.side_effect = Exception("Gmail API failure")
 
-    mock_conn = mock.Mock()
-    mock_cursor = mock.Mock()
-    mock_connect.return_value = mock_conn
-    mock_conn.cursor.return_value = mock_cursor
-
     with pytest.raises(Exception, match="Gmail API failure"):
         mark_as_unread(message_id)
 
-    mock_cursor.execute.assert_not_called()
-    mock_conn.commit.assert_not_called()
-    mock_conn.close.assert_not_called()
+    mock_record_updates.assert_not_called()
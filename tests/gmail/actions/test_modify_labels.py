@@ -0,0 +1,29 @@
+import sqlite3
+from gmail.actions.modify_labels import modify_labels
+from gmail.stub_service import StubGmailService, build_stub_message
+
+
+def make_db(tmp_path):
+    db_file = tmp_path / "emails.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, is_read BOOLEAN, is_starred BOOLEAN, inbox_type TEXT)")
+    conn.execute("INSERT INTO emails VALUES ('a', 0, 0, 'INBOX')")
+    conn.commit()
+    conn.close()
+    return db_file
+
+
+def test_modify_labels_makes_one_call_and_updates_db(tmp_path):
+    db_file = make_db(tmp_path)
+    service = StubGmailService([
+        build_stub_message("a", "Subject", "x@example.com", "me@example.com",
+                           "Mon, 13 Oct 2025 12:00:00 +0000", "body", ["INBOX", "UNREAD"])
+    ])
+
+    modify_labels("a", ("TRASH",), ("INBOX", "UNREAD"), service=service)
+
+    assert len(service.calls_for("messages.modify")) == 1
+    assert service.messages["a"]["labelIds"] == ["TRASH"]
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("SELECT is_read, is_starred, inbox_type FROM emails WHERE id = 'a'").fetchone() == (1, 0, "TRASH")
+    conn.close()
@@ -4,22 +4,25 @@ from gmail.actions.move_message import move_message
 
 
 @pytest.mark.usefixtures("mock_gmail_dependencies")
+@mock.patch("gmail.actions.move_message.record_email_updates")
 @mock.patch("gmail.actions.move_message.api_move_message")
-def test_move_message_calls_gmail_api(mock_api_move_message, mock_gmail_dependencies):
+def test_move_message_calls_gmail_api(mock_api_move_message, mock_record_updates, mock_gmail_dependencies):
     """
     Test that move_message:
       - Uses get_gmail_service() (mocked via mock_gmail_dependencies)
       - Calls Gmail API move_message with correct message_id and folder
-      - Does not perform any DB operations
+      - Updates DB is_starred and inbox_type from the labels Gmail returns
     """
 
     fake_service = "mocked_gmail_service"
     message_id = "msg123"
-    folder = "INBOX"
+    folder = "TRASH"
+    mock_api_move_message.return_value = {"id": message_id, "labelIds": ["TRASH", "UNREAD"]}
 
     move_message(message_id, folder)
 
     mock_api_move_message.assert_called_once_with(fake_service, message_id, folder)
+    mock_record_updates.assert_called_once_with(None, [message_id], is_starred=0, inbox_type="TRASH")
 
 @mock.patch("gmail.actions.move_message.api_move_message")
 @pytest.mark.usefixtures("mock_gmail_dependencies")
@@ -34,7 +37,11 @@ def test_move_message_handles_gmail_api_failure(mock_api_move_message, mock_gmai
 
     mock_api_move_message.side_effect = Exception("Gmail API failure")
 
-    with pytest.raises(Exception, match="Gmail API failure"):
+    with (
+        mock.patch("gmail.actions.move_message.record_email_updates") as mock_record_updates,
+        pytest.raises(Exception, match="Gmail API failure"),
+    ):
         move_message(message_id, folder)
+    mock_record_updates.assert_not_called()
 
     mock_api_move_message.assert_called_once_with(fake_service, message_id, folder)
\ No newline at end of file
@@ -1,3 +1,6 @@
+import subprocess
+import sys
+from pathlib import Path
 import pytest
 from gmail.auth import get_gmail_service, CREDENTIALS_FILE, SCOPES
 
@@ -50,3 +53,12 @@ def test_runs_oauth_flow_when_no_valid_token(mock_gmail_dependencies):
         "gmail", "v1", credentials=mocks["mock_creds"]
     )
     assert service == "mocked_gmail_service"
+
+
+def test_google_libraries_are_imported_on_first_use():
+    code = (
+        "import sys, gmail.auth as auth\n"
+        "assert 'googleapiclient.discovery' not in sys.modules\n"
+        "assert auth.build is sys.modules['googleapiclient.discovery'].build\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[2], check=True)
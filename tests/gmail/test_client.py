@@ -1,6 +1,15 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from gmail.client import fetch_emails, mark_as_read, mark_as_unread, move_message
+from gmail.client import (
+    fetch_emails,
+    mark_as_read,
+    mark_as_unread,
+    move_message,
+    batch_modify,
+    get_label_delta,
+    modify_labels,
+)
+from gmail.stub_service import StubGmailService, StubHttpError
 
 # ------------------------
 # Tests
@@ -92,3 +101,55 @@ def test_move_message_to_other_folder():
         body={"addLabelIds": ["SPAM"], "removeLabelIds": ["INBOX"]}
     )
     mock_service.users().messages().modify().execute.assert_called_once()
+
+def test_modify_labels_applies_delta_in_one_call():
+    mock_service = MagicMock()
+
+    modify_labels(mock_service, "msg1", ("TRASH",), ("INBOX", "UNREAD"))
+
+    mock_service.users().messages().modify.assert_called_once_with(
+        userId="me",
+        id="msg1",
+        body={"addLabelIds": ["TRASH"], "removeLabelIds": ["INBOX", "UNREAD"]}
+    )
+
+def test_get_label_delta_for_each_action():
+    assert get_label_delta("mark_as_read") == ((), ("UNREAD",))
+    assert get_label_delta("mark_as_unread") == (("UNREAD",), ())
+    assert get_label_delta("move_message:TRASH") == (("TRASH",), ("INBOX",))
+    assert get_label_delta("move_message:INBOX") == (("INBOX",), ())
+    assert get_label_delta("unknown_action") is None
+
+def test_batch_modify_chunks_message_ids():
+    service = StubGmailService()
+    message_ids = [f"msg{i}" for i in range(2500)]
+
+    results = batch_modify(service, message_ids, remove_labels=("UNREAD",))
+
+    calls = service.calls_for("messages.batchModify")
+    assert [len(call["body"]["ids"]) for call in calls] == [1000, 1000, 500]
+    assert calls[0]["body"]["removeLabelIds"] == ["UNREAD"]
+    assert calls[0]["body"]["addLabelIds"] == []
+    assert [result["error"] for result in results] == [None, None, None]
+    assert sum(len(result["ids"]) for result in results) == 2500
+
+def test_batch_modify_reports_failed_chunk_and_continues():
+    service = StubGmailService()
+    service.inject_error("messages.batchModify", StubHttpError(500, "Backend Error"))
+
+    results = batch_modify(service, ["a", "b", "c"], add_labels=("TRASH",), chunk_size=2)
+
+    assert len(service.calls_for("messages.batchModify")) == 2
+    assert results[0]["ids"] == ["a", "b"]
+    assert "500" in results[0]["error"]
+    assert results[1] == {"ids": ["c"], "error": None}
+
+
+def test_fetch_emails_threads_mode_builds_a_service_per_worker():
+    mock_service = MagicMock()
+
+    with patch("gmail.client.get_gmail_service", return_value=mock_service) as mock_get_service:
+        with patch("gmail.client.fetch_inbox_emails", return_value=[]) as mock_fetch:
+            fetch_emails(mode="threads")
+
+            mock_fetch.assert_called_once_with(mock_service, 500, mode="threads", service_factory=mock_get_service)
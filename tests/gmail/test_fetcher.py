@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock
-from gmail.fetcher import fetch_inbox_emails
+from gmail.fetcher import fetch_inbox_emails, iter_inbox_emails
+from gmail.stub_service import StubGmailService, StubHttpError, build_stub_message
 
 # ------------------------
 # Fixtures
@@ -24,6 +25,7 @@ def fake_service():
         {
             "id": "msg1",
             "snippet": "Snippet 1",
+            "internalDate": "1760356800000",
             "payload": {
                 "headers": [
                     {"name": "Subject", "value": "Test Subject 1"},
@@ -60,6 +62,7 @@ def test_fetch_inbox_emails_success(fake_service):
     assert emails[0]["snippet"] == "Snippet 1"
     assert emails[0]["subject"] == "Test Subject 1"
     assert emails[0]["from"] == "sender1@example.com"
+    assert emails[0]["internal_date"] == "1760356800000"
     assert emails[0]["received_at"] == "Mon, 13 Oct 2025 12:00:00 +0000"
 
     assert emails[1]["id"] == "msg2"
@@ -93,3 +96,113 @@ def test_fetch_inbox_emails_partial_failure():
     assert len(emails) == 1
     assert emails[0]["id"] == "msg1"
     assert emails[0]["subject"] == "S1"
+
+
+# ------------------------
+# Concurrent fetch modes
+# ------------------------
+
+@pytest.fixture
+def stub_service():
+    messages = [
+        build_stub_message(f"msg{i}", subject=f"Subject {i}", sender=f"sender{i}@example.com", body=f"Body {i}")
+        for i in range(250)
+    ]
+    return StubGmailService(messages)
+
+
+@pytest.mark.parametrize("mode", ["serial", "batch", "threads"])
+def test_fetch_modes_return_ordered_results(stub_service, mode):
+    emails = fetch_inbox_emails(
+        stub_service, max_results=250, mode=mode, concurrency=4, service_factory=lambda: stub_service
+    )
+
+    assert [email["id"] for email in emails] == [f"msg{i}" for i in range(250)]
+    assert emails[7]["subject"] == "Subject 7"
+    assert emails[7]["body"] == "Body 7"
+
+
+def test_batch_mode_groups_gets_into_batches_of_100(stub_service):
+    batches = []
+    original = stub_service.new_batch_http_request
+
+    def tracking_batch(callback=None):
+        batch = original(callback=callback)
+        batches.append(batch)
+        return batch
+
+    stub_service.new_batch_http_request = tracking_batch
+    fetch_inbox_emails(stub_service, max_results=250, mode="batch")
+
+    assert [len(batch._requests) for batch in batches] == [100, 100, 50]
+
+
+@pytest.mark.parametrize("mode", ["batch", "threads"])
+def test_concurrent_modes_isolate_failed_messages(stub_service, mode):
+    stub_service.inject_error("messages.get", StubHttpError(500, "Backend Error"))
+
+    emails = fetch_inbox_emails(stub_service, max_results=250, mode=mode, service_factory=lambda: stub_service)
+
+    assert len(emails) == 249
+
+
+def test_threads_mode_builds_one_service_per_worker(stub_service):
+    factory = MagicMock(return_value=stub_service)
+
+    emails = fetch_inbox_emails(stub_service, max_results=250, mode="threads", concurrency=3, service_factory=factory)
+
+    assert len(emails) == 250
+    assert 1 <= factory.call_count <= 3
+
+
+def test_threads_mode_requires_a_service_factory(stub_service):
+    with pytest.raises(ValueError, match="service_factory"):
+        fetch_inbox_emails(stub_service, max_results=250, mode="threads")
+
+
+def test_unknown_fetch_mode_raises(stub_service):
+    with pytest.raises(ValueError, match="Unknown fetch mode"):
+        fetch_inbox_emails(stub_service, mode="parallel")
+
+
+# ------------------------
+# Pagination
+# ------------------------
+
+def test_iter_inbox_emails_walks_all_pages(stub_service):
+    emails = list(iter_inbox_emails(stub_service, page_size=100))
+
+    assert len(emails) == 250
+    list_calls = stub_service.calls_for("messages.list")
+    assert [call.get("pageToken") for call in list_calls] == [None, "100", "200"]
+
+
+def test_iter_inbox_emails_streams_one_page_at_a_time(stub_service):
+    emails = iter_inbox_emails(stub_service, page_size=100)
+
+    first = next(emails)
+
+    assert first["id"] == "msg0"
+    assert len(stub_service.calls_for("messages.list")) == 1
+    assert len(stub_service.calls_for("messages.get")) == 100
+
+
+def test_iter_inbox_emails_respects_max_results(stub_service):
+    emails = list(iter_inbox_emails(stub_service, max_results=150, page_size=100))
+
+    assert len(emails) == 150
+    assert [call["maxResults"] for call in stub_service.calls_for("messages.list")] == [100, 50]
+
+
+def test_iter_inbox_emails_passes_query_and_label_filters(stub_service):
+    list(iter_inbox_emails(stub_service, query="from:boss", label_ids=["INBOX"], max_results=10))
+
+    call = stub_service.calls_for("messages.list")[0]
+    assert call["q"] == "from:boss"
+    assert call["labelIds"] == ["INBOX"]
+
+
+def test_iter_inbox_emails_stops_when_list_fails(stub_service):
+    stub_service.inject_error("messages.list", StubHttpError(500, "Backend Error"))
+
+    assert list(iter_inbox_emails(stub_service)) == []
@@ -0,0 +1,54 @@
+import pytest
+from gmail.history import HistoryExpiredError, get_history_id, list_history, summarize_history
+from gmail.stub_service import StubGmailService, StubHttpError, build_stub_message
+
+
+def test_list_history_walks_pages_and_returns_latest_history_id():
+    service = StubGmailService()
+    start = get_history_id(service)
+    for i in range(5):
+        service.add_message(build_stub_message(f"msg{i}"))
+
+    records, history_id = list_history(service, start, page_size=2)
+
+    assert len(records) == 5
+    assert len(service.calls_for("history.list")) == 3
+    assert history_id == str(service.history_id)
+
+
+def test_list_history_raises_when_expired():
+    service = StubGmailService()
+    start = get_history_id(service)
+    service.add_message(build_stub_message("msg1"))
+    service.expire_history()
+
+    with pytest.raises(HistoryExpiredError):
+        list_history(service, start)
+
+
+def test_list_history_propagates_other_errors():
+    service = StubGmailService()
+    service.inject_error("history.list", StubHttpError(500, "Backend Error"))
+
+    with pytest.raises(StubHttpError):
+        list_history(service, get_history_id(service))
+
+
+def test_summarize_history_collapses_changes():
+    def msg(message_id, labels=()):
+        return {"message": {"id": message_id, "labelIds": list(labels)}}
+
+    records = [
+        {"id": "1", "messagesAdded": [msg("a")]},
+        {"id": "2", "labelsRemoved": [dict(msg("a"), labelIds=["UNREAD"])]},
+        {"id": "3", "messagesAdded": [msg("b")]},
+        {"id": "4", "messagesDeleted": [msg("b")]},
+        {"id": "5", "labelsAdded": [dict(msg("c", ["INBOX", "STARRED"]), labelIds=["STARRED"])]},
+        {"id": "6", "labelsRemoved": [dict(msg("c", ["STARRED"]), labelIds=["INBOX"])]},
+    ]
+
+    added, deleted, labels = summarize_history(records)
+
+    assert added == ["a"]
+    assert deleted == ["b"]
+    assert labels == {"c": ["STARRED"]}
@@ -0,0 +1,83 @@
+import json
+import pytest
+from gmail import metrics
+from gmail.fetcher import fetch_inbox_emails
+from gmail.stub_service import StubGmailService, build_stub_message
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.registry.reset()
+    metrics.enable()
+    yield metrics.registry
+    metrics.enable(False)
+    metrics.registry.reset()
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.registry.reset()
+    metrics.increment("calls_total")
+    metrics.observe("call_seconds", 0.1)
+    with metrics.timer("call_seconds") as timer:
+        pass
+
+    assert timer is None
+    assert metrics.report()["counters"] == {}
+    assert metrics.report()["histograms"] == {}
+
+
+def test_counters_and_timers(enabled_metrics):
+    metrics.increment("calls_total", action="a")
+    metrics.increment("calls_total", 2, action="a")
+    with metrics.timer("call_seconds"):
+        pass
+
+    report = metrics.report()
+    assert report["counters"] == {'calls_total{action="a"}': 3}
+    assert report["histograms"]["call_seconds"]["count"] == 1
+
+
+def test_timed_counts_errors(enabled_metrics):
+    @metrics.timed("work_seconds", errors="work_errors_total", kind="x")
+    def work(fail):
+        if fail:
+            raise ValueError("boom")
+        return "done"
+
+    assert work(False) == "done"
+    with pytest.raises(ValueError):
+        work(True)
+
+    report = metrics.report()
+    assert report["histograms"]['work_seconds{kind="x"}']["count"] == 2
+    assert report["counters"] == {'work_errors_total{kind="x"}': 1}
+
+
+def test_prometheus_format(enabled_metrics):
+    metrics.increment("emails_total", 5)
+    for value in (0.002, 0.2, 200):
+        metrics.observe("fetch_seconds", value, mode="batch")
+
+    lines = metrics.to_prometheus().splitlines()
+    assert "# TYPE emails_total counter" in lines
+    assert "emails_total 5" in lines
+    assert "# TYPE fetch_seconds histogram" in lines
+    assert 'fetch_seconds_bucket{mode="batch",le="0.005"} 1' in lines
+    assert 'fetch_seconds_bucket{mode="batch",le="0.5"} 2' in lines
+    assert 'fetch_seconds_bucket{mode="batch",le="+Inf"} 3' in lines
+    assert 'fetch_seconds_count{mode="batch"} 3' in lines
+
+
+def test_fetcher_is_instrumented(enabled_metrics, tmp_path):
+    service = StubGmailService([build_stub_message(f"m{i}") for i in range(3)])
+    service.inject_error("messages.get", RuntimeError("boom"))
+
+    assert len(fetch_inbox_emails(service, mode="batch")) == 2
+
+    report_path, prometheus_path = tmp_path / "run.json", tmp_path / "run.prom"
+    metrics.export_reports(report_path, prometheus_path)
+    report = json.loads(report_path.read_text())
+    assert report["counters"]['gmail_messages_fetched_total{mode="batch"}'] == 2
+    assert report["counters"]['gmail_fetch_errors_total{mode="batch"}'] == 1
+    assert report["histograms"]["gmail_parse_seconds"]["count"] == 2
+    assert "gmail_list_seconds_count 1" in prometheus_path.read_text()
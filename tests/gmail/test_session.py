@@ -0,0 +1,62 @@
+import threading
+from unittest import mock
+from gmail.session import GmailSession
+
+
+@mock.patch("gmail.session.get_gmail_service")
+@mock.patch("gmail.session.get_credentials")
+def test_service_is_built_once(mock_get_credentials, mock_get_service):
+    mock_get_credentials.return_value.expired = False
+    session = GmailSession()
+
+    first = session.service
+    second = session.service
+
+    assert first is second
+    mock_get_credentials.assert_called_once()
+    mock_get_service.assert_called_once_with(mock_get_credentials.return_value)
+
+
+def test_injected_service_skips_auth():
+    with mock.patch("gmail.session.get_credentials") as mock_get_credentials:
+        session = GmailSession(service="stub_service")
+        assert session.service == "stub_service"
+        mock_get_credentials.assert_not_called()
+
+
+@mock.patch("gmail.session.refresh_credentials")
+def test_expired_credentials_refreshed_once_across_threads(mock_refresh):
+    creds = mock.Mock()
+    creds.expired = True
+    creds.refresh_token = "refresh"
+
+    def refresh(c):
+        c.expired = False
+
+    mock_refresh.side_effect = refresh
+    session = GmailSession(service="stub_service", creds=creds)
+
+    threads = [threading.Thread(target=lambda: session.service) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    mock_refresh.assert_called_once_with(creds)
+
+
+@mock.patch("gmail.session.get_gmail_service")
+@mock.patch("gmail.session.get_credentials")
+def test_new_service_shares_credentials(mock_get_credentials, mock_get_service):
+    mock_get_credentials.return_value.expired = False
+    mock_get_service.side_effect = lambda creds: mock.Mock()
+    session = GmailSession()
+
+    worker_service = session.new_service()
+
+    assert worker_service is not session.service
+    mock_get_service.assert_called_with(mock_get_credentials.return_value)
+
+
+def test_new_service_reuses_injected_service():
+    assert GmailSession(service="stub_service").new_service() == "stub_service"
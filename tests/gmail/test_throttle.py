@@ -0,0 +1,60 @@
+import pytest
+from unittest import mock
+from gmail.stub_service import StubHttpError
+from gmail.throttle import TokenBucket, backoff_delay, call_with_retry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=10, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire(10) == 0
+    assert bucket.acquire(5) == pytest.approx(0.5)
+    clock.now += 1.0
+    assert bucket.acquire(5) == 0
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_backoff_delay_is_capped_and_jittered():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base_delay=1, max_delay=4) <= min(4, 2 ** attempt)
+
+
+def test_call_with_retry_retries_rate_limit_errors():
+    call = mock.Mock(side_effect=[StubHttpError(429), StubHttpError(503), "ok"])
+    sleep = mock.Mock()
+
+    assert call_with_retry(call, retries=3, sleep=sleep) == "ok"
+    assert call.call_count == 3
+    assert sleep.call_count == 2
+
+
+def test_call_with_retry_does_not_retry_client_errors():
+    call = mock.Mock(side_effect=StubHttpError(400))
+    sleep = mock.Mock()
+
+    with pytest.raises(StubHttpError):
+        call_with_retry(call, sleep=sleep)
+    call.assert_called_once()
+    sleep.assert_not_called()
+
+
+def test_call_with_retry_gives_up_after_retries():
+    call = mock.Mock(side_effect=StubHttpError(429))
+
+    with pytest.raises(StubHttpError):
+        call_with_retry(call, retries=2, sleep=mock.Mock())
+    assert call.call_count == 3
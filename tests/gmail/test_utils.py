@@ -0,0 +1,12 @@
+from gmail.utils import get_inbox_type
+
+
+def test_get_inbox_type():
+    assert get_inbox_type(["INBOX", "UNREAD"]) == "INBOX"
+    assert get_inbox_type(["SENT"]) == "SENT"
+    assert get_inbox_type(["SPAM"]) == "SPAM"
+    assert get_inbox_type(["CATEGORY_UPDATES"]) == "OTHER"
+
+
+def test_get_inbox_type_trash_wins():
+    assert get_inbox_type(["TRASH", "INBOX", "SENT"]) == "TRASH"
@@ -0,0 +1,24 @@
+import random
+from rules_engine.aho_corasick import AhoCorasick
+
+
+def test_finds_overlapping_and_nested_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert automaton.find_patterns("ushers") == {"he", "she", "hers"}
+    assert automaton.find_patterns("ahishers") == {"his", "he", "she", "hers"}
+    assert automaton.find_patterns("xyz") == set()
+
+
+def test_ignores_empty_and_duplicate_patterns():
+    automaton = AhoCorasick(["ab", "", "ab", "b"])
+    assert automaton.patterns == ["ab", "b"]
+    assert automaton.search("cab") == {0, 1}
+
+
+def test_agrees_with_substring_search():
+    rng = random.Random(7)
+    for _ in range(200):
+        patterns = ["".join(rng.choice("abc") for _ in range(rng.randrange(1, 5))) for _ in range(10)]
+        text = "".join(rng.choice("abcd") for _ in range(rng.randrange(30)))
+        automaton = AhoCorasick(patterns)
+        assert automaton.find_patterns(text) == {pattern for pattern in patterns if pattern in text}
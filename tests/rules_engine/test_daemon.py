@@ -0,0 +1,171 @@
+import json
+import os
+import pytest
+from unittest import mock
+from db.create_emails_table import create_emails_table
+from gmail.session import GmailSession
+from gmail.stub_service import StubGmailService, build_stub_message
+from rules_engine import engine
+from rules_engine.daemon import LatencyStats, RulesDaemon, stub_delivery
+from rules_engine.validator import RuleValidationError
+
+
+def write_rules(path, value, mtime_ns):
+    path.write_text(json.dumps({
+        "rules_predicate": "all",
+        "rules": [{"field": "subject", "predicate": "contains", "value": value}],
+        "actions": ["mark_as_read"],
+    }))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, "invoice", 1_000_000_000)
+    return path
+
+
+@pytest.fixture
+def stub():
+    create_emails_table()
+    return StubGmailService([build_stub_message("old", subject="Old invoice")])
+
+
+@pytest.fixture
+def mark_as_read():
+    action = mock.Mock()
+    with mock.patch.dict(engine.ACTIONS_MAP, {"mark_as_read": action}):
+        yield action
+
+
+def make_daemon(stub, rules_file):
+    return RulesDaemon(GmailSession(service=stub), rules_file=rules_file, interval=0, batch=False)
+
+
+def test_only_new_messages_are_matched(stub, rules_file, mark_as_read):
+    daemon = make_daemon(stub, rules_file)
+    daemon.run(max_polls=1, stats_every=0)
+    mark_as_read.assert_not_called()
+
+    stub.add_message(build_stub_message("new1", subject="New invoice"))
+    stub.add_message(build_stub_message("new2", subject="Hello"))
+    result = daemon.poll_once()
+
+    assert result["new"] == 2
+    assert result["matched"] == 1
+    mark_as_read.assert_called_once_with("new1")
+    assert daemon.poll_once()["new"] == 0
+
+
+def test_failed_actions_are_retried_on_the_next_poll(stub, rules_file, mark_as_read):
+    daemon = make_daemon(stub, rules_file)
+    daemon.poll_once()
+
+    mark_as_read.side_effect = [RuntimeError("Gmail unavailable"), None]
+    stub.add_message(build_stub_message("new1", subject="New invoice"))
+    with pytest.raises(RuntimeError):
+        daemon.poll_once()
+
+    result = daemon.poll_once()
+    assert result["new"] == 0
+    assert result["matched"] == 1
+    assert mark_as_read.call_args_list == [mock.call("new1"), mock.call("new1")]
+    assert daemon.poll_once()["processed"] == 0
+
+
+def test_failed_batch_chunks_stay_pending(stub, rules_file):
+    daemon = RulesDaemon(GmailSession(service=stub), rules_file=rules_file, interval=0, batch=True)
+    daemon.poll_once()
+
+    batch_modify = mock.Mock(side_effect=[
+        [{"ids": ["new1"], "error": "<StubHttpError 503>"}],
+        [{"ids": ["new1"], "error": None}],
+    ])
+    stub.add_message(build_stub_message("new1", subject="New invoice"))
+    with mock.patch.object(engine, "BATCH_MODIFY", batch_modify):
+        assert daemon.poll_once()["matched"] == 1
+        result = daemon.poll_once()
+        assert result["processed"] == 1
+        assert daemon.poll_once()["processed"] == 0
+
+    assert batch_modify.call_count == 2
+    assert batch_modify.call_args_list[1][0][0] == ["new1"]
+
+
+def test_full_sync_fallback_runs_rules_on_mail_since_the_last_poll(stub, rules_file, mark_as_read):
+    daemon = make_daemon(stub, rules_file)
+    daemon.poll_once()
+
+    stub.add_message(build_stub_message("new1", subject="New invoice", date="Tue, 14 Oct 2025 09:00:00 +0000"))
+    stub.expire_history()
+    result = daemon.poll_once()
+
+    assert result["processed"] == 1
+    mark_as_read.assert_called_once_with("new1")
+
+
+def test_rules_are_reloaded_when_the_file_changes(stub, rules_file, mark_as_read):
+    daemon = make_daemon(stub, rules_file)
+    daemon.poll_once()
+    matcher = daemon.matcher()
+
+    write_rules(rules_file, "hello", 2_000_000_000)
+    stub.add_message(build_stub_message("new1", subject="New invoice"))
+    stub.add_message(build_stub_message("new2", subject="Hello"))
+    daemon.poll_once()
+
+    mark_as_read.assert_called_once_with("new2")
+    assert daemon.matcher() is not matcher
+
+
+def test_invalid_rules_keep_the_previous_rules(stub, rules_file, mark_as_read):
+    daemon = make_daemon(stub, rules_file)
+    daemon.poll_once()
+
+    rules_file.write_text("{broken")
+    stub.add_message(build_stub_message("new1", subject="New invoice"))
+    daemon.poll_once()
+
+    mark_as_read.assert_called_once_with("new1")
+
+
+def test_invalid_rules_fail_at_startup(stub, tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({"rules_predicate": "sometimes", "rules": [], "actions": []}))
+
+    with pytest.raises(RuleValidationError):
+        make_daemon(stub, rules_file).run(max_polls=1)
+
+
+def test_run_sleeps_out_the_interval_and_survives_failed_polls(stub, rules_file):
+    sleep = mock.Mock()
+    daemon = RulesDaemon(GmailSession(service=stub), rules_file=rules_file, interval=30, sleep=sleep)
+    stub.inject_error("users.getProfile", RuntimeError("network down"))
+
+    daemon.run(max_polls=3, stats_every=0)
+
+    assert daemon.failures == 1
+    assert daemon.polls == 2
+    assert sleep.call_count == 2
+    assert all(0 < call.args[0] <= 30 for call in sleep.call_args_list)
+
+
+def test_stub_delivery_adds_messages(stub):
+    deliver = stub_delivery(stub, arrivals=3)
+    deliver()
+    deliver()
+
+    assert len(stub.messages) == 7
+
+
+def test_latency_stats_summary():
+    stats = LatencyStats(window=3)
+    for seconds in (0.4, 0.1, 0.2, 0.3):
+        stats.record(seconds)
+
+    summary = stats.summary()
+    assert summary["count"] == 4
+    assert summary["mean"] == pytest.approx(0.25)
+    assert summary["p50"] == 0.2
+    assert summary["max"] == 0.3
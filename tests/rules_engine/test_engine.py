@@ -1,6 +1,11 @@
+import json
 import pytest
 import sqlite3
 from unittest import mock
+from db.connection import connection, transaction
+from db.create_emails_table import create_emails_table
+from db.fts import create_fts_index
+from db.rules_to_sql import rules_to_sql_query
 from rules_engine import engine
 
 
@@ -27,6 +32,16 @@ def test_execute_actions_calls_correct_action(mock_actions):
     mock_actions["move_message"].assert_called_once_with("123", "Inbox")
 
 
+def test_execute_actions_passes_shared_service(mock_actions):
+    email = {"id": "123"}
+    service = object()
+
+    engine.execute_actions(email, ["mark_as_unread", "move_message:SPAM"], service=service)
+
+    mock_actions["mark_as_unread"].assert_called_once_with("123", service=service)
+    mock_actions["move_message"].assert_called_once_with("123", "SPAM", service=service)
+
+
 def test_execute_actions_skips_unknown_action(mock_actions):
     email = {"id": "999"}
     actions = ["unknown_action"]
@@ -37,6 +52,33 @@ def test_execute_actions_skips_unknown_action(mock_actions):
         action.assert_not_called()
 
 
+# ------------------ TESTS FOR batched actions ------------------
+
+def test_group_email_actions_groups_ids_per_action():
+    actions = ["mark_as_read", "move_message:TRASH", "unknown_action"]
+
+    groups = engine.group_email_actions([({"id": "1"}, actions), ({"id": "2"}, actions)])
+
+    assert groups == {
+        ((), ("UNREAD",)): ["1", "2"],
+        (("TRASH",), ("INBOX",)): ["1", "2"],
+    }
+
+
+def test_execute_matched_actions_batch_calls_batch_modify_per_delta():
+    actions = ["mark_as_read", "move_message:SPAM"]
+    mock_batch = mock.Mock(side_effect=lambda ids, add, remove: [{"ids": ids, "error": None}])
+
+    with mock.patch.object(engine, "BATCH_MODIFY", mock_batch):
+        results = engine.execute_matched_actions(
+            [({"id": "1"}, actions), ({"id": "2"}, actions)], batch=True, plan=False
+        )
+
+    mock_batch.assert_any_call(["1", "2"], (), ("UNREAD",))
+    mock_batch.assert_any_call(["1", "2"], ("SPAM",), ("INBOX",))
+    assert len(results) == 2
+
+
 # ------------------ TESTS FOR execute_query ------------------
 
 def test_execute_query_returns_emails(tmp_path):
@@ -65,6 +107,26 @@ def test_execute_query_with_no_results(tmp_path):
     assert result == []
 
 
+def test_iter_query_batches_streams_while_rows_are_updated(tmp_path):
+    db_file = tmp_path / "emails.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE emails (id TEXT, is_read INTEGER)")
+    conn.executemany("INSERT INTO emails VALUES (?, 0)", [(str(i),) for i in range(5)])
+    conn.commit()
+    conn.close()
+
+    batches = []
+    for batch in engine.iter_query_batches("SELECT id FROM emails ORDER BY id", [], db_path=db_file, batch_size=2):
+        batches.append([email["id"] for email in batch])
+        # Actions write through their own connection while the cursor is open.
+        writer = sqlite3.connect(db_file, timeout=0.1)
+        writer.executemany("UPDATE emails SET is_read = 1 WHERE id = ?", [(email["id"],) for email in batch])
+        writer.commit()
+        writer.close()
+
+    assert batches == [["0", "1"], ["2", "3"], ["4"]]
+
+
 # ------------------ TESTS FOR run_rules ------------------
 
 @mock.patch("rules_engine.engine.execute_actions")
@@ -93,6 +155,8 @@ def test_run_rules_executes_actions(
     mock_execute_actions.assert_called_once_with(
         {"id": "1", "subject": "Test email"},
         ["mark_as_read"],
+        service=None,
+        writes=None,
     )
 
 
@@ -113,3 +177,319 @@ def test_run_rules_with_no_emails(
     engine.run_rules("fake_rules.json")
 
     mock_execute_actions.assert_not_called()
+
+
+@mock.patch("rules_engine.engine.execute_label_groups")
+@mock.patch("rules_engine.engine.execute_actions")
+@mock.patch("rules_engine.engine.execute_query")
+@mock.patch("rules_engine.engine.load_and_validate_rules")
+def test_run_rules_batch_mode_dispatches_once(
+    mock_load_rules,
+    mock_execute_query,
+    mock_execute_actions,
+    mock_execute_label_groups,
+):
+    mock_load_rules.return_value = {
+        "rules_predicate": "all",
+        "rules": [{"field": "subject", "predicate": "contains", "value": "test"}],
+        "actions": ["mark_as_read"],
+    }
+    emails = [{"id": "1"}, {"id": "2"}]
+    mock_execute_query.return_value = emails
+
+    engine.run_rules("fake_rules.json", batch=True, plan=False)
+
+    mock_execute_actions.assert_not_called()
+    mock_execute_label_groups.assert_called_once_with({((), ("UNREAD",)): ["1", "2"]}, service=None, writes=None)
+
+
+@mock.patch("rules_engine.engine.EmailWriteBuffer")
+@mock.patch("rules_engine.engine.GmailSession")
+@mock.patch("rules_engine.engine.execute_actions")
+@mock.patch("rules_engine.engine.execute_query")
+@mock.patch("rules_engine.engine.load_and_validate_rules")
+def test_run_rules_builds_one_session_per_run(
+    mock_load_rules,
+    mock_execute_query,
+    mock_execute_actions,
+    mock_session_class,
+    mock_buffer_class,
+):
+    mock_load_rules.return_value = {"rules": [], "actions": ["mark_as_read"]}
+    mock_execute_query.return_value = [{"id": "1"}, {"id": "2"}]
+    service = mock_session_class.return_value.service
+    writes = mock_buffer_class.return_value
+
+    with mock.patch.object(engine, "USE_MOCK_ACTIONS", False):
+        engine.run_rules("fake_rules.json")
+
+    mock_session_class.assert_called_once_with()
+    mock_buffer_class.assert_called_once_with()
+    mock_execute_actions.assert_any_call({"id": "1"}, ["mark_as_read"], service=service, writes=writes)
+    mock_execute_actions.assert_any_call({"id": "2"}, ["mark_as_read"], service=service, writes=writes)
+    writes.flush.assert_called_once_with()
+
+
+@mock.patch("rules_engine.engine.execute_actions")
+@mock.patch("rules_engine.engine.execute_query")
+@mock.patch("rules_engine.engine.load_and_validate_rules")
+def test_run_rules_streaming_selects_action_columns(
+    mock_load_rules,
+    mock_execute_query,
+    mock_execute_actions,
+    tmp_path,
+    monkeypatch,
+):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("emails.db")
+    conn.execute(
+        "CREATE TABLE emails (id TEXT, subject TEXT, sender TEXT, body TEXT, is_read INTEGER, is_starred INTEGER, "
+        "inbox_type TEXT)"
+    )
+    conn.execute("INSERT INTO emails VALUES ('1', 'test', 'a@example.com', 'large body', 0, 0, 'INBOX')")
+    conn.commit()
+    conn.close()
+    mock_load_rules.return_value = {
+        "rules_predicate": "all",
+        "rules": [{"field": "subject", "predicate": "contains", "value": "test"}],
+        "actions": ["mark_as_read"],
+    }
+
+    engine.run_rules("fake_rules.json", stream=True)
+
+    mock_execute_query.assert_not_called()
+    mock_execute_actions.assert_called_once_with(
+        {"id": "1", "subject": "test", "sender": "a@example.com", "is_read": 0, "is_starred": 0, "inbox_type": "INBOX"},
+        ["mark_as_read"], service=None, writes=None
+    )
+
+
+def test_use_fts_index_falls_back_to_like_without_the_index(caplog):
+    create_emails_table()
+
+    assert engine.use_fts_index(False) is False
+    assert engine.use_fts_index(True) is False
+    assert "FTS index is missing" in caplog.text
+
+    with connection() as conn:
+        create_fts_index(conn)
+    assert engine.use_fts_index(True) is True
+
+
+@mock.patch("rules_engine.engine.load_and_validate_rules")
+def test_run_rules_with_fts_flag_and_no_index_uses_like(mock_load_rules, mock_actions):
+    create_emails_table()
+    with transaction() as conn:
+        conn.execute("INSERT INTO emails (id, subject) VALUES ('1', 'Your invoice'), ('2', 'Hello')")
+    mock_load_rules.return_value = {
+        "rules_predicate": "all",
+        "rules": [{"field": "subject", "predicate": "contains", "value": "invoice"}],
+        "actions": ["mark_as_read"],
+    }
+
+    with mock.patch.object(engine, "USE_FTS_INDEX", True):
+        engine.run_rules("fake_rules.json", batch=False, stream=False, plan=False, cache=False)
+
+    mock_actions["mark_as_read"].assert_called_once_with("1")
+
+
+def test_execute_email_actions_concurrent_returns_summary():
+    mark_as_read = mock.Mock()
+    email_actions = [({"id": "1"}, ["mark_as_read"]), ({"id": "2"}, ["mark_as_read"])]
+
+    with mock.patch.dict(engine.ACTIONS_MAP, {"mark_as_read": mark_as_read}):
+        summary = engine.execute_email_actions(email_actions, concurrent=True)
+
+    assert summary == {"mark_as_read": {"succeeded": 2, "failed": 0, "retries": 0}}
+    mark_as_read.assert_any_call("1")
+    mark_as_read.assert_any_call("2")
+
+
+def test_execute_planned_actions_makes_one_call_per_email():
+    modify = mock.Mock()
+    email_actions = [
+        ({"id": "1", "is_read": 0, "inbox_type": "INBOX"}, ["mark_as_read", "move_message:TRASH"]),
+        ({"id": "2", "is_read": 1, "inbox_type": "INBOX"}, ["mark_as_read"]),
+    ]
+
+    with mock.patch.object(engine, "MODIFY_LABELS", modify):
+        engine.execute_planned_actions(email_actions, batch=False, concurrent=False)
+
+    modify.assert_called_once_with("1", ("TRASH",), ("UNREAD", "INBOX"))
+
+
+def test_execute_planned_actions_batches_by_net_delta():
+    batch = mock.Mock(side_effect=lambda ids, add, remove: [{"ids": ids, "error": None}])
+    email_actions = [
+        ({"id": "1", "is_read": 0, "inbox_type": "INBOX"}, ["mark_as_read", "mark_as_unread"]),
+        ({"id": "2", "is_read": 1, "inbox_type": "INBOX"}, ["mark_as_read", "mark_as_unread"]),
+    ]
+
+    with mock.patch.object(engine, "BATCH_MODIFY", batch):
+        engine.execute_planned_actions(email_actions, batch=True)
+
+    batch.assert_called_once_with(["2"], ("UNREAD",), ())
+
+
+# ------------------ TESTS FOR multiple rule sets ------------------
+
+RULE_SETS = [
+    {"name": "vip", "priority": 0, "stop_processing": True, "actions": ["mark_as_unread", "move_message:STARRED"]},
+    {"name": "newsletters", "priority": 1, "stop_processing": False, "actions": ["mark_as_read"]},
+    {"name": "cleanup", "priority": 2, "stop_processing": False, "actions": ["mark_as_read", "move_message:TRASH"]},
+]
+
+
+def test_merge_rule_set_actions_dedupes_in_priority_order():
+    email = {"id": "1", "rule_0": 0, "rule_1": 1, "rule_2": 1}
+
+    assert engine.merge_rule_set_actions(email, RULE_SETS) == ["mark_as_read", "move_message:TRASH"]
+
+
+def test_merge_rule_set_actions_honours_stop_processing():
+    email = {"id": "1", "rule_0": 1, "rule_1": 1, "rule_2": 1}
+
+    assert engine.merge_rule_set_actions(email, RULE_SETS) == ["mark_as_unread", "move_message:STARRED"]
+
+
+@mock.patch("rules_engine.engine.execute_actions")
+@mock.patch("rules_engine.engine.execute_query")
+def test_run_rule_sets_issues_single_query(mock_execute_query, mock_execute_actions):
+    rule_sets = [
+        dict(rule_set, rules_predicate="all", rules=[{"field": "subject", "predicate": "contains", "value": "x"}])
+        for rule_set in RULE_SETS
+    ]
+    mock_execute_query.return_value = [
+        {"id": "1", "rule_0": 0, "rule_1": 1, "rule_2": 0},
+        {"id": "2", "rule_0": 1, "rule_1": 0, "rule_2": 1},
+    ]
+
+    engine.run_rule_sets(rule_sets, batch=False)
+
+    mock_execute_query.assert_called_once()
+    assert "rule_2" in mock_execute_query.call_args[0][0]
+    mock_execute_actions.assert_any_call(
+        mock_execute_query.return_value[0], ["mark_as_read"], service=None, writes=None
+    )
+    mock_execute_actions.assert_any_call(
+        mock_execute_query.return_value[1], ["mark_as_unread", "move_message:STARRED"], service=None, writes=None
+    )
+
+
+@mock.patch("rules_engine.engine.execute_query")
+def test_run_rule_sets_batch_mode_groups_across_rule_sets(mock_execute_query):
+    rule_sets = [
+        dict(rule_set, rules_predicate="all", rules=[{"field": "subject", "predicate": "contains", "value": "x"}])
+        for rule_set in RULE_SETS
+    ]
+    mock_execute_query.return_value = [
+        {"id": "1", "rule_0": 0, "rule_1": 1, "rule_2": 0},
+        {"id": "2", "rule_0": 0, "rule_1": 0, "rule_2": 1},
+    ]
+    mock_batch = mock.Mock(side_effect=lambda ids, add, remove: [{"ids": ids, "error": None}])
+
+    with mock.patch.object(engine, "BATCH_MODIFY", mock_batch):
+        engine.run_rule_sets(rule_sets, batch=True)
+
+    mock_batch.assert_any_call(["1", "2"], (), ("UNREAD",))
+    mock_batch.assert_any_call(["2"], ("TRASH",), ("INBOX",))
+    assert mock_batch.call_count == 2
+
+
+@mock.patch("rules_engine.engine.run_rule_sets")
+@mock.patch("rules_engine.engine.load_and_validate_rules")
+def test_run_rules_dispatches_rule_sets_file(mock_load_rules, mock_run_rule_sets):
+    mock_load_rules.return_value = {"rule_sets": [
+        {"name": "b", "priority": 2, "rules_predicate": "all", "rules": [], "actions": []},
+        {"name": "a", "priority": 1, "rules_predicate": "all", "rules": [], "actions": []},
+    ]}
+
+    engine.run_rules("fake_rules.json", batch=False)
+
+    rule_sets = mock_run_rule_sets.call_args[0][0]
+    assert [rule_set["name"] for rule_set in rule_sets] == ["a", "b"]
+
+
+@mock.patch("rules_engine.engine.execute_actions")
+@mock.patch("rules_engine.engine.execute_query")
+@mock.patch("rules_engine.engine.load_and_validate_rules")
+def test_run_rules_with_cache_reuses_compiled_rules(mock_load_rules, mock_execute_query, mock_execute_actions,
+                                                    tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({
+        "rules_predicate": "all",
+        "rules": [{"field": "subject", "predicate": "contains", "value": "test"}],
+        "actions": ["mark_as_read"],
+    }))
+    mock_execute_query.return_value = [{"id": "1"}]
+
+    with mock.patch("rules_engine.rule_cache.rules_to_sql_query", wraps=rules_to_sql_query) as compile_sql:
+        engine.run_rules(rules_file, cache=True)
+        engine.run_rules(rules_file, cache=True)
+
+    mock_load_rules.assert_not_called()
+    compile_sql.assert_called_once()
+    assert mock_execute_query.call_args_list[0] == mock_execute_query.call_args_list[1]
+    assert mock_execute_actions.call_count == 2
+
+
+# ------------------ TESTS FOR in-memory matching of fetched emails ------------------
+
+FETCHED_EMAILS = [
+    {"id": "1", "subject": "Your Invoice", "from": "billing@shop.com", "to": "me@example.com",
+     "snippet": "", "body": "", "received_at": "Mon, 13 Oct 2025 12:00:00 +0000",
+     "is_read": False, "is_starred": False, "inbox_type": "INBOX"},
+    {"id": "2", "subject": "Hello", "from": "friend@example.com", "to": "me@example.com",
+     "snippet": "", "body": "", "received_at": "Mon, 13 Oct 2025 12:00:00 +0000",
+     "is_read": False, "is_starred": False, "inbox_type": "INBOX"},
+]
+
+
+def test_match_fetched_emails_uses_db_columns():
+    rule_sets = [
+        {"name": "billing", "priority": 0, "stop_processing": False, "rules_predicate": "all",
+         "rules": [{"field": "Sender", "predicate": "contains", "value": "SHOP.com"}],
+         "actions": ["mark_as_read"]},
+    ]
+
+    matches = list(engine.match_fetched_emails(FETCHED_EMAILS, rule_sets))
+
+    assert len(matches) == 1
+    record, actions = matches[0]
+    assert record["id"] == "1"
+    assert record["sender"] == "billing@shop.com"
+    assert record["received_at"] == "2025-10-13 12:00:00"
+    assert actions == ["mark_as_read"]
+
+
+def test_match_fetched_emails_with_many_rule_sets_uses_multi_matcher():
+    rule_sets = [
+        {"name": f"filler{i}", "priority": i, "stop_processing": False, "rules_predicate": "all",
+         "rules": [{"field": "subject", "predicate": "contains", "value": f"nomatch{i}"}],
+         "actions": ["mark_as_unread"]}
+        for i in range(engine.MULTI_MATCHER_MIN_RULE_SETS)
+    ]
+    rule_sets.append(
+        {"name": "hello", "priority": 100, "stop_processing": False, "rules_predicate": "all",
+         "rules": [{"field": "subject", "predicate": "contains", "value": "HELLO"}],
+         "actions": ["mark_as_read"]}
+    )
+
+    with mock.patch.object(engine, "MultiRuleMatcher", wraps=engine.MultiRuleMatcher) as multi:
+        matches = list(engine.match_fetched_emails(FETCHED_EMAILS, rule_sets))
+
+    multi.assert_called_once()
+    assert [(record["id"], actions) for record, actions in matches] == [("2", ["mark_as_read"])]
+
+
+def test_run_rules_on_fetched_emails_executes_actions(mock_actions):
+    rules_config = {
+        "rules_predicate": "any",
+        "rules": [{"field": "subject", "predicate": "contains", "value": "hello"}],
+        "actions": ["move_message:STARRED"],
+    }
+
+    matched = engine.run_rules_on_fetched_emails(iter(FETCHED_EMAILS), rules_config, batch=False)
+
+    assert matched == 1
+    mock_actions["move_message"].assert_called_once_with("2", "STARRED")
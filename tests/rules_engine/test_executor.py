@@ -0,0 +1,88 @@
+import pytest
+import sqlite3
+import time
+from unittest import mock
+from gmail.actions.move_message import move_message
+from gmail.stub_service import StubGmailService, StubHttpError, build_stub_message
+from gmail.throttle import TokenBucket
+from rules_engine.executor import execute_actions_concurrently, parse_action
+
+ACTIONS_MAP = {"move_message": move_message}
+
+
+@pytest.fixture(autouse=True)
+def emails_db(tmp_path):
+    db_file = tmp_path / "emails.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE emails (id TEXT PRIMARY KEY, is_starred BOOLEAN, inbox_type TEXT)")
+    conn.commit()
+    conn.close()
+    return db_file
+
+
+def make_service(count, latency=0.0):
+    messages = [
+        build_stub_message(str(i), "Subject", "a@example.com", "me@example.com",
+                           "Mon, 13 Oct 2025 12:00:00 +0000", "body", ["INBOX"])
+        for i in range(count)
+    ]
+    return StubGmailService(messages, latency=latency)
+
+
+def test_parse_action():
+    assert parse_action("move_message:TRASH") == ("move_message", "TRASH")
+    assert parse_action("mark_as_read") == ("mark_as_read", None)
+
+
+def test_executes_actions_concurrently_with_a_service_per_worker():
+    service = make_service(20, latency=0.02)
+    factory = mock.Mock(return_value=service)
+    email_actions = [({"id": str(i)}, ["move_message:TRASH", "unknown_action"]) for i in range(20)]
+
+    start = time.perf_counter()
+    summary = execute_actions_concurrently(email_actions, ACTIONS_MAP, concurrency=10, service_factory=factory)
+    elapsed = time.perf_counter() - start
+
+    assert summary == {"move_message": {"succeeded": 20, "failed": 0, "retries": 0}}
+    assert all("TRASH" in service.messages[str(i)]["labelIds"] for i in range(20))
+    assert factory.call_count <= 10
+    assert elapsed < 20 * 0.02
+
+
+def test_retries_quota_errors_and_reports_failures():
+    service = make_service(3)
+    service.inject_error("messages.modify", StubHttpError(429), times=2)
+    service.inject_error("messages.modify", StubHttpError(400))
+    email_actions = [({"id": "0"}, ["move_message:TRASH"]), ({"id": "1"}, ["move_message:TRASH"])]
+
+    summary = execute_actions_concurrently(
+        email_actions, ACTIONS_MAP, concurrency=1, service_factory=lambda: service, sleep=lambda seconds: None
+    )
+
+    assert summary == {"move_message": {"succeeded": 1, "failed": 1, "retries": 2}}
+
+
+def test_rate_limiter_is_charged_quota_units():
+    service = make_service(4)
+    bucket = mock.Mock(spec=TokenBucket)
+
+    execute_actions_concurrently(
+        [({"id": str(i)}, ["move_message:TRASH"]) for i in range(4)],
+        ACTIONS_MAP, rate_limiter=bucket, service_factory=lambda: service,
+    )
+
+    assert bucket.acquire.call_args_list == [mock.call(5)] * 4
+
+
+def test_actions_of_one_email_run_in_order():
+    calls = []
+
+    def record(message_id, *args, **kwargs):
+        time.sleep(0.001 if args == ("first",) else 0)
+        calls.append((message_id, args[0]))
+
+    email_actions = [({"id": str(i)}, ["record:first", "record:second", "record:third"]) for i in range(20)]
+    execute_actions_concurrently(email_actions, {"record": record}, concurrency=8)
+
+    for i in range(20):
+        assert [step for message_id, step in calls if message_id == str(i)] == ["first", "second", "third"]
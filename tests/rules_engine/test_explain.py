@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+import pytest
+from db.connection import connection
+from db.create_emails_table import create_emails_table
+from db.synthetic_mailbox import populate_mailbox
+from rules_engine.explain import (
+    TableStats, estimate_api_calls, estimate_matches, explain_rules, format_report, load_table_stats, rule_warnings
+)
+
+NOW = datetime(2025, 10, 13, tzinfo=timezone.utc)
+
+RULE_SETS = {
+    "rule_sets": [
+        {
+            "name": "bank",
+            "rules_predicate": "all",
+            "rules": [{"field": "sender", "predicate": "equals", "value": "user0@example.com"}],
+            "actions": ["mark_as_read", "move_message:SPAM"],
+        },
+        {
+            "name": "invoices",
+            "rules_predicate": "any",
+            "rules": [
+                {"field": "body", "predicate": "contains", "value": "invoice"},
+                {"field": "sender", "predicate": "equals", "value": "billing@example.com"},
+            ],
+            "actions": ["mark_as_read"],
+        },
+    ]
+}
+
+
+@pytest.fixture
+def conn():
+    create_emails_table()
+    populate_mailbox(2000, seed=1)
+    with connection() as conn:
+        conn.execute("ANALYZE")
+        yield conn
+
+
+def test_plans_and_warnings(conn):
+    stats, reports = explain_rules(RULE_SETS, conn, now=NOW)
+    bank, invoices, combined = reports
+
+    assert stats.rows == 2000 and stats.analyzed
+    assert any("USING INDEX idx_emails_sender" in line for line in bank["plan"])
+    assert bank["warnings"] == []
+    assert any("leading-wildcard LIKE" in warning for warning in invoices["warnings"])
+    assert any("OR across unindexed columns (body)" in warning for warning in invoices["warnings"])
+    assert any("full scan" in warning for warning in invoices["warnings"])
+    assert combined["name"].startswith("all rule sets")
+    assert "Estimated matches" in format_report(stats, reports)
+
+
+@pytest.mark.parametrize("plan_line", ["SCAN emails", "SCAN TABLE emails"])
+def test_full_scan_warning_reads_both_plan_formats(plan_line):
+    stats = TableStats(rows=2000, indexed=frozenset(), rows_per_key={}, received_range=None, analyzed=False)
+    rule_set = {"rules_predicate": "all", "rules": [{"field": "body", "predicate": "contains", "value": "invoice"}]}
+
+    assert "full scan of ~2,000 rows" in rule_warnings(rule_set, stats, [plan_line])
+    assert "full scan of ~2,000 rows" not in rule_warnings(rule_set, stats, ["SEARCH emails_fts VIRTUAL TABLE INDEX 0:M3"])
+
+
+def test_estimates_use_index_stats_and_date_range(conn):
+    stats = load_table_stats(conn)
+    sender_rule = RULE_SETS["rule_sets"][0]
+    recent = {"rules_predicate": "all", "rules": [{"field": "received_at", "predicate": "less_than", "value": "1 months"}]}
+    older = dict(recent, rules=[dict(recent["rules"][0], predicate="greater_than")])
+
+    oldest, newest = (datetime.fromisoformat(value).replace(tzinfo=timezone.utc) for value in stats.received_range)
+    span_days = (newest - oldest).total_seconds() / 86400
+
+    assert estimate_matches(sender_rule, stats, NOW) == stats.rows_per_key["sender"]
+    assert estimate_matches(recent, stats, newest) == pytest.approx(2000 * 30 / span_days, abs=1)
+    assert estimate_matches(recent, stats, newest) + estimate_matches(older, stats, newest) == 2000
+
+
+def test_estimate_api_calls():
+    calls = estimate_api_calls(["mark_as_read", "move_message:TRASH"], 2500)
+
+    assert calls["per_email"] == (5000, 25000)
+    assert calls["planned"] == (2500, 12500)
+    assert calls["batched"] == (6, 300)
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+# Cumulative import time of rules_engine.engine in mock mode, in microseconds.
+# It takes ~25 ms without the Google client libraries and ~250 ms with them.
+IMPORT_BUDGET_US = 150_000
+
+
+def import_times(module):
+    """Run `import module` with -X importtime and return {module: cumulative microseconds}."""
+    env = dict(os.environ, USE_MOCK_ACTIONS="true")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_mock_mode_engine_import_skips_google_libraries():
+    times = import_times("rules_engine.engine")
+
+    assert not [name for name in times if name.startswith(("google", "googleapiclient"))]
+    assert times["rules_engine.engine"] < IMPORT_BUDGET_US
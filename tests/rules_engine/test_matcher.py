@@ -0,0 +1,117 @@
+import pytest
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from db.migrations import migrate
+from db.rules_to_sql import rules_to_sql_query
+from rules_engine.matcher import MultiRuleMatcher, ascii_lower, compile_rules, compile_rule_sets, like_contains_regex
+
+ALPHABET = "abcAB xyzÉé%_\n"
+STRING_FIELDS = ["sender", "recipient", "subject", "body", "snippet"]
+STRING_PREDICATES = ["contains", "does_not_contain", "equals", "does_not_equal"]
+
+
+def random_text(rng, max_length=12):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(max_length)))
+
+
+def random_email(rng, index, now):
+    email = {"id": str(index)}
+    for field in STRING_FIELDS:
+        email[field] = None if rng.random() < 0.1 else random_text(rng)
+    # Whole days plus 30 minutes never lands on a rule's cutoff, so SQL's
+    # datetime('now') and the matcher's `now` agree despite clock drift.
+    received = now - timedelta(days=rng.randrange(90), minutes=30)
+    email["received_at"] = None if rng.random() < 0.1 else received.strftime("%Y-%m-%d %H:%M:%S")
+    return email
+
+
+def random_condition(rng, emails):
+    if rng.random() < 0.2:
+        unit = rng.choice(["days", "months"])
+        number = rng.randrange(1, 60 if unit == "days" else 3)
+        return {"field": "received_at", "predicate": rng.choice(["less_than", "greater_than"]),
+                "value": f"{number} {unit}"}
+
+    field = rng.choice(STRING_FIELDS)
+    predicate = rng.choice(STRING_PREDICATES)
+    source = rng.choice(emails)[field]
+    if source and rng.random() < 0.6:
+        start = rng.randrange(len(source))
+        value = source[start:start + rng.randrange(1, 5)]
+        if predicate in ("equals", "does_not_equal") and rng.random() < 0.5:
+            value = source
+    else:
+        value = random_text(rng, 4) or "a"
+    if rng.random() < 0.3:
+        value = value.swapcase()
+    return {"field": field.capitalize(), "predicate": predicate, "value": value}
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    rng = random.Random(1234)
+    now = datetime.now(timezone.utc)
+    emails = [random_email(rng, i, now) for i in range(300)]
+
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO emails (id, sender, recipient, subject, body, snippet, received_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(e["id"], e["sender"], e["recipient"], e["subject"], e["body"], e["snippet"], e["received_at"]) for e in emails]
+    )
+    yield rng, conn, emails
+    conn.close()
+
+
+def test_ascii_lower_only_folds_ascii():
+    assert ascii_lower("ABC") == "abc"
+    assert ascii_lower("ÉA") == "Éa"
+
+
+def test_like_contains_regex_handles_wildcards():
+    assert like_contains_regex("a%c").search("xxabbbcxx")
+    assert like_contains_regex("a_c").search("abc")
+    assert not like_contains_regex("a_c").search("ac")
+    assert like_contains_regex("a.c").search("a.c")
+    assert not like_contains_regex("a.c").search("abc")
+
+
+def test_compile_rules_without_conditions_matches_everything():
+    assert compile_rules({"rules_predicate": "all", "rules": []})({"id": "1"})
+
+
+def test_compiled_matcher_agrees_with_sql(dataset):
+    rng, conn, emails = dataset
+
+    for _ in range(400):
+        rules_data = {
+            "rules_predicate": rng.choice(["all", "any"]),
+            "rules": [random_condition(rng, emails) for _ in range(rng.randrange(1, 4))],
+        }
+        query, params = rules_to_sql_query(rules_data)
+        expected = {row[0] for row in conn.execute(query, params)}
+
+        match = compile_rules(rules_data)
+        actual = {email["id"] for email in emails if match(email)}
+
+        assert actual == expected, rules_data
+
+
+def test_multi_rule_matcher_agrees_with_compiled_matchers(dataset):
+    rng, conn, emails = dataset
+    now = datetime.now(timezone.utc)
+
+    rule_sets = [
+        {
+            "rules_predicate": rng.choice(["all", "any"]),
+            "rules": [random_condition(rng, emails) for _ in range(rng.randrange(0, 4))],
+        }
+        for _ in range(200)
+    ]
+    matchers = compile_rule_sets(rule_sets, now)
+    multi = MultiRuleMatcher(rule_sets, now)
+
+    for email in emails:
+        expected = {index for index, match in enumerate(matchers) if match(email)}
+        assert multi.match(email) == expected, email
@@ -0,0 +1,60 @@
+from rules_engine.planner import drop_applied_labels, fold_actions, plan_email, plan_email_actions
+
+
+def test_fold_actions_merges_into_one_delta():
+    assert fold_actions(["mark_as_read", "move_message:TRASH"]) == (("TRASH",), ("UNREAD", "INBOX"))
+
+
+def test_fold_actions_later_action_wins():
+    assert fold_actions(["mark_as_read", "mark_as_unread"]) == (("UNREAD",), ())
+    assert fold_actions(["mark_as_unread", "mark_as_read"]) == ((), ("UNREAD",))
+    assert fold_actions(["move_message:TRASH", "move_message:INBOX"]) == (("TRASH", "INBOX"), ())
+
+
+def test_fold_actions_ignores_unknown_actions():
+    assert fold_actions(["archive", "mark_as_read"]) == ((), ("UNREAD",))
+
+
+def test_drop_applied_labels_uses_stored_state():
+    email = {"id": "1", "is_read": 1, "inbox_type": "OTHER"}
+    assert drop_applied_labels(email, ("TRASH",), ("UNREAD", "INBOX")) == (("TRASH",), ())
+
+    email = {"id": "1", "is_read": 0, "inbox_type": "INBOX"}
+    assert drop_applied_labels(email, ("UNREAD", "INBOX"), ()) == ((), ())
+
+
+def test_drop_applied_labels_uses_stored_starred_state():
+    email = {"id": "1", "is_read": 1, "is_starred": 1, "inbox_type": "OTHER"}
+    assert plan_email(email, ["move_message:STARRED"]) is None
+
+    email = {"id": "1", "is_read": 1, "is_starred": 0, "inbox_type": "OTHER"}
+    assert plan_email(email, ["move_message:STARRED"]) == (("STARRED",), ())
+
+
+def test_drop_applied_labels_keeps_untracked_labels():
+    email = {"id": "1", "is_read": 1, "is_starred": 0, "inbox_type": "OTHER"}
+    assert plan_email(email, ["move_message:Label_42"]) == (("Label_42",), ())
+
+
+def test_drop_applied_labels_keeps_labels_when_state_unknown():
+    email = {"id": "1"}
+    assert drop_applied_labels(email, ("UNREAD",), ("INBOX",)) == (("UNREAD",), ("INBOX",))
+
+
+def test_plan_email_returns_none_when_nothing_to_do():
+    assert plan_email({"id": "1", "is_read": 1, "inbox_type": "INBOX"}, ["mark_as_read"]) is None
+    assert plan_email({"id": "1", "is_read": 0, "inbox_type": "INBOX"}, ["mark_as_read"]) == ((), ("UNREAD",))
+
+
+def test_plan_email_actions_groups_by_net_delta():
+    email_actions = [
+        ({"id": "1", "is_read": 0, "inbox_type": "INBOX"}, ["mark_as_read", "move_message:TRASH"]),
+        ({"id": "2", "is_read": 0, "inbox_type": "INBOX"}, ["mark_as_read", "move_message:TRASH"]),
+        ({"id": "3", "is_read": 1, "inbox_type": "INBOX"}, ["mark_as_read", "move_message:TRASH"]),
+        ({"id": "4", "is_read": 1, "inbox_type": "INBOX"}, ["mark_as_read"]),
+    ]
+
+    assert plan_email_actions(email_actions) == {
+        (("TRASH",), ("UNREAD", "INBOX")): ["1", "2"],
+        (("TRASH",), ("INBOX",)): ["3"],
+    }
@@ -0,0 +1,106 @@
+import json
+import pytest
+from unittest import mock
+from rules_engine import rule_cache
+from rules_engine.rule_cache import compile_rules, get_cache_dir, load_compiled_rules
+from rules_engine.validator import RuleValidationError
+
+RULES = {
+    "rules_predicate": "all",
+    "rules": [
+        {"field": "subject", "predicate": "contains", "value": "invoice"},
+        {"field": "received_at", "predicate": "less_than", "value": "5 days"},
+    ],
+    "actions": ["mark_as_read"],
+}
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RULES))
+    return path
+
+
+def test_cache_hit_skips_validation_and_compilation(rules_file):
+    first = load_compiled_rules(rules_file)
+
+    with (
+        mock.patch.object(rule_cache, "validate_rules_json") as validate,
+        mock.patch.object(rule_cache, "compile_rules") as compile_,
+    ):
+        second = load_compiled_rules(rules_file)
+
+    validate.assert_not_called()
+    compile_.assert_not_called()
+    assert second == first == compile_rules(RULES)
+
+
+def test_relative_dates_stay_relative_to_now(rules_file):
+    compiled = load_compiled_rules(rules_file)
+
+    assert "received_at >= datetime('now', ?)" in compiled.query
+    assert "-5 days" in compiled.params
+
+
+def test_editing_the_rules_file_misses_the_cache(rules_file):
+    load_compiled_rules(rules_file)
+    rules_file.write_text(json.dumps(dict(RULES, actions=["mark_as_unread"])))
+
+    assert load_compiled_rules(rules_file).rules_config["actions"] == ["mark_as_unread"]
+
+
+def test_options_and_engine_version_are_part_of_the_key(rules_file):
+    load_compiled_rules(rules_file)
+    streaming = load_compiled_rules(rules_file, columns=("id", "subject"))
+    assert streaming.query.startswith("SELECT id, subject FROM emails")
+
+    with mock.patch.object(rule_cache, "ENGINE_VERSION", rule_cache.ENGINE_VERSION + 1):
+        load_compiled_rules(rules_file)
+
+    assert len(list(get_cache_dir().glob("*.json"))) == 3
+
+
+def test_cache_lives_next_to_the_database(isolated_emails_db, rules_file):
+    load_compiled_rules(rules_file)
+
+    assert get_cache_dir() == isolated_emails_db.parent / "emails.db.rules-cache"
+    assert len(list(get_cache_dir().glob("*.json"))) == 1
+
+
+def test_unreadable_entry_is_recompiled(rules_file):
+    load_compiled_rules(rules_file)
+    [entry] = get_cache_dir().glob("*.json")
+    entry.write_text("{not json")
+
+    assert load_compiled_rules(rules_file) == compile_rules(RULES)
+    assert json.loads(entry.read_text())["rules_config"] == RULES
+
+
+def test_invalid_rules_are_not_cached(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(dict(RULES, rules_predicate="sometimes")))
+
+    with pytest.raises(RuleValidationError):
+        load_compiled_rules(path)
+    assert not get_cache_dir().exists()
+
+
+def test_oldest_entries_are_pruned(rules_file, tmp_path):
+    with mock.patch.object(rule_cache, "MAX_CACHE_ENTRIES", 2):
+        for value in ("a", "b", "c"):
+            rules_file.write_text(json.dumps(dict(RULES, rules=[
+                {"field": "subject", "predicate": "contains", "value": value}
+            ])))
+            load_compiled_rules(rules_file)
+
+    assert len(list(get_cache_dir().glob("*.json"))) == 2
+
+
+def test_rule_sets_files_compile_to_one_query(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rule_sets": [dict(RULES, name="a"), dict(RULES, name="b", priority=1)]}))
+
+    compiled = load_compiled_rules(path)
+
+    assert "rule_0" in compiled.query and "rule_1" in compiled.query
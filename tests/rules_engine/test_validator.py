@@ -6,6 +6,7 @@ from rules_engine.validator import (
     validate_actions,
     validate_rules_json,
     load_and_validate_rules,
+    get_rule_sets,
     RuleValidationError,
 )
 
@@ -225,3 +226,66 @@ def test_missing_top_level_keys(tmp_path):
     with pytest.raises(RuleValidationError) as exc_info:
         load_and_validate_rules(file_path)
     assert "Missing top-level keys" in str(exc_info.value)
+
+# ------------------------
+# Multi rule set tests
+# ------------------------
+
+def make_rule_set(name, **overrides):
+    rule_set = {
+        "name": name,
+        "rules_predicate": "all",
+        "rules": [{"field": "Subject", "predicate": "contains", "value": name}],
+        "actions": ["mark_as_read"],
+    }
+    rule_set.update(overrides)
+    return rule_set
+
+def test_validate_rules_json_accepts_rule_sets():
+    rules_json = {"rule_sets": [make_rule_set("a", priority=2), make_rule_set("b", stop_processing=True)]}
+    assert validate_rules_json(rules_json) is True
+
+def test_validate_rules_json_rejects_empty_rule_sets():
+    with pytest.raises(RuleValidationError, match="non-empty list"):
+        validate_rules_json({"rule_sets": []})
+
+def test_validate_rules_json_rejects_duplicate_rule_set_names():
+    with pytest.raises(RuleValidationError, match="Duplicate rule set name: a"):
+        validate_rules_json({"rule_sets": [make_rule_set("a"), make_rule_set("a")]})
+
+def test_validate_rules_json_rejects_rule_set_without_name():
+    rule_set = make_rule_set("a")
+    del rule_set["name"]
+    with pytest.raises(RuleValidationError, match="missing required key 'name'"):
+        validate_rules_json({"rule_sets": [rule_set]})
+
+def test_validate_rules_json_rejects_invalid_priority():
+    with pytest.raises(RuleValidationError, match="Invalid priority"):
+        validate_rules_json({"rule_sets": [make_rule_set("a", priority="high")]})
+
+def test_validate_rules_json_rejects_invalid_action_in_rule_set():
+    with pytest.raises(RuleValidationError, match="Invalid action: delete"):
+        validate_rules_json({"rule_sets": [make_rule_set("a", actions=["delete"])]})
+
+def test_get_rule_sets_orders_by_priority_then_file_order():
+    rules_json = {"rule_sets": [
+        make_rule_set("late", priority=5),
+        make_rule_set("first"),
+        make_rule_set("second"),
+        make_rule_set("early", priority=-1, stop_processing=True),
+    ]}
+
+    rule_sets = get_rule_sets(rules_json)
+
+    assert [rule_set["name"] for rule_set in rule_sets] == ["early", "first", "second", "late"]
+    assert rule_sets[1]["stop_processing"] is False
+
+def test_get_rule_sets_wraps_single_rule_set_file():
+    rules_json = make_rule_set("ignored")
+    del rules_json["name"]
+
+    rule_sets = get_rule_sets(rules_json)
+
+    assert len(rule_sets) == 1
+    assert rule_sets[0]["name"] == "default"
+    assert rule_sets[0]["actions"] == ["mark_as_read"]